@@ -1,43 +1,47 @@
 import os
+import time
 import httpx
 import json
+import asyncio
 from dotenv import load_dotenv
-import base64
 import logging
+from contextlib import aclosing
+from app.services.http_client import get_http_client, build_timeout
+from app.services.single_flight import generation_flight
+from app.services.llm_cache import llm_cache
+from app.services.json_stream import JSONScanner, find_json
+from app.services.resilience import deepseek_upstream, CircuitOpenError, is_upstream_failure
+from app.services.image_store import image_store, prompt_key
+from app.services.prompt_canon import canonicalize_prompt
 
 logger = logging.getLogger(__name__)
 
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 
+# Per-call-site TTLs (seconds) for the persistent LLM cache; 0 disables caching for that call site.
+# Exercises are sampled at a high temperature for variety, so they are not cached unless asked for.
+LLM_CACHE_TTL_TRANSLATION = float(os.getenv("LLM_CACHE_TTL_TRANSLATION", str(30 * 24 * 3600)))
+LLM_CACHE_TTL_EXERCISES = float(os.getenv("LLM_CACHE_TTL_EXERCISES", "0"))
 
-def extract_json_from_markdown(text: str) -> str:
+
+def extract_json_from_markdown(text: str, openers: str = "{") -> str:
     """
-    Extracts JSON from markdown code blocks if present.
+    Extracts JSON from markdown code blocks or surrounding prose if present.
     DeepSeek sometimes returns JSON wrapped in ```json ... ```
+    Uses a single-pass scanner (see app.services.json_stream), so long or
+    malformed model output cannot trigger regex backtracking.
     
     Args:
         text: Response text that may contain markdown code blocks
+        openers: Which JSON values to look for: "{" for objects, "[{" for arrays or objects
         
     Returns:
         Clean JSON string
     """
-    import re
-    
-    # Try to find JSON in markdown code block (with or without 'json' language tag)
-    # Pattern matches: ```json\n{...}\n``` or ```\n{...}\n```
-    markdown_pattern = r'```(?:json)?\s*(\{[\s\S]*?\})\s*```'
-    match = re.search(markdown_pattern, text, re.DOTALL | re.MULTILINE)
-    
-    if match:
-        return match.group(1).strip()
-    
-    # If no markdown block found, try to find just the JSON object
-    json_pattern = r'(\{[\s\S]*\})'
-    json_match = re.search(json_pattern, text, re.DOTALL)
-    
-    if json_match:
-        return json_match.group(1).strip()
+    found = find_json(text, openers)
+    if found is not None:
+        return found.strip()
     
     # If nothing found, return original text
     return text.strip()
@@ -51,11 +55,6 @@ async def translate_text(text: str, target_language: str):
         logger.error("DEEPSEEK_API_KEY is not set. Please check your .env file.")
         return "Error: DeepSeek API key not configured."
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-    }
-
     prompt = f"Translate the following text to {target_language}. Provide only the translated text, without any additional explanations or context.\\n\\nText to translate: \\\"{text}\\\"\""
 
     payload = {
@@ -69,17 +68,17 @@ async def translate_text(text: str, target_language: str):
 }
 
     logger.debug(f"DeepSeek API Request URL: {DEEPSEEK_API_URL}") # <-- ДОБАВЬТЕ ЭТУ СТРОКУ
-    logger.debug(f"DeepSeek API Request Headers: {headers}") # <-- ДОБАВЬТЕ ЭТУ СТРОКУ
     logger.debug(f"DeepSeek API Request Payload: {payload}") # <-- ДОБАВЬТЕ ЭТУ СТРОКУ
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=45.0)
-            response.raise_for_status()
-            
-            data = response.json()
-            translation = data['choices'][0]['message']['content']
-            return translation
+        # Common phrases are translated over and over, so translations are cached
+        data = await _post_deepseek(payload, timeout=45.0, cache_ttl=LLM_CACHE_TTL_TRANSLATION, site="translation")
+        translation = data['choices'][0]['message']['content']
+        return translation
+
+    except CircuitOpenError as e:
+        logger.warning(f"Translation skipped: {e}")
+        return "Error: translation is temporarily unavailable."
 
     except httpx.HTTPStatusError as e:
         logger.error(f"API Error during translation: {e.response.status_code} - {e.response.text}", exc_info=True)
@@ -89,43 +88,27 @@ async def translate_text(text: str, target_language: str):
         return f"An unexpected error occurred: {str(e)}"
 
 
-async def generate_multiple_choice_exercise(learn_language: str, native_language: str, level: str, topic: str, exclude_hashes: list[str] = None):
-    """
-    Generates a multiple-choice exercise for a specific topic as a JSON object.
-    The question will be in the native_language, and the answer options will be in the learn_language.
-    
-    Args:
-        learn_language: The language the user is learning (for answer options)
-        native_language: The user's native language (for the question)
-        level: Difficulty level (beginner, intermediate, advanced)
-        topic: The topic of the exercise
-        exclude_hashes: List of hashes to avoid duplicate exercises
-    """
-    if not DEEPSEEK_API_KEY:
-        logger.error("DEEPSEEK_API_KEY is not set. Please check your .env file.")
-        return {"error": "DeepSeek API key not configured."}
+# Map language names to readable formats for the prompts
+LANG_DISPLAY = {
+    "russian": "Russian (Русский)",
+    "english": "English",
+    "korean": "Korean (한국어)",
+    "uzbek": "Uzbek Cyrillic (Ўзбек кирилл)"
+}
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-    }
+EXERCISE_SYSTEM_PROMPT = "You are an assistant that creates language exercises for children and responds in pure JSON format."
 
-    # Map language names to readable formats for the prompt
-    lang_display = {
-        "russian": "Russian (Русский)",
-        "english": "English",
-        "korean": "Korean (한국어)",
-        "uzbek": "Uzbek Cyrillic (Ўзбек кирилл)"
-    }
-    
-    learn_lang_display = lang_display.get(learn_language, learn_language.capitalize())
-    native_lang_display = lang_display.get(native_language, native_language.capitalize())
+# Upper bound for one batched generation call; larger batches risk truncated output
+EXERCISE_BATCH_MAX = 10
 
-    prompt = f"""
-    Create a simple and fun multiple-choice language exercise for a child learning {learn_lang_display} at a {level} level.
-    The exercise must be about the topic: "{topic}".
-    Use simple, common, and basic words suitable for a young child.
-    
+
+def _lang_display(language: str) -> str:
+    return LANG_DISPLAY.get(language, language.capitalize())
+
+
+def _exercise_requirements(learn_lang_display: str, native_lang_display: str) -> str:
+    """Language and script instructions shared by the single and batched exercise prompts."""
+    return f"""
     CRITICAL LANGUAGE REQUIREMENTS:
     1. The QUESTION must be written in {native_lang_display} (the user's native language)
     2. The ANSWER OPTIONS must be written in {learn_lang_display} (the language being learned)
@@ -138,16 +121,32 @@ async def generate_multiple_choice_exercise(learn_language: str, native_language
     - For English and Korean, use their respective scripts
     
     The question should be engaging for a child and easy to pronounce for text-to-speech generation.
+"""
 
-    To ensure variety, avoid exercises similar to these (represented by hashes): {", ".join(exclude_hashes or [])}
 
-    Please return your response as a single JSON object with the following keys:
+def _exercise_keys(learn_lang_display: str, native_lang_display: str) -> str:
+    return f"""
     - "question": A string containing the question in {native_lang_display}
     - "options": A list of 4 strings in {learn_lang_display} representing the possible answers
     - "correct_answer_index": An integer (from 0 to 3) indicating the index of the correct answer
     - "explanation": A string in {native_lang_display} explaining the correct answer (e.g. "The correct translation for 'Apple' is 'Олма'.")
     - "visual_prompt": A string describing a simple, friendly image related to the question
-    
+"""
+
+
+def _exercise_payload(learn_language: str, native_language: str, level: str, topic: str, exclude_hashes: list[str] = None) -> dict:
+    """Builds the DeepSeek request for a single multiple-choice exercise."""
+    learn_lang_display = _lang_display(learn_language)
+    native_lang_display = _lang_display(native_language)
+
+    prompt = f"""
+    Create a simple and fun multiple-choice language exercise for a child learning {learn_lang_display} at a {level} level.
+    The exercise must be about the topic: "{topic}".
+    Use simple, common, and basic words suitable for a young child.
+    {_exercise_requirements(learn_lang_display, native_lang_display)}
+    To ensure variety, avoid exercises similar to these (represented by hashes): {", ".join(exclude_hashes or [])}
+
+    Please return your response as a single JSON object with the following keys:{_exercise_keys(learn_lang_display, native_lang_display)}
     Example (if native=Uzbek Cyrillic, learning=Russian):
     {{ "question": "Бу нима?", "options": ["Яблоко", "Банан", "Виноград", "Гранат"], "correct_answer_index": 0, "explanation": "'Яблоко' сўзи ўзбек тилида 'Олма' дегани.", "visual_prompt": "A friendly red apple smiling." }}
     
@@ -157,35 +156,178 @@ async def generate_multiple_choice_exercise(learn_language: str, native_language
     Do not include any text or explanations outside of the JSON object.
     """
 
-    payload = {
+    return {
         "model": "deepseek-chat",
         "messages": [
-            {"role": "system", "content": "You are an assistant that creates language exercises for children and responds in pure JSON format."},
+            {"role": "system", "content": EXERCISE_SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
         "temperature": 0.8,
         "max_tokens": 500,
     }
 
+
+def _exercise_batch_payload(learn_language: str, native_language: str, level: str, topic: str, count: int, exclude_hashes: list[str] = None) -> dict:
+    """Builds one DeepSeek request that asks for `count` exercises as a JSON array."""
+    learn_lang_display = _lang_display(learn_language)
+    native_lang_display = _lang_display(native_language)
+
+    prompt = f"""
+    Create {count} different, simple and fun multiple-choice language exercises for a child learning {learn_lang_display} at a {level} level.
+    All exercises must be about the topic: "{topic}", and each exercise must ask about a different word.
+    Use simple, common, and basic words suitable for a young child.
+    {_exercise_requirements(learn_lang_display, native_lang_display)}
+    To ensure variety, avoid exercises similar to these (represented by hashes): {", ".join(exclude_hashes or [])}
+
+    Please return your response as a JSON array of {count} objects. Each object has the following keys:{_exercise_keys(learn_lang_display, native_lang_display)}
+    Example (if native=Uzbek Cyrillic, learning=Russian, 2 exercises):
+    [{{ "question": "Бу нима?", "options": ["Яблоко", "Банан", "Виноград", "Гранат"], "correct_answer_index": 0, "explanation": "'Яблоко' сўзи ўзбек тилида 'Олма' дегани.", "visual_prompt": "A friendly red apple smiling." }},
+     {{ "question": "Қайси бири банан?", "options": ["Груша", "Банан", "Слива", "Лимон"], "correct_answer_index": 1, "explanation": "'Банан' сўзи ўзбек тилида ҳам 'Банан'.", "visual_prompt": "A happy yellow banana." }}]
+
+    Do not include any text or explanations outside of the JSON array.
+    """
+
+    return {
+        "model": "deepseek-chat",
+        "messages": [
+            {"role": "system", "content": EXERCISE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.8,
+        # Roughly the single-shot budget per item, plus room for the array wrapper
+        "max_tokens": min(350 * count + 200, 4000),
+    }
+
+
+async def _send_deepseek(payload: dict, timeout: float) -> dict:
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+    }
+    client = get_http_client()
+    response = await client.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=build_timeout(timeout))
+    response.raise_for_status()
+    return response.json()
+
+
+async def _post_deepseek(payload: dict, timeout: float, cache_ttl: float | None = None, site: str = "default") -> dict:
+    """
+    Sends a chat completion request over the shared client and returns the decoded response body.
+    With `cache_ttl` the response is served from / stored in the persistent LLM cache.
+    Calls go through the DeepSeek circuit breaker and are tracked per call `site`. While the
+    breaker is open (or the call fails upstream) an expired cache entry is served if there is one,
+    otherwise CircuitOpenError / the HTTP error is raised without waiting for a timeout.
+    """
+    if cache_ttl:
+        cached = llm_cache.get(payload)
+        if cached is not None:
+            return json.loads(cached)
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            
-            data = response.json()
-            exercise_content = data['choices'][0]['message']['content']
+        data = await deepseek_upstream.call(site, lambda: _send_deepseek(payload, timeout))
+    except Exception as e:
+        if cache_ttl and (isinstance(e, CircuitOpenError) or is_upstream_failure(e)):
+            stale = llm_cache.get(payload, stale_ok=True)
+            if stale is not None:
+                logger.warning(f"DeepSeek unavailable for '{site}' ({e!r}), serving a stale cached response.")
+                return json.loads(stale)
+        raise
+
+    if cache_ttl:
+        llm_cache.set(payload, json.dumps(data, ensure_ascii=False), cache_ttl)
+    return data
+
+
+def is_valid_exercise(exercise) -> bool:
+    """Checks that an exercise has the shape the web page and the Telegram bot rely on."""
+    if not isinstance(exercise, dict):
+        return False
+    question = exercise.get("question")
+    options = exercise.get("options")
+    index = exercise.get("correct_answer_index")
+    if not isinstance(question, str) or not question.strip():
+        return False
+    if not isinstance(options, list) or len(options) != 4:
+        return False
+    if not all(isinstance(o, str) and o.strip() for o in options):
+        return False
+    if len({o.strip().lower() for o in options}) != 4:
+        return False
+    if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < 4:
+        return False
+    return True
+
+
+def parse_exercise_batch(content: str) -> list[dict]:
+    """
+    Parses a batched response and returns only the exercises that pass validation.
+    Accepts a bare JSON array or an object wrapping one (e.g. {"exercises": [...]}).
+    """
+    clean_json = extract_json_from_markdown(content, openers="[{")
+    try:
+        data = json.loads(clean_json)
+    except json.JSONDecodeError:
+        logger.error(f"Failed to decode JSON batch from DeepSeek API. Raw response: {content}")
+        return []
+
+    if isinstance(data, dict):
+        if is_valid_exercise(data):
+            data = [data]
+        else:
+            data = next((v for v in data.values() if isinstance(v, list)), [data])
+    if not isinstance(data, list):
+        return []
+
+    valid = [item for item in data if is_valid_exercise(item)]
+    if len(valid) < len(data):
+        logger.warning(f"Dropped {len(data) - len(valid)} invalid exercises out of {len(data)} in batch.")
+    return valid
+
+
+async def generate_multiple_choice_exercise(learn_language: str, native_language: str, level: str, topic: str, exclude_hashes: list[str] = None):
+    """
+    Generates a multiple-choice exercise for a specific topic as a JSON object.
+    The question will be in the native_language, and the answer options will be in the learn_language.
+    Concurrent calls for the same (learn, native, level, topic) share one upstream request.
+    
+    Args:
+        learn_language: The language the user is learning (for answer options)
+        native_language: The user's native language (for the question)
+        level: Difficulty level (beginner, intermediate, advanced)
+        topic: The topic of the exercise
+        exclude_hashes: List of hashes to avoid duplicate exercises
+    """
+    key = ("generate_multiple_choice_exercise", learn_language, native_language, level, topic, None)
+    return await generation_flight.do(
+        key, lambda: _generate_multiple_choice_exercise(learn_language, native_language, level, topic, exclude_hashes)
+    )
+
+
+async def _generate_multiple_choice_exercise(learn_language: str, native_language: str, level: str, topic: str, exclude_hashes: list[str] = None):
+    if not DEEPSEEK_API_KEY:
+        logger.error("DEEPSEEK_API_KEY is not set. Please check your .env file.")
+        return {"error": "DeepSeek API key not configured."}
+
+    payload = _exercise_payload(learn_language, native_language, level, topic, exclude_hashes)
+
+    try:
+        data = await _post_deepseek(payload, timeout=30.0, cache_ttl=LLM_CACHE_TTL_EXERCISES, site="exercise")
+        exercise_content = data['choices'][0]['message']['content']
             
-            # Clean JSON from markdown blocks if present
-            clean_json = extract_json_from_markdown(exercise_content)
+        # Clean JSON from markdown blocks if present
+        clean_json = extract_json_from_markdown(exercise_content)
             
-            # Attempt to parse JSON
-            try:
-                exercise_data = json.loads(clean_json)
-                return exercise_data
-            except json.JSONDecodeError:
-                logger.error(f"Failed to decode JSON from DeepSeek API. Raw response: {exercise_content}")
-                return {"error": "Failed to decode JSON from the API response.", "raw_response": exercise_content}
+        # Attempt to parse JSON
+        try:
+            exercise_data = json.loads(clean_json)
+            return exercise_data
+        except json.JSONDecodeError:
+            logger.error(f"Failed to decode JSON from DeepSeek API. Raw response: {exercise_content}")
+            return {"error": "Failed to decode JSON from the API response.", "raw_response": exercise_content}
 
+    except CircuitOpenError as e:
+        logger.warning(f"Exercise generation skipped: {e}")
+        return {"error": "DeepSeek is temporarily unavailable."}
     except httpx.HTTPStatusError as e:
         logger.error(f"API Error during exercise generation: {e.response.status_code} - {e.response.text}", exc_info=True)
         return {"error": f"DeepSeek API Error: {e.response.status_code}", "details": e.response.text}
@@ -194,6 +336,157 @@ async def generate_multiple_choice_exercise(learn_language: str, native_language
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
 
+async def generate_multiple_choice_exercises(learn_language: str, native_language: str, level: str, topic: str, count: int = 5, exclude_hashes: list[str] = None) -> list[dict]:
+    """
+    Generates up to `count` multiple-choice exercises in a single DeepSeek call.
+    The shared instructions and the round trip are paid once for the whole batch.
+    Each exercise is validated independently; only the valid subset is returned
+    (an empty list on any API failure).
+    
+    Args:
+        learn_language: The language the user is learning (for answer options)
+        native_language: The user's native language (for the question)
+        level: Difficulty level (beginner, intermediate, advanced)
+        topic: The topic of the exercises
+        count: Number of exercises to ask for (capped at EXERCISE_BATCH_MAX)
+        exclude_hashes: List of hashes to avoid duplicate exercises
+    """
+    if not DEEPSEEK_API_KEY:
+        logger.error("DEEPSEEK_API_KEY is not set. Please check your .env file.")
+        return []
+
+    count = max(1, min(count, EXERCISE_BATCH_MAX))
+    payload = _exercise_batch_payload(learn_language, native_language, level, topic, count, exclude_hashes)
+
+    try:
+        data = await _post_deepseek(payload, timeout=60.0, cache_ttl=LLM_CACHE_TTL_EXERCISES, site="exercise_batch")
+        return parse_exercise_batch(data['choices'][0]['message']['content'])[:count]
+    except CircuitOpenError as e:
+        logger.warning(f"Batch exercise generation skipped: {e}")
+        return []
+    except httpx.HTTPStatusError as e:
+        logger.error(f"API Error during batch exercise generation: {e.response.status_code} - {e.response.text}", exc_info=True)
+        return []
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during batch exercise generation: {e}", exc_info=True)
+        return []
+
+
+async def _stream_deepseek(payload: dict, timeout: float):
+    """
+    Posts a `stream: true` chat request and yields content deltas as they arrive (SSE lines).
+    Goes through the DeepSeek circuit breaker like `_post_deepseek` (call site "exercise_stream").
+    """
+    admission = deepseek_upstream.guard()
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+    }
+    client = get_http_client()
+    started = time.perf_counter()
+    try:
+        async with client.stream("POST", DEEPSEEK_API_URL, json=dict(payload, stream=True), headers=headers, timeout=build_timeout(timeout)) as response:
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    delta = json.loads(data)["choices"][0]["delta"].get("content")
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if delta:
+                    yield delta
+    except GeneratorExit:
+        # The consumer stopped early because it already has what it needs
+        deepseek_upstream.record("exercise_stream", time.perf_counter() - started, admission=admission)
+        raise
+    except asyncio.CancelledError:
+        deepseek_upstream.breaker.release(admission)
+        raise
+    except Exception as e:
+        deepseek_upstream.record("exercise_stream", time.perf_counter() - started, e, admission)
+        raise
+    deepseek_upstream.record("exercise_stream", time.perf_counter() - started, admission=admission)
+
+
+_partial_decoder = json.JSONDecoder()
+
+
+def _partial_field(text: str, key: str):
+    """Returns the value of `key` from a partially streamed JSON object once that value is complete."""
+    marker = f'"{key}"'
+    index = text.find(marker)
+    if index == -1:
+        return None
+    index = text.find(":", index + len(marker))
+    if index == -1:
+        return None
+    index += 1
+    while index < len(text) and text[index].isspace():
+        index += 1
+    try:
+        value, _ = _partial_decoder.raw_decode(text, index)
+    except ValueError:
+        return None
+    return value
+
+
+async def stream_multiple_choice_exercise(learn_language: str, native_language: str, level: str, topic: str, exclude_hashes: list[str] = None):
+    """
+    Streaming variant of generate_multiple_choice_exercise.
+    Async generator yielding ("question", str) and ("options", list) as soon as each field
+    is complete in DeepSeek's stream, then ("exercise", dict) or ("error", str).
+    """
+    if not DEEPSEEK_API_KEY:
+        logger.error("DEEPSEEK_API_KEY is not set. Please check your .env file.")
+        yield "error", "DeepSeek API key not configured."
+        return
+
+    payload = _exercise_payload(learn_language, native_language, level, topic, exclude_hashes)
+    scanner = JSONScanner("{")
+    pending_fields = ["question", "options"]
+
+    try:
+        async with aclosing(_stream_deepseek(payload, timeout=30.0)) as deltas:
+            async for delta in deltas:
+                found = scanner.feed(delta)
+                for field in list(pending_fields):
+                    value = _partial_field(scanner.text, field)
+                    if value is not None:
+                        pending_fields.remove(field)
+                        yield field, value
+                if found is not None:
+                    break
+    except CircuitOpenError as e:
+        logger.warning(f"Streamed exercise generation skipped: {e}")
+        yield "error", "DeepSeek is temporarily unavailable."
+        return
+    except httpx.HTTPStatusError as e:
+        logger.error(f"API Error during streamed exercise generation: {e.response.status_code} - {e.response.text}", exc_info=True)
+        yield "error", f"DeepSeek API Error: {e.response.status_code}"
+        return
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during streamed exercise generation: {e}", exc_info=True)
+        yield "error", f"An unexpected error occurred: {str(e)}"
+        return
+
+    clean_json = scanner.finish()
+    try:
+        exercise_data = json.loads(clean_json) if clean_json else None
+    except json.JSONDecodeError:
+        exercise_data = None
+    if not is_valid_exercise(exercise_data):
+        logger.error(f"Streamed exercise is not a valid exercise. Raw response: {scanner.text}")
+        yield "error", "Failed to decode JSON from the API response."
+        return
+    yield "exercise", exercise_data
+
+
 # --- Image Generation ---
 
 # Using a more reliable public Hugging Face model
@@ -204,7 +497,18 @@ async def generate_image(prompt: str) -> str | None:
     """
     Generates an image from a text prompt using a Hugging Face model.
     Returns the URL of the generated image or None if it fails.
+    Prompts covered by the pre-rendered image library, and prompts seen before (kept in
+    the content-addressed image store), are answered from disk without a network call;
+    concurrent requests for the same prompt share one call.
     """
+    cached_url = image_store.get(prompt)
+    if cached_url is not None:
+        return cached_url
+    return await generation_flight.do(("generate_image", prompt_key(prompt)), lambda: _generate_image(prompt))
+
+
+async def render_image(prompt: str) -> tuple[bytes, str] | None:
+    """Calls the image model for a prompt; returns (image bytes, content type) or None if it fails."""
     logger.debug(f"Attempting to generate image for prompt: {prompt}")
     logger.debug(f"HF_TOKEN available: {'Yes' if HF_TOKEN else 'No'}")
 
@@ -212,27 +516,36 @@ async def generate_image(prompt: str) -> str | None:
         "Authorization": f"Bearer {HF_TOKEN}" if HF_TOKEN else "",
         "Content-Type": "application/json"
     }
-    payload = {"inputs": f"cute cartoon drawing of a {prompt}, simple, for kids, white background"}
+    # Every prompt variant sharing this cache key gets the same picture, drawn from the canonical form
+    payload = {"inputs": f"cute cartoon drawing of a {canonicalize_prompt(prompt)}, simple, for kids, white background"}
     
     logger.debug(f"Sending request to {IMAGE_GENERATION_API_URL} with payload: {payload}")
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(IMAGE_GENERATION_API_URL, json=payload, headers=headers, timeout=120.0)
+        client = get_http_client()
+        response = await client.post(IMAGE_GENERATION_API_URL, json=payload, headers=headers, timeout=build_timeout(120.0))
             
-            logger.debug(f"Image API response status: {response.status_code}")
-            logger.debug(f"Image API response headers: {response.headers}")
-
-            if response.status_code == 200 and response.headers.get("content-type", "").startswith("image/"):
-                image_data = base64.b64encode(response.content).decode("utf-8")
-                logger.debug(f"Image generated successfully. Data URL length: {len(image_data)} bytes.")
-                return f"data:image/jpeg;base64,{image_data}"
-            else:
-                logger.error(f"Image generation API returned non-image data or error status. Status: {response.status_code}, Response: {response.text}")
-                return None
+        logger.debug(f"Image API response status: {response.status_code}")
+        logger.debug(f"Image API response headers: {response.headers}")
+
+        if response.status_code == 200 and response.headers.get("content-type", "").startswith("image/"):
+            return response.content, response.headers["content-type"]
+        else:
+            logger.error(f"Image generation API returned non-image data or error status. Status: {response.status_code}, Response: {response.text}")
+            return None
     except httpx.TimeoutException:
         logger.error("Image generation timed out after 120 seconds.")
         return None
     except Exception as e:
         logger.error(f"An unexpected error during image generation: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+
+async def _generate_image(prompt: str) -> str | None:
+    rendered = await render_image(prompt)
+    if rendered is None:
+        return None
+    data, content_type = rendered
+    image_url = await image_store.put(prompt, data, content_type)
+    logger.debug(f"Image generated successfully ({len(data)} bytes), stored as {image_url}.")
+    return image_url
@@ -1,15 +1,41 @@
 import os
+import time
 import httpx
 import json
+import asyncio
 from dotenv import load_dotenv
 import base64
 import logging
+from app.services.single_flight import generation_flight
+from app.services.offline_exercises import generate_offline_game
 
 logger = logging.getLogger(__name__)
 
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 
+# Persistent LLM cache TTL (seconds) for generated games; 0 keeps every game fresh
+LLM_CACHE_TTL_GAMES = float(os.getenv("LLM_CACHE_TTL_GAMES", "0"))
+
+# Image calls in flight at once across all games (a memory game has 8 pairs)
+GAME_IMAGE_CONCURRENCY = int(os.getenv("GAME_IMAGE_CONCURRENCY", "8"))
+# Overall budget for one game's images; slower items get the placeholder
+GAME_IMAGE_DEADLINE = float(os.getenv("GAME_IMAGE_DEADLINE", "45"))
+PLACEHOLDER_IMAGE_URL = "/static/images/placeholder.svg"
+
+_image_semaphore: asyncio.Semaphore | None = None
+_image_semaphore_loop = None
+
+
+def _get_image_semaphore() -> asyncio.Semaphore:
+    """The shared image semaphore, recreated if the event loop changed (scripts, tests)."""
+    global _image_semaphore, _image_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _image_semaphore is None or _image_semaphore_loop is not loop:
+        _image_semaphore = asyncio.Semaphore(GAME_IMAGE_CONCURRENCY)
+        _image_semaphore_loop = loop
+    return _image_semaphore
+
 
 async def generate_interactive_game(learn_language: str, native_language: str, level: str, topic: str, game_type: str = "matching"):
     """
@@ -25,15 +51,25 @@ async def generate_interactive_game(learn_language: str, native_language: str, l
     Returns:
         dict: Game data with instructions, items, and visual prompts
     """
+    # Concurrent requests for the same game share one upstream call
+    key = ("generate_interactive_game", learn_language, native_language, level, topic, game_type)
+    game_data = await generation_flight.do(
+        key, lambda: _generate_interactive_game(learn_language, native_language, level, topic, game_type)
+    )
+    if "error" in game_data:
+        # DeepSeek is down or returned garbage: build the game from the local vocabulary if the topic is covered
+        offline_game = generate_offline_game(learn_language, native_language, level, topic, game_type)
+        if offline_game is not None:
+            logger.warning(f"Serving an offline {game_type} game for '{topic}': {game_data['error']}")
+            return offline_game
+    return game_data
+
+
+async def _generate_interactive_game(learn_language: str, native_language: str, level: str, topic: str, game_type: str = "matching"):
     if not DEEPSEEK_API_KEY:
         logger.error("DEEPSEEK_API_KEY is not set. Please check your .env file.")
         return {"error": "DeepSeek API key not configured."}
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-    }
-
     # Map language names to readable formats
     lang_display = {
         "russian": "Russian (Русский)",
@@ -200,23 +236,20 @@ Return JSON with this structure:
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(DEEPSEEK_API_URL, json=payload, headers=headers, timeout=45.0)
-            response.raise_for_status()
-            
-            data = response.json()
-            game_content = data['choices'][0]['message']['content']
+        from app.ai_content import _post_deepseek
+        data = await _post_deepseek(payload, timeout=45.0, cache_ttl=LLM_CACHE_TTL_GAMES, site="game")
+        game_content = data['choices'][0]['message']['content']
             
-            # Import and use extract_json_from_markdown
-            from app.ai_content import extract_json_from_markdown
-            clean_json = extract_json_from_markdown(game_content)
+        # Import and use extract_json_from_markdown
+        from app.ai_content import extract_json_from_markdown
+        clean_json = extract_json_from_markdown(game_content)
             
-            try:
-                game_data = json.loads(clean_json)
-                return game_data
-            except json.JSONDecodeError:
-                logger.error(f"Failed to decode JSON from DeepSeek API. Raw response: {game_content}")
-                return {"error": "Failed to decode JSON from the API response.", "raw_response": game_content}
+        try:
+            game_data = json.loads(clean_json)
+            return game_data
+        except json.JSONDecodeError:
+            logger.error(f"Failed to decode JSON from DeepSeek API. Raw response: {game_content}")
+            return {"error": "Failed to decode JSON from the API response.", "raw_response": game_content}
 
     except httpx.HTTPStatusError as e:
         logger.error(f"API Error during game generation: {e.response.status_code} - {e.response.text}", exc_info=True)
@@ -226,42 +259,92 @@ Return JSON with this structure:
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
 
-async def generate_game_images(game_data: dict) -> dict:
+def _game_image_items(game_data: dict) -> list[dict]:
+    """The entries of a game that carry a visual_prompt, whatever the game type."""
+    game_type = game_data.get("game_type")
+    if game_type == "matching" or game_type == "drag_drop":
+        entries = game_data.get("items", [])
+    elif game_type == "memory":
+        entries = game_data.get("pairs", [])
+    elif game_type == "quiz":
+        entries = game_data.get("questions", [])
+    else:
+        entries = []
+    return [entry for entry in entries if entry.get("visual_prompt")]
+
+
+def enqueue_game_images(game_data: dict) -> dict:
+    """
+    Queues an interactive image job for every item instead of waiting for the images.
+    Items whose image already exists get image_url right away; the others get
+    image_job, which the page polls at /api/images.
+    """
+    from app.services.image_jobs import image_jobs, PRIORITY_INTERACTIVE
+
+    for item in _game_image_items(game_data):
+        job = image_jobs.submit(item["visual_prompt"], PRIORITY_INTERACTIVE)
+        if job.status == "done":
+            item["image_url"] = job.image_url
+            blur = job.to_dict()["image_blur"]
+            if blur:
+                item["image_blur"] = blur
+        else:
+            item["image_job"] = job.id
+    return game_data
+
+
+async def generate_game_images(game_data: dict, deadline: float = GAME_IMAGE_DEADLINE) -> dict:
     """
     Generates images for all items in a game.
+    Images are requested concurrently (at most GAME_IMAGE_CONCURRENCY at a time across
+    all games), so a game takes about as long as its slowest image. Items that fail or
+    are still pending when `deadline` (seconds) runs out get a placeholder image.
     
     Args:
         game_data: Game data with visual_prompt fields
+        deadline: Overall time budget for this game's images
         
     Returns:
-        dict: Game data with added image_url fields
+        dict: Game data with added image_url and image_latency_ms fields
+              (image_placeholder is set on items that got the placeholder,
+              image_blur holds an inline blurred preview when one exists)
     """
     from app.ai_content import generate_image
-    
-    game_type = game_data.get("game_type")
-    
-    if game_type == "matching" or game_type == "drag_drop":
-        items = game_data.get("items", [])
-        for item in items:
-            visual_prompt = item.get("visual_prompt")
-            if visual_prompt:
-                image_url = await generate_image(visual_prompt)
-                item["image_url"] = image_url
-                
-    elif game_type == "memory":
-        pairs = game_data.get("pairs", [])
-        for pair in pairs:
-            visual_prompt = pair.get("visual_prompt")
-            if visual_prompt:
-                image_url = await generate_image(visual_prompt)
-                pair["image_url"] = image_url
-                
-    elif game_type == "quiz":
-        questions = game_data.get("questions", [])
-        for question in questions:
-            visual_prompt = question.get("visual_prompt")
-            if visual_prompt:
-                image_url = await generate_image(visual_prompt)
-                question["image_url"] = image_url
-    
+    from app.services.image_store import image_store
+
+    semaphore = _get_image_semaphore()
+    started = time.perf_counter()
+
+    async def render(item: dict):
+        async with semaphore:
+            image_url = await generate_image(item["visual_prompt"])
+        item["image_latency_ms"] = round((time.perf_counter() - started) * 1000)
+        if image_url:
+            item["image_url"] = image_url
+            blur = image_store.blur_data_url(image_url)
+            if blur:
+                item["image_blur"] = blur
+        else:
+            item["image_url"] = PLACEHOLDER_IMAGE_URL
+            item["image_placeholder"] = True
+
+    items = _game_image_items(game_data)
+    tasks = [asyncio.create_task(render(item)) for item in items]
+    if not tasks:
+        return game_data
+
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    for item in items:
+        if "image_url" not in item:
+            item["image_url"] = PLACEHOLDER_IMAGE_URL
+            item["image_placeholder"] = True
+            item["image_latency_ms"] = None
+
+    placeholders = sum(1 for item in items if item.get("image_placeholder"))
+    logger.info(
+        f"Game images: {len(items) - placeholders}/{len(items)} generated in "
+        f"{time.perf_counter() - started:.1f}s ({len(pending)} past the {deadline:.0f}s deadline)."
+    )
     return game_data
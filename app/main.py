@@ -6,10 +6,14 @@ from contextlib import asynccontextmanager
 from starlette.middleware.sessions import SessionMiddleware # Import the session middleware
 
 from app.database import Base, engine 
-from app.routes import webapp, telegram
+from app.routes import webapp, telegram, health, images
 # from app.routes import progress # Temporarily commented out to fix import error
 
-from app.routes.telegram import set_telegram_webhook
+from app.routes.telegram import set_telegram_webhook, update_queue
+from app.services.http_client import init_http_client, close_http_client
+from app.services.exercise_pool import exercise_pool
+from app.services.image_jobs import image_jobs
+from app.services.telegram_client import telegram_client
 
 # Import all models to ensure they are registered with Base before table creation
 # Ensure all your models are imported here, including any new ones
@@ -24,6 +28,9 @@ async def lifespan(app: FastAPI):
     Application lifespan context manager. Runs on startup and shutdown.
     """
     logger.info("✅ [main.py] LIFESPAN: Startup sequence initiated.")
+
+    # One pooled HTTP client (keep-alive, HTTP/2) shared by all outbound LLM/image calls
+    await init_http_client()
     
     # Set the Telegram webhook on startup
     set_telegram_webhook()
@@ -38,10 +45,24 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.critical(f"!!! DB RESET FAILED: {e}", exc_info=True)
     
+    # Keep recently requested topics topped up with ready exercises
+    exercise_pool.start()
+    # Image generation runs on a worker pool; pages poll /api/images for results
+    image_jobs.start()
+    # Webhooks are acknowledged at once; their updates are processed by these workers
+    update_queue.start()
+
     logger.info("✅ [main.py] LIFESPAN: Startup sequence finished. App is running.")
     yield
     
     logger.info("🛑 AI Language Platform API is shutting down...")
+    await exercise_pool.stop()
+    await image_jobs.stop()
+    # Finish (up to a deadline) the Telegram updates already acknowledged
+    await update_queue.stop()
+    # Deliver replies already queued for Telegram before the HTTP client goes away
+    await telegram_client.flush_all()
+    await close_http_client()
 
 
 app = FastAPI( 
@@ -63,6 +84,13 @@ app.add_middleware(SessionMiddleware, secret_key=os.getenv("SESSION_SECRET_KEY",
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 CONTENT_DIR = Path(__file__).resolve().parents[1] / "content"
+# Generated images are content-addressed, so they are served with immutable cache headers
+from app.services.image_store import IMAGE_STORE_DIR, ImmutableStaticFiles
+IMAGE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+app.mount("/static/generated", ImmutableStaticFiles(directory=str(IMAGE_STORE_DIR)), name="generated_images")
+# The pre-rendered image library is versioned by directory, so its files never change either
+from app.services.image_library import IMAGE_LIBRARY_DIR
+app.mount("/static/library", ImmutableStaticFiles(directory=str(IMAGE_LIBRARY_DIR), check_dir=False), name="image_library")
 app.mount("/static", StaticFiles(directory=str(CONTENT_DIR)), name="static")
 
 # Include all the routers for the application
@@ -80,7 +108,8 @@ app.mount("/static", StaticFiles(directory=str(CONTENT_DIR)), name="static")
 app.include_router(telegram.router)
 # app.include_router(stt_game.router)
 # app.include_router(admin.router)
-# app.include_router(health.router)
+app.include_router(health.router)
+app.include_router(images.router)
 # app.include_router(public_lessons.router)
 # app.include_router(adaptive.router)
 # app.include_router(translator.router)
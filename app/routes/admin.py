@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.core.deps import get_db
 from app.models.user import User
@@ -7,10 +8,12 @@ from app.services.daily_reminder import send_daily_reminder_for_user
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.post("/reminders/send")
-def send_reminders(db: Session = Depends(get_db)):
-    users = db.query(User).all()
+async def send_reminders(db: Session = Depends(get_db)):
+    # Reminders are queued; the Telegram client sends them paced, behind interactive replies.
+    # The query (and each reminder's file reads) run in threads, off the loop serving the webhook
+    users = await run_in_threadpool(lambda: db.query(User).all())
     sent = 0
     for u in users:
-        if send_daily_reminder_for_user(u):
+        if await send_daily_reminder_for_user(u):
             sent += 1
     return {"sent": sent}
@@ -1,7 +1,43 @@
 from fastapi import APIRouter
+from app.services.exercise_pool import exercise_pool
+from app.services.single_flight import generation_flight
+from app.services.llm_cache import llm_cache
+from app.services.resilience import deepseek_upstream
+from app.services.image_store import image_store
+from app.services.image_jobs import image_jobs
+from app.services.image_library import image_library
+from app.services.tts_cache import tts_cache
+from app.services.audio_library import audio_library
+from app.services.tg_file_registry import tg_file_registry
+from app.services.voice_encoding import voice_encoder
+from app.services.telegram_client import telegram_client
+from app.services.tg_rate_limiter import tg_rate_limiter
+from app.services.update_dedup import update_dedup
+from app.routes.telegram import update_queue
 
 router = APIRouter(prefix="", tags=["Health"])
 
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+@router.get("/metrics")
+def metrics():
+    """Runtime counters used to size caches and pools."""
+    return {
+        "exercise_pool": exercise_pool.stats(),
+        "generation_single_flight": generation_flight.stats(),
+        "llm_cache": llm_cache.stats(),
+        "deepseek": deepseek_upstream.stats(),
+        "image_store": image_store.stats(),
+        "image_jobs": image_jobs.stats(),
+        "image_library": image_library.stats(),
+        "tts_cache": tts_cache.stats(),
+        "audio_library": audio_library.stats(),
+        "tg_file_registry": tg_file_registry.stats(),
+        "voice_encoder": voice_encoder.stats(),
+        "telegram_client": telegram_client.stats(),
+        "tg_rate_limiter": tg_rate_limiter.stats(),
+        "update_queue": update_queue.stats(),
+        "update_dedup": update_dedup.stats(),
+    }
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import FileResponse
+
+from app.services.image_store import image_store, is_image_key, IMMUTABLE_CACHE_CONTROL
+from app.services.image_variants import choose_card
+from app.services.image_jobs import image_jobs
+
+router = APIRouter(tags=["Images"])
+
+# Longest a status request is held open, and most jobs per batch request
+IMAGE_JOB_MAX_WAIT = 25.0
+IMAGE_JOB_MAX_IDS = 32
+
+
+@router.get("/images/{key}")
+async def get_image(request: Request, key: str):
+    """
+    Serves a generated or library image as a card-sized variant chosen by the Accept header
+    (AVIF/WebP when the client supports them, JPEG otherwise), falling back to the original.
+    """
+    if not is_image_key(key):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    choice = None
+    for directory in image_store.directories():
+        choice = choose_card(directory, key, request.headers.get("accept", ""))
+        if choice is not None:
+            break
+    if choice is None:
+        original = image_store.original_path(key)
+        if original is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        choice = (original, None)
+
+    path, media_type = choice
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept"},
+    )
+
+
+@router.get("/api/images/{job_id}")
+async def get_image_job(job_id: str, wait: float = 0):
+    """
+    Status of an image job: queued, running, done (with image_url) or failed.
+    With `wait` (seconds) the request is held until the job finishes (long polling).
+    """
+    jobs = await image_jobs.wait([job_id], timeout=min(max(wait, 0), IMAGE_JOB_MAX_WAIT))
+    if jobs[0] is None:
+        raise HTTPException(status_code=404, detail="Image job not found")
+    return jobs[0].to_dict()
+
+
+@router.get("/api/images")
+async def get_image_jobs(ids: str, wait: float = 0):
+    """
+    Status of several image jobs (comma-separated `ids`), so a game page needs one request per round.
+    With `wait` the request returns as soon as any pending job finishes.
+    """
+    job_ids = [job_id for job_id in ids.split(",") if job_id][:IMAGE_JOB_MAX_IDS]
+    jobs = await image_jobs.wait(job_ids, timeout=min(max(wait, 0), IMAGE_JOB_MAX_WAIT))
+    return {
+        job_id: job.to_dict() if job is not None else {"job_id": job_id, "status": "unknown"}
+        for job_id, job in zip(job_ids, jobs)
+    }
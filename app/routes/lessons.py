@@ -4,24 +4,24 @@ from app.services import content_generator
 router = APIRouter(prefix="/lessons", tags=["Lessons V2 - Dynamic Content"])
 
 @router.get("/topics/{pair}/{level}", response_model=list[str])
-def get_topics_for_level(pair: str, level: int):
+async def get_topics_for_level(pair: str, level: int):
     """
     Generates and returns a list of learning topics for a given language pair and level.
     `pair` should be in `uz-ru`, `uz-en`, or `uz-ko` format.
     """
     try:
-        topics = content_generator.generate_topics(pair=pair, level=level)
+        topics = await content_generator.generate_topics(pair=pair, level=level)
         return topics
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/games/{pair}/{level}/{topic}")
-def get_games_for_topic(pair: str, level: int, topic: str):
+async def get_games_for_topic(pair: str, level: int, topic: str):
     """
     Generates and returns a list of games/exercises for a specific topic.
     """
     try:
-        games = content_generator.generate_games_for_topic(
+        games = await content_generator.generate_games_for_topic(
             pair=pair, level=level, topic=topic
         )
         return games
@@ -3,17 +3,23 @@ import os
 import tempfile
 import json
 from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 import requests
 import re
-import uuid
-from gtts import gTTS
 from pathlib import Path
 
 # Corrected imports to point inside `app`
 from app.services.session import get_state, set_state, clear_state, set_expected_answer, pop_expected_answer
 from app.services.speech_utils import is_close_answer
-from app.ai_content import generate_multiple_choice_exercise
-from app.translations import get_text
+from app.services.exercise_pool import exercise_pool
+from app.translations import get_text, LANGUAGE_BUTTON_NAMES, LANGUAGE_FLAGS, LEVELS
+from app.services.tts_cache import clean_text_for_tts, tts_lang, tts_key, synthesize_mp3
+from app.services.tg_file_registry import media_key
+from app.services.telegram_client import telegram_client
+from app.services.update_queue import UpdateQueue
+from app.services.update_dedup import update_dedup
+from app.services.audio_library import audio_library
+from app.services.voice_encoding import voice_encoder, OPUS_CONTENT_TYPE
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +29,11 @@ if not BOT_TOKEN:
 else:
     logger.info("✅ [telegram.py] TELEGRAM_BOT_TOKEN found.")
 
+# Public base URL of this app; Telegram fetches our /static images from here
+PUBLIC_URL = os.getenv("PUBLIC_URL", "https://uzru-production.up.railway.app").rstrip("/")
+# Exercises as one message with inline answer buttons, edited in place, instead of reply keyboards
+TELEGRAM_INLINE_MODE = os.getenv("TELEGRAM_INLINE_MODE", "0") == "1"
+
 def set_telegram_webhook():
     """Sets the Telegram webhook to the production URL."""
     public_url = os.getenv("PUBLIC_URL", "https://uzru-production.up.railway.app") 
@@ -58,80 +69,57 @@ def load_topics_for_telegram():
         logger.error(f"Topics file not found at {topics_path}")
         return {}
 
-def clean_text_for_tts(text: str) -> str:
-    """Removes emojis and other non-verbal characters for cleaner TTS output."""
-    if not isinstance(text, str):
-        return ""
-    emoji_pattern = re.compile(
-        "["
-        "\\U0001F600-\\U0001F64F"  # emoticons
-        "\\U0001F300-\\U0001F5FF"  # symbols & pictographs
-        "\\U0001F680-\\U0001F6FF"  # transport & map symbols
-        "\\U0001F700-\\U0001F77F"  # alchemical symbols
-        "]+",
-        flags=re.UNICODE,
-    )
-    cleaned_text = emoji_pattern.sub(r'', text)
-    # Removed aggressive cleaning that was stripping non-Latin characters
-    return cleaned_text.strip()
-
 def send_voice(chat_id, text, lang="ru"):
-    """Generates a voice message from text and sends it to the user."""
-    try:
-        clean_text = clean_text_for_tts(text)
-        if not clean_text:
-            logger.warning(f"Skipping TTS for empty or non-string text: {text}")
-            return
-
-        filename = f"/tmp/{uuid.uuid4()}.mp3"
-        
-        # Map language codes for gTTS
-        # For Uzbek (both latin and cyrillic), use Russian voice as gTTS doesn't support Uzbek
-        lang_map = {
-            'russian': 'ru',
-            'english': 'en', 
-            'korean': 'ko',
-            'uzbek': 'ru',  # Use Russian voice for Uzbek Cyrillic text
-            'uz': 'ru',
-            'ru': 'ru',
-            'en': 'en',
-            'ko': 'ko'
-        }
-        lang_to_use = lang_map.get(lang, 'en')
-        logger.debug(f"Generating voice for text: '{clean_text}' in language: '{lang_to_use}' (original: '{lang}')")
-        
-        tts = gTTS(text=clean_text, lang=lang_to_use, slow=True)
-        tts.save(filename)
-
-        with open(filename, "rb") as audio:
-            payload = {"chat_id": chat_id}
-            files = {"voice": audio}
-            requests.post(f"https://api.telegram.org/bot{BOT_TOKEN}/sendVoice", data=payload, files=files)
-        os.remove(filename) 
-    except Exception as e:
-        logger.error(f"Failed to send voice message: {e}", exc_info=True)
+    """
+    Queues a text as a voice message and returns the send task (None if there is nothing to say).
+    Each phrase is uploaded once (pre-rendered audio is used when the build has it) and
+    afterwards sent by its Telegram file_id.
+    """
+    clean_text = clean_text_for_tts(text)
+    if not clean_text:
+        logger.warning(f"Skipping TTS for empty or non-string text: {text}")
+        return None
+
+    # For Uzbek (both latin and cyrillic), the Russian voice is used as gTTS doesn't support Uzbek
+    lang_to_use = tts_lang(lang)
+    logger.debug(f"Sending voice for text: '{clean_text}' in language: '{lang_to_use}' (original: '{lang}')")
+
+    phrase_key = tts_key(clean_text, lang_to_use, slow=True)
+
+    def load():
+        prerendered = audio_library.path_for_key(phrase_key)
+        mp3 = prerendered.read_bytes() if prerendered is not None else synthesize_mp3(clean_text, lang_to_use, slow=True)
+        # Encoded to OGG/Opus in memory, the format Telegram voice notes use
+        return voice_encoder.encode(mp3)
+
+    # Opus and MP3 uploads of a phrase are different files with different file_ids
+    opus_key, mp3_key = media_key("voice:opus", phrase_key), media_key("voice", phrase_key)
+
+    def upload_key(loaded):
+        # An Opus encoding that fell back to MP3 must not be filed under the Opus key
+        return opus_key if loaded[2] == OPUS_CONTENT_TYPE else mp3_key
+
+    key = opus_key if voice_encoder.available else mp3_key
+    return telegram_client.send_media(chat_id, "sendVoice", "voice", key, load, upload_key=upload_key)
 
 def send_message(chat_id, text, reply_markup=None):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text}
-    if reply_markup:
-        payload["reply_markup"] = json.dumps(reply_markup) # Ensure reply_markup is JSON string
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to send Telegram message: {e}")
-        if 'response' in locals() and response is not None:
-             logger.error(f"Telegram API response: {response.text}")
+    """Queues a text message; sends to one chat keep their order. Returns the send task."""
+    return telegram_client.send_message(chat_id, text, reply_markup=reply_markup)
+
+def edit_message_text(chat_id, message_id, text, reply_markup=None):
+    """Queues an edit of a message already in the chat. Returns the send task."""
+    return telegram_client.edit_message_text(chat_id, message_id, text, reply_markup=reply_markup)
+
+def answer_callback_query(chat_id, callback_query_id, text=""):
+    """Queues the acknowledgement of an inline button press. Returns the send task."""
+    return telegram_client.answer_callback_query(chat_id, callback_query_id, text=text)
 
 # --- Keyboard Helper Functions ---
 def get_language_keyboard(langs: list, current_mode: str) -> dict:
     keyboard_buttons = []
     for lang in langs:
-        display_name = {
-            "russian": "Рус тили 🇷🇺", "english": "Инглиз тили 🇬🇧",
-            "korean": "Корейс тили 🇰🇷", "uzbek": "Ўзбек тили 🇺🇿"
-        }.get(lang, lang.capitalize())
+        display_name = (f"{LANGUAGE_BUTTON_NAMES[lang]} {LANGUAGE_FLAGS[lang]}" if lang in LANGUAGE_BUTTON_NAMES
+                        else lang.capitalize())
         keyboard_buttons.append([{"text": display_name}])
     
     # Add a back button if not in native language selection
@@ -142,8 +130,8 @@ def get_language_keyboard(langs: list, current_mode: str) -> dict:
 
 def get_level_keyboard() -> dict:
     keyboard_buttons = [
-        [{"text": "Beginner"}, {"text": "Intermediate"}],
-        [{"text": "Advanced"}],
+        [{"text": LEVELS[0].capitalize()}, {"text": LEVELS[1].capitalize()}],
+        [{"text": LEVELS[2].capitalize()}],
         [{"text": "/start"}] # Back to learn language selection
     ]
     return {"keyboard": keyboard_buttons, "resize_keyboard": True, "one_time_keyboard": True}
@@ -175,34 +163,181 @@ def get_exercise_result_keyboard(native_lang: str) -> dict:
         [{"text": get_text(native_lang, "restart_button")}]
     ], "resize_keyboard": True, "one_time_keyboard": True}
 
+def get_exercise_navigation_buttons(native_lang: str) -> list:
+    return [{"text": get_text(native_lang, "next_exercise_button"), "callback_data": "next"},
+            {"text": get_text(native_lang, "restart_button"), "callback_data": "restart"}]
+
+def get_exercise_inline_keyboard(options: list, native_lang: str) -> dict:
+    keyboard_buttons = []
+    for i, option in enumerate(options):
+        # Callback data is the answer number; the button shows the option itself
+        keyboard_buttons.append([{"text": f"{i + 1}. {option}"[:64], "callback_data": f"answer:{i + 1}"}])
+    # The question is voiced on request rather than with every exercise
+    keyboard_buttons.append([{"text": "🔊", "callback_data": "voice"}])
+    keyboard_buttons.append(get_exercise_navigation_buttons(native_lang))
+    return {"inline_keyboard": keyboard_buttons}
+
+def get_exercise_result_inline_keyboard(native_lang: str) -> dict:
+    return {"inline_keyboard": [get_exercise_navigation_buttons(native_lang)]}
+
+
+def send_exercise(chat_id, exercise_data: dict, native_lang: str, message_id=None):
+    """
+    Sends an exercise (question, its voice, the options) and records its answer.
+    In inline mode question and options are one message with answer buttons, and the
+    voice is sent only when its 🔊 button is pressed; with `message_id` that message
+    is edited into the new exercise instead.
+    """
+    question_label = get_text(native_lang, "question_label")
+    question_text = f"{question_label}: {exercise_data['question']}"
+    options_text_list = [f"{idx+1}. {opt}" for idx, opt in enumerate(exercise_data['options'])]
+    options_text_combined = "\n".join(options_text_list)
+
+    if TELEGRAM_INLINE_MODE:
+        exercise_text = f"{question_text}\n\n{options_text_combined}"
+        keyboard = get_exercise_inline_keyboard(exercise_data['options'], native_lang)
+        if message_id is not None:
+            task = edit_message_text(chat_id, message_id, exercise_text, reply_markup=keyboard)
+        else:
+            # Buttons on the previous exercise message are stale from now on
+            set_state(chat_id, exercise_message_id=None)
+            task = send_message(chat_id, exercise_text, reply_markup=keyboard)
+        task.add_done_callback(lambda t: _remember_exercise_message(chat_id, t))
+    else:
+        send_message(chat_id, question_text)
+        # Question is now in native language, so use native_lang for TTS
+        send_voice(chat_id, exercise_data['question'], lang=native_lang)
+        send_message(chat_id, options_text_combined, reply_markup=get_exercise_options_keyboard(exercise_data['options']))
+
+    set_expected_answer(chat_id, str(exercise_data['correct_answer_index'] + 1))
+    set_state(chat_id, current_question=exercise_data['question'],
+              current_explanation=exercise_data.get("explanation", ""))
+
+
+def _remember_exercise_message(chat_id, task):
+    """Records the message an exercise was sent in, once Telegram returns it; only its buttons are live."""
+    if task.cancelled() or task.exception() is not None:
+        return
+    result = task.result()
+    if isinstance(result, dict) and "message_id" in result:
+        set_state(chat_id, exercise_message_id=result["message_id"])
+
+
+async def handle_exercise_callback(chat_id, callback_query: dict, user_state: dict, native_lang: str):
+    """
+    Inline-mode exercise buttons. An answer is shown by editing the exercise message in
+    place, and "next" turns that message into the next exercise, so an exercise costs one
+    or two Bot API calls instead of a message per step; "voice" sends the question's voice.
+    """
+    action = callback_query.get("data", "")
+    message = callback_query["message"]
+    message_id = message["message_id"]
+
+    if user_state.get("current_mode") != "in_exercise" or message_id != user_state.get("exercise_message_id"):
+        # A button on an old message, after the user moved on or got a newer exercise
+        answer_callback_query(chat_id, callback_query["id"])
+        return
+
+    if action.startswith("answer:"):
+        expected_answer_index_str = pop_expected_answer(chat_id)
+        if not expected_answer_index_str:
+            # Already answered (a double tap)
+            answer_callback_query(chat_id, callback_query["id"])
+            return
+        if action.split(":", 1)[1] == expected_answer_index_str:
+            answer_callback_query(chat_id, callback_query["id"], text=get_text(native_lang, "correct"))
+            result_text = get_text(native_lang, "correct")
+        else:
+            answer_callback_query(chat_id, callback_query["id"], text=get_text(native_lang, "incorrect"))
+            result_text = get_text(native_lang, "incorrect_with_explanation",
+                                   explanation=user_state.get("current_explanation", ""))
+        edit_message_text(chat_id, message_id, f"{message.get('text', '')}\n\n{result_text}",
+                          reply_markup=get_exercise_result_inline_keyboard(native_lang))
+
+    elif action == "next":
+        answer_callback_query(chat_id, callback_query["id"])
+        exercise_data = await exercise_pool.get_exercise(
+            learn_language=user_state.get("learn_language"),
+            native_language=native_lang,
+            level=user_state.get("level"),
+            topic=user_state.get("topic"),
+            exclude_hashes=[],
+            pictures=False,  # The bot sends no image with the question
+        )
+        if exercise_data and not exercise_data.get("error"):
+            send_exercise(chat_id, exercise_data, native_lang, message_id=message_id)
+        else:
+            send_message(chat_id, get_text(native_lang, "error_generating", error=exercise_data.get('error')))
+
+    elif action == "voice":
+        answer_callback_query(chat_id, callback_query["id"])
+        # Question is in native language, so use native_lang for TTS
+        send_voice(chat_id, user_state.get("current_question", ""), lang=native_lang)
+
+    elif action == "restart":
+        answer_callback_query(chat_id, callback_query["id"])
+        send_message(chat_id, get_text(native_lang, "welcome"), reply_markup=get_language_keyboard(["russian", "english", "korean", "uzbek"], "choose_native_language"))
+        set_state(chat_id, current_mode="choose_native_language")
+
+    else:
+        answer_callback_query(chat_id, callback_query["id"])
+
+
+def update_chat_id(data: dict):
+    """The chat an update belongs to, or None for updates without one."""
+    if "message" in data:
+        return data["message"]["chat"]["id"]
+    if "callback_query" in data:
+        return data["callback_query"]["message"]["chat"]["id"]
+    return None
+
 
 @router.post("/webhook")
 async def telegram_webhook(req: Request):
+    """
+    Validates an update, queues it and acknowledges it right away. The work (LLM calls,
+    TTS, replies) happens in the update queue's workers, so Telegram never times out
+    and redelivers a slow update.
+    """
+    if not BOT_TOKEN:
+        logger.error("TELEGRAM_BOT_TOKEN is not set!")
+        return {"ok": False, "error": "Bot token not configured"}
+
     try:
-        if not BOT_TOKEN:
-            logger.error("TELEGRAM_BOT_TOKEN is not set!")
-            return {"ok": False, "error": "Bot token not configured"}
-        
         data = await req.json()
-        logger.info(f"Full Telegram payload: {data}")
-
-        chat_id = None
-        message = None
-        callback_query = None
-
-        if "message" in data:
-            message = data["message"]
-            chat_id = message["chat"]["id"]
-        elif "callback_query" in data:
-            callback_query = data["callback_query"]
-            chat_id = callback_query["message"]["chat"]["id"]
-        elif "my_chat_member" in data:
-            logger.info(f"Bot status changed in chat: {data['my_chat_member']['chat']['id']}")
-            return {"ok": True}
+        chat_id = update_chat_id(data)
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Malformed Telegram update: {e}")
+        return {"ok": False, "error": "Malformed update"}
+    logger.info(f"Full Telegram payload: {data}")
+
+    if "my_chat_member" in data:
+        logger.info(f"Bot status changed in chat: {data['my_chat_member']['chat']['id']}")
+        return {"ok": True}
+    if not chat_id:
+        logger.warning(f"Could not extract chat_id from payload: {data}")
+        return {"ok": False, "error": "No chat_id found"}
+
+    update_id = data.get("update_id")
+    if update_dedup.seen(update_id):
+        # A redelivery of an update already being handled; acknowledge it and do nothing
+        logger.info(f"Dropping duplicate Telegram update {update_id} for chat {chat_id}.")
+        return {"ok": True}
+
+    if not update_queue.submit(chat_id, data):
+        # Backpressure: Telegram redelivers the update later, and the redelivery must not count as a duplicate
+        update_dedup.forget(update_id)
+        logger.warning(f"Telegram update queue is full ({update_queue.depth}); refusing update for chat {chat_id}.")
+        return JSONResponse({"ok": False, "error": "Busy"}, status_code=503, headers={"Retry-After": "5"})
+    return {"ok": True}
 
-        if not chat_id:
-            logger.warning(f"Could not extract chat_id from payload: {data}")
-            return {"ok": False, "error": "No chat_id found"}
+
+async def process_update(data: dict):
+    """Handles one Telegram update: runs the conversation step and sends the replies."""
+    chat_id = update_chat_id(data)
+    try:
+        message = data.get("message")
+        callback_query = data.get("callback_query")
 
         user_state = get_state(chat_id)
         if user_state is None:
@@ -213,6 +348,10 @@ async def telegram_webhook(req: Request):
         # Get native language properly, defaulting to 'uzbek' if not set
         native_lang = user_state.get("native_language", "uzbek")
         
+        if callback_query:
+            await handle_exercise_callback(chat_id, callback_query, user_state, native_lang)
+            return
+
         user_message_text = message["text"] if message and "text" in message else ""
         
         # --- Handle commands ---
@@ -329,7 +468,6 @@ async def telegram_webhook(req: Request):
             learn_lang = user_state.get("learn_language")
             native_lang = user_state.get("native_language", "uzbek")
             
-            valid_levels = ["beginner", "intermediate", "advanced"]
             level_map = {
                 "бошланғич": "beginner", "boshlang'ich": "beginner", "beginner": "beginner",
                 "ўрта": "intermediate", "o'rta": "intermediate", "middle": "intermediate", "intermediate": "intermediate",
@@ -369,31 +507,21 @@ async def telegram_webhook(req: Request):
                 set_state(chat_id, topic=selected_topic, current_mode="in_exercise")
                 
                 msg_text = get_text(native_lang, "topic_selected", topic=selected_topic)
-                send_message(chat_id, msg_text)
+                # Inline mode answers with buttons on the exercise; hide the topic keyboard
+                send_message(chat_id, msg_text, reply_markup={"remove_keyboard": True} if TELEGRAM_INLINE_MODE else None)
                 send_voice(chat_id, msg_text, lang=native_lang)
                 
-                # Get native language for question generation (using variable we already have)
-                exercise_data = await generate_multiple_choice_exercise(
+                # Pooled exercise if one is ready, live generation otherwise
+                exercise_data = await exercise_pool.get_exercise(
                     learn_language=learn_lang,
                     native_language=native_lang,
                     level=level, 
                     topic=selected_topic,
-                    exclude_hashes=[] 
+                    exclude_hashes=[],
+                    pictures=False,
                 )
                 if exercise_data and not exercise_data.get("error"):
-                    question_label = get_text(native_lang, "question_label")
-                    question_text = f"{question_label}: {exercise_data['question']}"
-                    options_text_list = [f"{idx+1}. {opt}" for idx, opt in enumerate(exercise_data['options'])]
-                    options_text_combined = "\n".join(options_text_list)
-                    
-                    send_message(chat_id, question_text)
-                    # Question is now in native language, so use native_lang for TTS
-                    send_voice(chat_id, exercise_data['question'], lang=native_lang)
-                    
-                    send_message(chat_id, options_text_combined, reply_markup=get_exercise_options_keyboard(exercise_data['options']))
-
-                    set_expected_answer(chat_id, str(exercise_data['correct_answer_index'] + 1)) 
-                    set_state(chat_id, current_explanation=exercise_data.get("explanation", ""))
+                    send_exercise(chat_id, exercise_data, native_lang)
                 else:
                     error_msg = exercise_data.get('error', 'Unknown error')
                     send_message(chat_id, get_text(native_lang, "error_generating", error=error_msg))
@@ -480,26 +608,17 @@ async def telegram_webhook(req: Request):
                      learn_lang = user_state.get("learn_language")
                      level = user_state.get("level")
                      
-                     exercise_data = await generate_multiple_choice_exercise(
+                     exercise_data = await exercise_pool.get_exercise(
                         learn_language=learn_lang,
                         native_language=native_lang,
                         level=level, 
                         topic=topic,
-                        exclude_hashes=[] 
+                        exclude_hashes=[],
+                        pictures=False,
                      )
                      
                      if exercise_data and not exercise_data.get("error"):
-                        question_label = get_text(native_lang, "question_label")
-                        question_text = f"{question_label}: {exercise_data['question']}"
-                        options_text_list = [f"{idx+1}. {opt}" for idx, opt in enumerate(exercise_data['options'])]
-                        options_text_combined = "\n".join(options_text_list)
-                        
-                        send_message(chat_id, question_text)
-                        send_voice(chat_id, exercise_data['question'], lang=native_lang)
-                        send_message(chat_id, options_text_combined, reply_markup=get_exercise_options_keyboard(exercise_data['options']))
-                        
-                        set_expected_answer(chat_id, str(exercise_data['correct_answer_index'] + 1)) 
-                        set_state(chat_id, current_explanation=exercise_data.get("explanation", ""))
+                        send_exercise(chat_id, exercise_data, native_lang)
                      else:
                         send_message(chat_id, get_text(native_lang, "error_generating", error=exercise_data.get('error')))
                      return {"ok": True}
@@ -613,7 +732,7 @@ async def telegram_webhook(req: Request):
                             
                             caption = f"{word}\n({translation})"
                             
-                            if image_url:
+                            if image_url and not item.get("image_placeholder"):
                                 send_photo(chat_id, image_url, caption)
                             else:
                                 send_message(chat_id, caption)
@@ -631,7 +750,7 @@ async def telegram_webhook(req: Request):
                             
                             caption = f"{word}\n({translation})"
                             
-                            if image_url:
+                            if image_url and not pair.get("image_placeholder"):
                                 send_photo(chat_id, image_url, caption)
                             else:
                                 send_message(chat_id, caption)
@@ -649,7 +768,7 @@ async def telegram_webhook(req: Request):
                             
                             send_message(chat_id, f"❓ {question_text}")
                             
-                            if image_url:
+                            if image_url and not first_q.get("image_placeholder"):
                                 send_photo(chat_id, image_url)
                             
                             options_text = "\n".join([f"{i+1}. {opt}" for i, opt in enumerate(options)])
@@ -682,20 +801,23 @@ async def telegram_webhook(req: Request):
                          reply_markup={"remove_keyboard": True})
 
     except Exception as e:
-        logger.error(f"An unexpected error occurred in telegram_webhook: {e}", exc_info=True)
+        logger.error(f"An unexpected error occurred while processing a Telegram update: {e}", exc_info=True)
         send_message(chat_id, "Uzr, kutilmagan xato yuz berdi. Iltimos, keyinroq urinib ko'ring.",
                      reply_markup={"remove_keyboard": True})
-    
-    return {"ok": True}
+    finally:
+        # Replies were sent concurrently with the work above; finish them before the chat's next update
+        await telegram_client.flush(chat_id)
+
+
+update_queue = UpdateQueue(process_update)
+
 
 def send_photo(chat_id, photo_url, caption=""):
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto"
-    payload = {"chat_id": chat_id, "photo": photo_url, "caption": caption}
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to send Telegram photo: {e}", exc_info=True)
+    """Queues a photo by URL; Telegram downloads it from this app. Returns the send task."""
+    if photo_url.startswith("/"):
+        # Images from the image store are app-relative URLs
+        photo_url = f"{PUBLIC_URL}{photo_url}"
+    return telegram_client.send_photo(chat_id, photo_url, caption)
 
 
 def send_game_options(chat_id, game_data):
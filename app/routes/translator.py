@@ -13,12 +13,12 @@ class TranslationResponse(BaseModel):
     translated_text: str
 
 @router.post("/translate", response_model=TranslationResponse)
-def translate(request: TranslationRequest):
+async def translate(request: TranslationRequest):
     """
     Translates a piece of text from a source language to a target language.
     """
     try:
-        translated = content_generator.translate_text(
+        translated = await content_generator.translate_text(
             text=request.text,
             source_lang=request.source_lang,
             target_lang=request.target_lang
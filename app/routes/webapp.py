@@ -1,45 +1,28 @@
 import logging # NEW: Import logging
 import os
-import io
 import json
-import re
+import urllib.parse
 from fastapi import APIRouter, Request, Form
-from fastapi.responses import HTMLResponse, StreamingResponse, Response
+from fastapi.responses import HTMLResponse, StreamingResponse, Response, FileResponse
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
-from app.ai_content import translate_text, generate_multiple_choice_exercise, generate_image # Removed generate_exercise
+from app.ai_content import translate_text, generate_image, stream_multiple_choice_exercise
 from app.services.session import get_or_create_web_user
 from app.services.progress import get_completed_exercise_hashes, mark_exercise_as_completed, _hash_exercise
-from gtts import gTTS
+from app.services.exercise_pool import exercise_pool, pool_key
+from app.services.tts_cache import tts_cache
+from app.services.image_store import IMMUTABLE_CACHE_CONTROL
 
 logger = logging.getLogger(__name__) # NEW: Initialize logger
 
 router = APIRouter()
 
-def clean_text_for_tts(text: str) -> str:
-    """Removes emojis and other non-verbal characters for cleaner TTS output."""
-    if not isinstance(text, str):
-        return ""
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F700-\U0001F77F"  # alchemical symbols
-        "\U0001F780-\U0001F7FF"  # Geometric Shapes Extended
-        "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
-        "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
-        "\U0001FA00-\U0001FA6F"  # Chess Symbols
-        "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
-        "\U00002702-\U000027B0"  # Dingbats
-        "\U000024C2-\U0001F251" 
-        "]+",
-        flags=re.UNICODE,
-    )
-    cleaned_text = emoji_pattern.sub(r'', text)
-    # Removing aggressive cleaning that was stripping non-Latin characters
-    # cleaned_text = re.sub(r'[^\w\s]', '', cleaned_text)
-    return cleaned_text.strip()
+# Serve the exercise page shell first and push the exercise over SSE (also per request via ?stream=1)
+EXERCISE_PAGE_STREAMING = os.getenv("EXERCISE_PAGE_STREAMING", "0") == "1"
+
+# Hash of the last streamed exercise per web session id, consumed by /mark_completed
+_streamed_exercise_hashes: dict[str, str] = {}
+STREAMED_HASHES_MAX = 10000
 
 # Set up the template directory.
 TEMPLATE_DIR = Path(__file__).resolve().parents[2] / "templates"
@@ -129,28 +112,37 @@ async def get_topics_page(request: Request, native_lang_slug: str, learn_lang_sl
     return templates.TemplateResponse("topics.html", context)
 
 
+def _sse(event: str, data) -> str:
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 @router.get("/learn/{native_lang_slug}/{learn_lang_slug}/{level}/{topic}", response_class=HTMLResponse)
-async def get_exercise_page(request: Request, native_lang_slug: str, learn_lang_slug: str, level: str, topic: str):
+async def get_exercise_page(request: Request, native_lang_slug: str, learn_lang_slug: str, level: str, topic: str, stream: bool = EXERCISE_PAGE_STREAMING):
     """
     Serves the main exercise page.
     This is where the AI-generated content will be displayed.
+    In streaming mode (`?stream=1`) the page shell is returned immediately and the
+    exercise and image are pushed over Server-Sent Events from `/events`.
     """
     session_id = request.cookies.get("session_id")
     user, new_session_id = get_or_create_web_user(session_id)
     
-    # Get completed exercises for this user
-    completed_hashes = get_completed_exercise_hashes(user.id)
-    
-    # Generate the exercise content, excluding completed ones and based on the topic
-    # Questions will be in native language, answers in the language being learned
-    exercise_data = await generate_multiple_choice_exercise(learn_lang_slug, native_lang_slug, level, topic, list(completed_hashes))
-    
+    exercise_data = None
     image_url = None
-    # If the exercise was generated successfully, try to generate an image for it
-    if exercise_data and not exercise_data.get("error"):
-        visual_prompt = exercise_data.get("visual_prompt")
-        if visual_prompt:
-            image_url = await generate_image(visual_prompt)
+    if not stream:
+        # Get completed exercises for this user
+        completed_hashes = get_completed_exercise_hashes(user.id)
+        
+        # Take a pre-generated exercise from the pool (live generation only on a pool miss),
+        # excluding completed ones. Questions are in native language, answers in the language being learned
+        exercise_data = await exercise_pool.get_exercise(learn_lang_slug, native_lang_slug, level, topic, list(completed_hashes))
+        
+        # If the exercise was generated successfully, try to generate an image for it
+        if exercise_data and not exercise_data.get("error"):
+            visual_prompt = exercise_data.get("visual_prompt")
+            if visual_prompt:
+                image_url = await generate_image(visual_prompt)
 
     language_map = {
         "russian": "Rus tili",
@@ -173,13 +165,20 @@ async def get_exercise_page(request: Request, native_lang_slug: str, learn_lang_
         "level_slug": level,
         "exercise": exercise_data,
         "image_url": image_url,
-        "topic": topic # Pass topic to template
+        "topic": topic, # Pass topic to template
+        "streaming": stream,
+        "events_url": f"/learn/{native_lang_slug}/{learn_lang_slug}/{level}/{urllib.parse.quote(topic)}/events",
     }
     
     # Store the hash of the current exercise in the user's session to mark it as completed later
     if exercise_data and not exercise_data.get("error"):
         current_hash = _hash_exercise(exercise_data)
         request.session['current_exercise_hash'] = current_hash
+        if session_id:
+            _streamed_exercise_hashes.pop(session_id, None)
+    elif stream:
+        # The exercise arrives over /events, which records its hash per session id
+        request.session.pop('current_exercise_hash', None)
 
     response = templates.TemplateResponse("exercise.html", context)
     # If a new session was created, set the cookie in the user's browser
@@ -188,6 +187,61 @@ async def get_exercise_page(request: Request, native_lang_slug: str, learn_lang_
     
     return response
 
+@router.get("/learn/{native_lang_slug}/{learn_lang_slug}/{level}/{topic}/events")
+async def get_exercise_events(request: Request, native_lang_slug: str, learn_lang_slug: str, level: str, topic: str):
+    """
+    Server-Sent Events feed for the streaming exercise page.
+    Emits `question` and `options` as soon as they are parsed from DeepSeek's stream,
+    then `exercise` (with the answer), `image` when it arrives, and finally `done`
+    (or `failed` if no exercise could be produced).
+    """
+    session_id = request.cookies.get("session_id")
+    user, _ = get_or_create_web_user(session_id)
+    completed_hashes = list(get_completed_exercise_hashes(user.id))
+
+    async def events():
+        exercise_data = (
+            exercise_pool.offline_exercise(learn_lang_slug, native_lang_slug, level, topic, completed_hashes)
+            or exercise_pool.pop(pool_key(learn_lang_slug, native_lang_slug, level, topic), completed_hashes)
+        )
+        if exercise_data is None:
+            async for field, value in stream_multiple_choice_exercise(learn_lang_slug, native_lang_slug, level, topic, completed_hashes):
+                if field == "exercise":
+                    exercise_data = value
+                elif field == "error":
+                    exercise_data = exercise_pool.offline_exercise(
+                        learn_lang_slug, native_lang_slug, level, topic, completed_hashes, fallback=True
+                    )
+                    if exercise_data is None:
+                        yield _sse("failed", {"error": value})
+                        return
+                    # The page may already show a partial question; the full exercise replaces it
+                    yield _sse("question", {"question": exercise_data["question"]})
+                    yield _sse("options", {"options": exercise_data["options"]})
+                else:
+                    yield _sse(field, {field: value})
+        else:
+            yield _sse("question", {"question": exercise_data["question"]})
+            yield _sse("options", {"options": exercise_data["options"]})
+
+        yield _sse("exercise", exercise_data)
+        # Headers (and so the session cookie) are already sent; remember the hash per session id instead
+        if session_id:
+            _streamed_exercise_hashes[session_id] = _hash_exercise(exercise_data)
+            while len(_streamed_exercise_hashes) > STREAMED_HASHES_MAX:
+                _streamed_exercise_hashes.pop(next(iter(_streamed_exercise_hashes)))
+
+        visual_prompt = exercise_data.get("visual_prompt")
+        image_url = await generate_image(visual_prompt) if visual_prompt else None
+        yield _sse("image", {"image_url": image_url})
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/translator", response_class=HTMLResponse)
 async def get_translator_page(request: Request):
     """Serves the translator page."""
@@ -203,7 +257,8 @@ async def mark_completed(request: Request):
     user, _ = get_or_create_web_user(session_id)
     
     # We retrieve the hash from the server-side session for security
-    current_hash = request.session.get('current_exercise_hash')
+    # (streamed exercises are tracked per session id, see get_exercise_events; that one is the latest if present)
+    current_hash = _streamed_exercise_hashes.pop(session_id, None) or request.session.get('current_exercise_hash')
 
     if user and current_hash:
         # This is a simplified way to pass the data to be marked.
@@ -239,37 +294,36 @@ async def handle_translation(request: Request):
     return templates.TemplateResponse("translator.html", context)
 
 @router.get("/tts")
-async def text_to_speech(text: str, lang: str = 'en'):
+async def text_to_speech(request: Request, text: str, lang: str = 'en', slow: bool = True):
     """
-    Generates an audio file from text and returns it as a streaming response.
-    Supports 'en', 'ru', 'ko', and 'uz'.
+    Returns the spoken audio (MP3) for a text. Supports 'en', 'ru', 'ko' and 'uz' (codes or names).
+    Audio comes from the disk TTS cache: a phrase is synthesized once and then served as a
+    file with an ETag, immutable caching and Range support.
     """
-    lang_to_use = lang if lang in ['en', 'ru', 'ko'] else 'en'
-    
-    # Clean the text before generating audio
-    cleaned_text = clean_text_for_tts(text)
-
-    if not cleaned_text:
-        logger.warning("No text to speak after cleaning.") # Changed print to logger.warning
-        return Response(status_code=204) # Return No Content if nothing to speak
-
     try:
-        tts = gTTS(text=cleaned_text, lang=lang_to_use, slow=True)
-        mp3_fp = io.BytesIO()
-        tts.write_to_fp(mp3_fp)
-        mp3_fp.seek(0)
-        return StreamingResponse(mp3_fp, media_type="audio/mpeg")
+        cached = await tts_cache.get(text, lang, slow)
     except Exception as e:
         logger.error(f"Failed to generate TTS audio: {e}", exc_info=True) # Added exc_info
         return Response(status_code=500, content="Failed to generate audio") # Return proper error
 
+    if cached is None:
+        logger.warning("No text to speak after cleaning.") # Changed print to logger.warning
+        return Response(status_code=204) # Return No Content if nothing to speak
+
+    key, path = cached
+    # The URL fully determines the audio, so browsers may keep it forever
+    headers = {"ETag": f'"{key}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="audio/mpeg", headers=headers)
+
 @router.get("/play/{game_type}/{native_lang_slug}/{learn_lang_slug}/{level}/{topic}", response_class=HTMLResponse)
 async def play_game(request: Request, game_type: str, native_lang_slug: str, learn_lang_slug: str, level: str, topic: str):
     """
     Serves the interactive game page.
     Generates game data and images, then renders the game template.
     """
-    from app.game_generator import generate_interactive_game, generate_game_images
+    from app.game_generator import generate_interactive_game, enqueue_game_images
     
     # Generate base game content
     game_data = await generate_interactive_game(learn_lang_slug, native_lang_slug, level, topic, game_type)
@@ -277,13 +331,8 @@ async def play_game(request: Request, game_type: str, native_lang_slug: str, lea
     if "error" in game_data:
         return templates.TemplateResponse("error.html", {"request": request, "error": game_data["error"]})
 
-    # Generate images (this might take a while, consider async loading in future)
-    try:
-        game_data = await generate_game_images(game_data)
-    except Exception as e:
-        logger.error(f"Error generating images: {e}")
-        # Proceed without images or with placeholders if failed? 
-        # For now, we continue, templates should handle missing images.
+    # Images are generated by the image job queue; the page renders now and swaps them in as they finish
+    game_data = enqueue_game_images(game_data)
 
     language_map = {
         "russian": "Rus tili",
@@ -2,6 +2,9 @@ from openai import OpenAI
 from app.core.config import DEEPSEEK_API_KEY
 import os
 
+# The lesson intro (no user input) is the same for every child, so it is cached
+LLM_CACHE_TTL_TUTOR_INTRO = float(os.getenv("LLM_CACHE_TTL_TUTOR_INTRO", str(24 * 3600)))
+
 # Initialize client safely to prevent startup crashes
 def get_deepseek_client():
     # Robustly get the key from multiple possible env vars
@@ -110,7 +113,7 @@ from app.services.tutor_prompt import build_tutor_prompt
 from app.services.deepseek_client import ask_deepseek
 
 
-def tutor_reply(
+async def tutor_reply(
     age_group: str,
     language_pair: str,
     level: int,
@@ -126,7 +129,7 @@ def tutor_reply(
     )
 
     try:
-        return ask_deepseek(prompt)
+        return await ask_deepseek(prompt, cache_ttl=None if user_input else LLM_CACHE_TTL_TUTOR_INTRO, site="tutor")
     except Exception as e:
         print(f"Tutor DeepSeek error: {e}")
         return "⚠️ Ошибка связи с AI. Попробуйте позже."
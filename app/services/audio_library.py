@@ -0,0 +1,69 @@
+import os
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CONTENT_DIR = Path(__file__).resolve().parents[2] / "content"
+# Pre-rendered speech for bot strings and vocabulary, built by scripts/build_audio.py and shipped with the app
+AUDIO_LIBRARY_DIR = Path(os.getenv("AUDIO_LIBRARY_DIR", str(CONTENT_DIR / "tts")))
+MANIFEST_NAME = "manifest.json"
+
+
+class AudioLibrary:
+    """
+    Pre-rendered MP3s keyed like the TTS cache (cleaned text, voice language, speed).
+
+    manifest.json maps each key to its file, so /tts and send_voice serve known
+    phrases on a cold deployment without calling gTTS.
+    """
+
+    def __init__(self, directory: Path = AUDIO_LIBRARY_DIR):
+        self.directory = Path(directory)
+        self._entries: dict[str, dict] = {}
+        self._manifest_mtime: float | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST_NAME
+
+    def entries(self) -> dict[str, dict]:
+        # Reloaded when the build script rewrites the manifest
+        try:
+            mtime = self.manifest_path.stat().st_mtime
+        except FileNotFoundError:
+            self._entries, self._manifest_mtime = {}, None
+            return self._entries
+        if mtime != self._manifest_mtime:
+            try:
+                manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+                self._entries = manifest.get("entries", {})
+                self._manifest_mtime = mtime
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read audio manifest {self.manifest_path}: {e}")
+        return self._entries
+
+    def path_for_key(self, key: str) -> Path | None:
+        """The pre-rendered MP3 for a TTS key, or None."""
+        entry = self.entries().get(key)
+        path = self.directory / entry["file"] if entry is not None else None
+        if path is None or not path.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+
+audio_library = AudioLibrary()
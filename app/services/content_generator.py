@@ -1,7 +1,13 @@
 from app.services.deepseek_client import ask_deepseek
+import os
 import json
 
-def generate_topics(pair: str, level: int):
+# Persistent LLM cache TTLs (seconds) for the prompts below; 0 disables caching
+LLM_CACHE_TTL_TOPICS = float(os.getenv("LLM_CACHE_TTL_TOPICS", str(24 * 3600)))
+LLM_CACHE_TTL_TOPIC_GAMES = float(os.getenv("LLM_CACHE_TTL_TOPIC_GAMES", str(6 * 3600)))
+LLM_CACHE_TTL_TRANSLATION = float(os.getenv("LLM_CACHE_TTL_TRANSLATION", str(30 * 24 * 3600)))
+
+async def generate_topics(pair: str, level: int):
     """
     Generate a list of learning topics for a given language pair and level.
     """
@@ -14,14 +20,14 @@ def generate_topics(pair: str, level: int):
     """
     
     try:
-        response = ask_deepseek(prompt)
+        response = await ask_deepseek(prompt, cache_ttl=LLM_CACHE_TTL_TOPICS)
         return json.loads(response)
     except Exception as e:
         print(f"Error generating topics: {e}")
         # Return a fallback list if the API fails
         return ["Animals", "Colors", "Family", "Food", "Toys", "Numbers", "Clothes"]
 
-def generate_games_for_topic(pair: str, level: int, topic: str):
+async def generate_games_for_topic(pair: str, level: int, topic: str):
     """
     Generate a set of 10-15 exercises/games for a specific topic.
     """
@@ -45,20 +51,20 @@ def generate_games_for_topic(pair: str, level: int, topic: str):
     """
 
     try:
-        response = ask_deepseek(prompt)
+        response = await ask_deepseek(prompt, cache_ttl=LLM_CACHE_TTL_TOPIC_GAMES)
         return json.loads(response)
     except Exception as e:
         print(f"Error generating games: {e}")
         return [{"error": "Could not generate games at the moment."}]
 
-def translate_text(text: str, source_lang: str, target_lang: str):
+async def translate_text(text: str, source_lang: str, target_lang: str):
     """
     Translate text using DeepSeek.
     """
     prompt = f"Translate the following text from {source_lang} to {target_lang}. Return only the translated text:\n\n{text}"
     
     try:
-        return ask_deepseek(prompt)
+        return await ask_deepseek(prompt, cache_ttl=LLM_CACHE_TTL_TRANSLATION)
     except Exception as e:
         print(f"Error translating text: {e}")
         return "Translation failed."
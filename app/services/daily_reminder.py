@@ -1,54 +1,92 @@
-import os
-import requests
+import json
+import asyncio
+import hashlib
+import mimetypes
 from datetime import date
+from functools import lru_cache
+from pathlib import Path
 from app.services.character_engine import get_reaction
+from app.services.tg_file_registry import media_key
+from app.services.telegram_client import telegram_client
+from app.services.tg_rate_limiter import PRIORITY_BROADCAST
 
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TG_API = f"https://api.telegram.org/bot{BOT_TOKEN}"
+CONTENT_DIR = Path(__file__).resolve().parents[2] / "content"
 
 
-def send_character_message(chat_id: int, mood: str, phrase: str = None):
-    # find audio/image from capy manifest
+@lru_cache(maxsize=64)
+def _asset_digest(path: Path, mtime_ns: int, size: int) -> bytes:
+    # Keyed by mtime and size, so an edited asset is hashed (and uploaded) again
+    return hashlib.sha256(path.read_bytes()).digest()
+
+
+def _asset_key(field: str, path: Path) -> str:
+    """Registry key of a character asset. The file is hashed once per version (mtime and size)."""
+    stat = path.stat()
+    return media_key(field, _asset_digest(path, stat.st_mtime_ns, stat.st_size))
+
+
+def _send_asset(chat_id: int, method: str, field: str, path: Path, key: str, data: dict | None = None):
+    """
+    Queues a character asset, uploading the file only the first time (then by Telegram file_id).
+    The file is only read when it has to be uploaded.
+    """
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return telegram_client.send_media(chat_id, method, field, key, lambda: (path.name, path.read_bytes(), content_type),
+                                      data=data, priority=PRIORITY_BROADCAST)
+
+
+def _character_sends(mood: str, phrase: str = None) -> list[dict]:
+    """The sends of a character message, worked out from the manifest (blocking: reads and hashes files)."""
+    sends = []
+    # manifest and asset paths are relative to content/
+    manifest_path = CONTENT_DIR / "characters" / "capybara" / "manifest.json"
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    emo = manifest["emotions"].get(mood, {})
+    audio = emo.get("audio")
+    # "image" is the SVG the web app shows; Telegram photos must be raster ("photo")
+    photo = emo.get("photo")
+    text = phrase or (emo.get("phrases") or [None])[0]
+
+    # send image
+    if photo:
+        local_img = CONTENT_DIR / photo
+        if local_img.exists():
+            sends.append({"method": "sendPhoto", "field": "photo", "path": local_img,
+                          "key": _asset_key("photo", local_img)})
+
+    # send audio if exists, with the phrase as its caption
+    if audio:
+        local_audio = CONTENT_DIR / audio
+        if local_audio.exists():
+            sends.append({"method": "sendVoice", "field": "voice", "path": local_audio,
+                          "key": _asset_key("voice", local_audio), "data": {"caption": text} if text else None})
+            return sends
+
+    # fallback to TTS via sendMessage (short phrase)
+    if text:
+        sends.append({"text": text})
+    return sends
+
+
+async def send_character_message(chat_id: int, mood: str, phrase: str = None):
+    # find audio/image from capy manifest; file reads and hashing stay off the event loop
     try:
-        # manifest path relative to content
-        import json
-        from pathlib import Path
-        manifest_path = Path(__file__).resolve().parents[1] / "content" / "characters" / "capybara" / "manifest.json"
-        with open(manifest_path, encoding="utf-8") as f:
-            manifest = json.load(f)
-        emo = manifest["emotions"].get(mood, {})
-        audio = emo.get("audio")
-        image = emo.get("image")
-        text = phrase or (emo.get("phrases") or [None])[0]
-
-        # send image
-        if image:
-            local_img = Path(__file__).resolve().parents[1] / image
-            if local_img.exists():
-                with open(local_img, "rb") as photo:
-                    requests.post(f"{TG_API}/sendPhoto", data={"chat_id": chat_id}, files={"photo": photo})
-
-        # send audio if exists
-        if audio:
-            local_audio = Path(__file__).resolve().parents[1] / audio
-            if local_audio.exists():
-                with open(local_audio, "rb") as a:
-                    requests.post(f"{TG_API}/sendVoice", data={"chat_id": chat_id}, files={"voice": a})
-                return
-
-        # fallback to TTS via sendMessage (short phrase)
-        if text:
-            requests.post(f"{TG_API}/sendMessage", json={"chat_id": chat_id, "text": text})
+        sends = await asyncio.to_thread(_character_sends, mood, phrase)
     except Exception:
         # best-effort: plain message
-        if phrase:
-            requests.post(f"{TG_API}/sendMessage", json={"chat_id": chat_id, "text": phrase})
+        sends = [{"text": phrase}] if phrase else []
+    for send in sends:
+        if "text" in send:
+            telegram_client.send_message(chat_id, send["text"], priority=PRIORITY_BROADCAST)
+        else:
+            _send_asset(chat_id, **send)
 
 
-def send_daily_reminder_for_user(user, force=False):
-    """Send daily reminder to a user if they have not been active today.
+async def send_daily_reminder_for_user(user, force=False):
+    """Queue a daily reminder for a user if they have not been active today.
 
-    Returns True if a message was sent.
+    Returns True if a message was queued.
     """
     today = date.today()
     if user.last_activity_date == today and not force:
@@ -60,5 +98,5 @@ def send_daily_reminder_for_user(user, force=False):
     reaction = get_reaction("capybara", "encourage" if mood == "encourage" else "win")
     phrase = reaction.get("phrase") if reaction else None
 
-    send_character_message(user.telegram_id, mood if mood != "encourage" else "encourage", phrase)
+    await send_character_message(user.telegram_id, mood if mood != "encourage" else "encourage", phrase)
     return True
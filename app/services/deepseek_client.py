@@ -1,25 +1,75 @@
 import os
-import requests
+import asyncio
+from app.services.llm_cache import llm_cache
+from app.services.http_client import get_http_client, build_timeout, close_http_client
+from app.services.resilience import deepseek_upstream, CircuitOpenError, is_upstream_failure
 
 print("✅ [deepseek_client.py] START: Module is being imported.")
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
+DEEPSEEK_CHAT_URL = "https://api.deepseek.com/chat/completions"
+# Read timeout for a single prompt; connect/pool timeouts come from the shared client
+DEEPSEEK_CLIENT_TIMEOUT = float(os.getenv("DEEPSEEK_CLIENT_TIMEOUT", "60"))
 
 if not DEEPSEEK_API_KEY:
     raise ValueError("🔴 CRITICAL: DEEPSEEK_API_KEY environment variable not set. The application cannot start.")
 
-def ask_deepseek(prompt: str):
-    response = requests.post(
-        "https://api.deepseek.com/chat/completions",
+
+async def _send(payload: dict, timeout: float) -> str:
+    client = get_http_client()
+    response = await client.post(
+        DEEPSEEK_CHAT_URL,
         headers={
             "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
             "Content-Type": "application/json"
         },
-        json={
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7
-        }
+        json=payload,
+        timeout=build_timeout(timeout),
     )
+    response.raise_for_status()
     return response.json()["choices"][0]["message"]["content"]
+
+
+async def ask_deepseek(prompt: str, cache_ttl: float | None = None, timeout: float = DEEPSEEK_CLIENT_TIMEOUT,
+                       site: str = "content") -> str:
+    """
+    Sends a single-prompt chat request and returns the reply text.
+    Pass `cache_ttl` (seconds) to serve repeated prompts from the persistent LLM cache.
+    Uses the shared pooled HTTP client and the DeepSeek circuit breaker, so the wait is
+    bounded by `timeout` and calls fail fast while DeepSeek is down.
+    """
+    payload = {
+        "model": "deepseek-chat",
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7
+    }
+    if cache_ttl:
+        cached = llm_cache.get(payload)
+        if cached is not None:
+            return cached
+
+    try:
+        content = await deepseek_upstream.call(site, lambda: _send(payload, timeout))
+    except Exception as e:
+        if cache_ttl and (isinstance(e, CircuitOpenError) or is_upstream_failure(e)):
+            stale = llm_cache.get(payload, stale_ok=True)
+            if stale is not None:
+                return stale
+        raise
+
+    if cache_ttl:
+        llm_cache.set(payload, content, cache_ttl)
+    return content
+
+
+def ask_deepseek_sync(prompt: str, cache_ttl: float | None = None) -> str:
+    """Blocking wrapper for command-line scripts that have no event loop of their own."""
+    async def run():
+        try:
+            return await ask_deepseek(prompt, cache_ttl=cache_ttl)
+        finally:
+            # The pooled client is bound to this loop; the next call gets a fresh one
+            await close_http_client()
+
+    return asyncio.run(run())
@@ -0,0 +1,251 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+from app.services.progress import _hash_exercise
+from app.services.offline_exercises import OFFLINE_EXERCISE_LEVELS, generate_offline_exercise
+
+logger = logging.getLogger(__name__)
+
+# Each (learn, native, level, topic) key is topped up to the low-water mark in the background
+EXERCISE_POOL_LOW_WATER = int(os.getenv("EXERCISE_POOL_LOW_WATER", "3"))
+EXERCISE_POOL_MAX_SIZE = int(os.getenv("EXERCISE_POOL_MAX_SIZE", "10"))
+# Only the most recently requested keys are kept warm
+EXERCISE_POOL_MAX_KEYS = int(os.getenv("EXERCISE_POOL_MAX_KEYS", "200"))
+EXERCISE_POOL_REFILL_CONCURRENCY = int(os.getenv("EXERCISE_POOL_REFILL_CONCURRENCY", "2"))
+# Refills ask DeepSeek for several exercises in one call
+EXERCISE_POOL_BATCH_SIZE = int(os.getenv("EXERCISE_POOL_BATCH_SIZE", "5"))
+# After a failed refill a key is left alone for a while so a DeepSeek outage is not hammered
+EXERCISE_POOL_ERROR_BACKOFF = float(os.getenv("EXERCISE_POOL_ERROR_BACKOFF", "30"))
+# Queue low-priority image jobs for refilled exercises so their pictures are ready when served
+EXERCISE_POOL_PREFETCH_IMAGES = os.getenv("EXERCISE_POOL_PREFETCH_IMAGES", "1") == "1"
+
+
+def pool_key(learn_language: str, native_language: str, level: str, topic: str) -> tuple:
+    return (learn_language, native_language, level, topic)
+
+
+async def _generate_live(learn_language: str, native_language: str, level: str, topic: str, exclude_hashes: list[str] = None) -> dict:
+    from app.ai_content import generate_multiple_choice_exercise
+    return await generate_multiple_choice_exercise(learn_language, native_language, level, topic, exclude_hashes)
+
+
+def _prefetch_image(visual_prompt: str):
+    from app.services.image_jobs import image_jobs, PRIORITY_PREFETCH
+    image_jobs.submit(visual_prompt, PRIORITY_PREFETCH)
+
+
+async def _generate_batch(learn_language: str, native_language: str, level: str, topic: str, count: int) -> list[dict]:
+    from app.ai_content import generate_multiple_choice_exercises
+    return await generate_multiple_choice_exercises(learn_language, native_language, level, topic, count=count)
+
+
+class ExercisePool:
+    """
+    Bounded pool of pre-generated multiple-choice exercises.
+
+    Handlers pop from the pool instantly; a background worker refills every key
+    that was requested recently up to `low_water` entries.
+    """
+
+    def __init__(self, generate=_generate_live, generate_batch=_generate_batch,
+                 low_water: int = EXERCISE_POOL_LOW_WATER, max_size: int = EXERCISE_POOL_MAX_SIZE,
+                 max_keys: int = EXERCISE_POOL_MAX_KEYS, concurrency: int = EXERCISE_POOL_REFILL_CONCURRENCY,
+                 batch_size: int = EXERCISE_POOL_BATCH_SIZE, offline=generate_offline_exercise,
+                 offline_levels=frozenset(), prefetch_image=None):
+        self._generate = generate
+        self._generate_batch = generate_batch
+        self._offline = offline
+        self._prefetch_image = prefetch_image
+        # Levels answered from the local vocabulary first; every level falls back to it on errors
+        self.offline_levels = {level.lower() for level in offline_levels}
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.max_size = max(max_size, low_water)
+        self.max_keys = max_keys
+        self.concurrency = concurrency
+        self._pools: OrderedDict[tuple, deque] = OrderedDict()
+        self._backoff_until: dict[tuple, float] = {}
+        self._refilling: set[tuple] = set()
+        self._wakeup = asyncio.Event()
+        self._worker_task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.refill_errors = 0
+        self.offline_served = 0
+        self.offline_fallbacks = 0
+
+    # --- Pool access ---
+
+    def _touch(self, key: tuple) -> deque:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = deque(maxlen=self.max_size)
+            self._pools[key] = pool
+        self._pools.move_to_end(key)
+        while len(self._pools) > self.max_keys:
+            evicted, _ = self._pools.popitem(last=False)
+            self._backoff_until.pop(evicted, None)
+        return pool
+
+    def put(self, key: tuple, exercise: dict):
+        self._touch(key).append(exercise)
+
+    def pop(self, key: tuple, exclude_hashes=None) -> dict | None:
+        """Returns a pooled exercise the user has not completed yet, or None on a miss."""
+        pool = self._touch(key)
+        exclude = set(exclude_hashes or [])
+        exercise = None
+        for _ in range(len(pool)):
+            candidate = pool.popleft()
+            if _hash_exercise(candidate) not in exclude:
+                exercise = candidate
+                break
+            # Already completed by this user, but still good for others
+            pool.append(candidate)
+
+        if exercise is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._wakeup.set()
+        return exercise
+
+    def size(self, key: tuple) -> int:
+        pool = self._pools.get(key)
+        return len(pool) if pool else 0
+
+    def offline_exercise(self, learn_language: str, native_language: str, level: str, topic: str,
+                         exclude_hashes: list[str] = None, fallback: bool = False, pictures: bool = True) -> dict | None:
+        """
+        Builds a local exercise from the bundled vocabulary. Without `fallback` only levels
+        configured as offline are answered; returns None when the topic is not covered.
+        With `pictures=False` no "what is this?" picture questions are built.
+        """
+        if self._offline is None or (not fallback and (level or "").lower() not in self.offline_levels):
+            return None
+        exercise = self._offline(learn_language, native_language, level, topic, exclude_hashes, pictures=pictures)
+        if exercise is not None:
+            if fallback:
+                self.offline_fallbacks += 1
+            else:
+                self.offline_served += 1
+        return exercise
+
+    async def get_exercise(self, learn_language: str, native_language: str, level: str, topic: str,
+                           exclude_hashes: list[str] = None, pictures: bool = True) -> dict:
+        """
+        Serves offline levels from the local vocabulary, otherwise pops a pooled exercise,
+        falling back to live generation when the pool is empty and to the local
+        vocabulary when generation fails. Callers that show no image (the Telegram bot)
+        pass `pictures=False` so local exercises are translation questions only.
+        """
+        exercise = self.offline_exercise(learn_language, native_language, level, topic, exclude_hashes, pictures=pictures)
+        if exercise is not None:
+            return exercise
+        key = pool_key(learn_language, native_language, level, topic)
+        exercise = self.pop(key, exclude_hashes)
+        if exercise is not None:
+            return exercise
+        exercise = await self._generate(learn_language, native_language, level, topic, exclude_hashes)
+        if not exercise or exercise.get("error"):
+            fallback = self.offline_exercise(learn_language, native_language, level, topic, exclude_hashes,
+                                             fallback=True, pictures=pictures)
+            if fallback is not None:
+                logger.warning(f"Live exercise generation failed for {key}, serving an offline exercise instead.")
+                return fallback
+        return exercise
+
+    # --- Background refill ---
+
+    def _keys_needing_refill(self) -> list[tuple]:
+        now = time.monotonic()
+        return [
+            key for key, pool in reversed(self._pools.items())
+            if len(pool) < self.low_water
+            and key not in self._refilling
+            and self._backoff_until.get(key, 0) <= now
+        ]
+
+    async def _refill_key(self, key: tuple, semaphore: asyncio.Semaphore):
+        self._refilling.add(key)
+        try:
+            while self.size(key) < self.low_water and key in self._pools:
+                missing = self.low_water - self.size(key)
+                async with semaphore:
+                    exercises = await self._generate_batch(*key, min(missing, self.batch_size))
+                if not exercises:
+                    self.refill_errors += 1
+                    self._backoff_until[key] = time.monotonic() + EXERCISE_POOL_ERROR_BACKOFF
+                    logger.warning(f"Exercise pool refill returned no valid exercises for {key}.")
+                    return
+                for exercise in exercises:
+                    self.put(key, exercise)
+                    if self._prefetch_image and exercise.get("visual_prompt"):
+                        self._prefetch_image(exercise["visual_prompt"])
+                self.refilled += len(exercises)
+        except Exception as e:
+            self.refill_errors += 1
+            self._backoff_until[key] = time.monotonic() + EXERCISE_POOL_ERROR_BACKOFF
+            logger.error(f"Unexpected error while refilling exercise pool for {key}: {e}", exc_info=True)
+        finally:
+            self._refilling.discard(key)
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: set[asyncio.Task] = set()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=EXERCISE_POOL_ERROR_BACKOFF)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                for key in self._keys_needing_refill():
+                    task = asyncio.create_task(self._refill_key(key, semaphore))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def start(self):
+        if self._worker_task is None or self._worker_task.done():
+            self._wakeup = asyncio.Event()
+            self._worker_task = asyncio.create_task(self._run())
+            logger.info("Exercise pool refill worker started.")
+
+    async def stop(self):
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+            logger.info("Exercise pool refill worker stopped.")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "refilled": self.refilled,
+            "refill_errors": self.refill_errors,
+            "offline_served": self.offline_served,
+            "offline_fallbacks": self.offline_fallbacks,
+            "keys": len(self._pools),
+            "pooled_exercises": sum(len(p) for p in self._pools.values()),
+            "low_water": self.low_water,
+            "max_size": self.max_size,
+        }
+
+
+exercise_pool = ExercisePool(
+    offline_levels=OFFLINE_EXERCISE_LEVELS,
+    prefetch_image=_prefetch_image if EXERCISE_POOL_PREFETCH_IMAGES else None,
+)
@@ -0,0 +1,81 @@
+import os
+import logging
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Connection pool sizing for outbound calls (DeepSeek, Hugging Face, ...)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Per-phase default timeouts. Call sites can still pass a longer `timeout=` (e.g. images).
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "45"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    # HTTP/2 needs the optional `h2` package (installed via httpx[http2])
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_timeout(read: float | None = None) -> httpx.Timeout:
+    """Returns the default per-phase timeout, optionally with a custom read timeout."""
+    return httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT,
+        read=read if read is not None else HTTP_READ_TIMEOUT,
+        write=HTTP_WRITE_TIMEOUT,
+        pool=HTTP_POOL_TIMEOUT,
+    )
+
+
+def _create_client() -> httpx.AsyncClient:
+    http2 = _http2_available()
+    if not http2:
+        logger.warning("h2 is not installed, shared HTTP client falls back to HTTP/1.1.")
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=build_timeout(),
+    )
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    """Creates the app-lifetime client. Called from the FastAPI lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+        logger.info("Shared HTTP client created.")
+    return _client
+
+
+async def close_http_client():
+    """Closes the shared client and its pooled connections."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Shared HTTP client closed.")
+    _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared pooled client.
+    Outside of the app lifespan (scripts, the standalone bot) it is created lazily.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
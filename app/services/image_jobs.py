@@ -0,0 +1,194 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+from app.services.image_store import image_store, prompt_key
+
+logger = logging.getLogger(__name__)
+
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "4"))
+# Finished jobs are remembered for status polling; the oldest are forgotten beyond this
+IMAGE_JOBS_MAX_TRACKED = int(os.getenv("IMAGE_JOBS_MAX_TRACKED", "5000"))
+# Prefetch jobs are dropped rather than queued once this many jobs are waiting
+IMAGE_JOBS_MAX_PREFETCH_BACKLOG = int(os.getenv("IMAGE_JOBS_MAX_PREFETCH_BACKLOG", "200"))
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREFETCH = 10
+
+
+class ImageJob:
+    """One image to generate. The job id is the prompt's content address, so identical prompts share a job."""
+
+    def __init__(self, job_id: str, prompt: str, priority: int):
+        self.id = job_id
+        self.prompt = prompt
+        self.priority = priority
+        self.status = "queued"
+        self.image_url: str | None = None
+        self.created_at = time.monotonic()
+        self.finished_at: float | None = None
+        self.done = asyncio.Event()
+
+    def finish(self, image_url: str | None):
+        self.image_url = image_url
+        self.status = "done" if image_url else "failed"
+        self.finished_at = time.monotonic()
+        self.done.set()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "image_url": self.image_url,
+            "image_blur": image_store.blur_data_url(self.image_url),
+        }
+
+
+async def _generate(prompt: str) -> str | None:
+    from app.ai_content import generate_image
+    return await generate_image(prompt)
+
+
+class ImageJobQueue:
+    """
+    Priority queue of image generation jobs served by a pool of workers.
+
+    Interactive requests (a game page waiting for its cards) run before prefetch
+    jobs; a prompt that is already queued, running or stored is never generated twice.
+    """
+
+    def __init__(self, generate=_generate, workers: int = IMAGE_JOB_WORKERS,
+                 max_tracked: int = IMAGE_JOBS_MAX_TRACKED, max_prefetch_backlog: int = IMAGE_JOBS_MAX_PREFETCH_BACKLOG):
+        self._generate = generate
+        self.workers = workers
+        self.max_tracked = max_tracked
+        self.max_prefetch_backlog = max_prefetch_backlog
+        self._jobs: OrderedDict[str, ImageJob] = OrderedDict()
+        self._queue: asyncio.PriorityQueue | None = None
+        self._seq = 0
+        self._worker_tasks: list[asyncio.Task] = []
+        self.submitted = 0
+        self.deduplicated = 0
+        self.generated = 0
+        self.failed = 0
+        self.prefetch_dropped = 0
+
+    def _ensure_queue(self) -> asyncio.PriorityQueue:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        return self._queue
+
+    def _track(self, job: ImageJob):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.max_tracked:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in ("queued", "running"):
+                break
+            del self._jobs[oldest_id]
+
+    def _enqueue(self, job: ImageJob):
+        self._seq += 1
+        self._ensure_queue().put_nowait((job.priority, self._seq, job))
+
+    def submit(self, prompt: str, priority: int = PRIORITY_INTERACTIVE) -> ImageJob | None:
+        """
+        Returns the job for this prompt, creating and queueing it if needed.
+        Returns None if a prefetch was dropped because the queue is backed up.
+        """
+        self.submitted += 1
+        job_id = prompt_key(prompt)
+        job = self._jobs.get(job_id)
+        if job is not None and job.status != "failed":
+            self.deduplicated += 1
+            if job.status == "queued" and priority < job.priority:
+                # Someone is now waiting on a prefetched prompt: queue it again at the higher priority
+                job.priority = priority
+                self._enqueue(job)
+            return job
+
+        job = ImageJob(job_id, prompt, priority)
+        stored_url = image_store.get(prompt)
+        if stored_url is not None:
+            self.deduplicated += 1
+            job.finish(stored_url)
+            self._track(job)
+            return job
+
+        if priority >= PRIORITY_PREFETCH and self._ensure_queue().qsize() >= self.max_prefetch_backlog:
+            self.prefetch_dropped += 1
+            return None
+        self._track(job)
+        self._enqueue(job)
+        return job
+
+    def get(self, job_id: str) -> ImageJob | None:
+        """Looks up a job; images generated before a restart are reported as done."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            stored_url = image_store.url_for_key(job_id)
+            if stored_url is not None:
+                job = ImageJob(job_id, "", PRIORITY_INTERACTIVE)
+                job.finish(stored_url)
+        return job
+
+    async def wait(self, job_ids: list[str], timeout: float) -> list[ImageJob | None]:
+        """Returns the jobs once any of the pending ones finishes (or after `timeout`)."""
+        jobs = [self.get(job_id) for job_id in job_ids]
+        pending = [asyncio.create_task(job.done.wait()) for job in jobs if job is not None and not job.done.is_set()]
+        if pending:
+            _, still_pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in still_pending:
+                task.cancel()
+        return jobs
+
+    async def _work(self):
+        queue = self._ensure_queue()
+        while True:
+            _, _, job = await queue.get()
+            try:
+                if job.status != "queued":
+                    # Duplicate entry from a priority upgrade
+                    continue
+                job.status = "running"
+                try:
+                    image_url = await self._generate(job.prompt)
+                except Exception as e:
+                    logger.error(f"Image job {job.id} failed: {e}", exc_info=True)
+                    image_url = None
+                job.finish(image_url)
+                if image_url:
+                    self.generated += 1
+                else:
+                    self.failed += 1
+            finally:
+                queue.task_done()
+
+    def start(self):
+        if not any(not task.done() for task in self._worker_tasks):
+            self._worker_tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+            logger.info(f"Image job queue started with {self.workers} workers.")
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        logger.info("Image job queue stopped.")
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "generated": self.generated,
+            "failed": self.failed,
+            "prefetch_dropped": self.prefetch_dropped,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "tracked_jobs": len(self._jobs),
+            "workers": len(self._worker_tasks),
+        }
+
+
+image_jobs = ImageJobQueue()
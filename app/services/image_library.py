@@ -0,0 +1,170 @@
+import os
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+from scripts.vocab import VOCAB
+from app.services import image_variants
+from app.services.prompt_canon import canonicalize_prompt, prompt_key
+
+logger = logging.getLogger(__name__)
+
+CONTENT_DIR = Path(__file__).resolve().parents[2] / "content"
+# Pre-rendered images for the vocabulary, built by scripts/build_image_library.py
+IMAGE_LIBRARY_DIR = Path(os.getenv("IMAGE_LIBRARY_DIR", str(CONTENT_DIR / "library")))
+# Bump to re-render the whole library (e.g. after changing the drawing style); old versions stay servable
+IMAGE_LIBRARY_VERSION = os.getenv("IMAGE_LIBRARY_VERSION", "v1")
+IMAGE_LIBRARY_URL_PREFIX = "/static/library"
+MANIFEST_NAME = "manifest.json"
+
+# Words that may surround a concept and still be answered with the concept's picture ("red apple")
+_MODIFIER_GROUPS = ("colors", "more_colors", "adjectives", "more_adjectives", "feelings")
+_MODIFIER_WORDS = {word.lower() for name in _MODIFIER_GROUPS for word in VOCAB[name]["en"]}
+
+
+def library_concepts() -> list[str]:
+    """
+    Every English vocabulary word: the concepts kids see in lessons, exercises and games.
+    The topics in content/topics.json map onto these vocabulary groups.
+    """
+    concepts = []
+    for group in VOCAB.values():
+        for word in group["en"]:
+            concept = canonicalize_prompt(word)
+            if concept not in concepts:
+                concepts.append(concept)
+    return concepts
+
+
+class ImageLibrary:
+    """
+    Versioned library of pre-rendered images, one per vocabulary concept.
+
+    Files live in <directory>/<version>/ and are named by the concept's prompt key;
+    manifest.json maps each canonical concept to its file. A prompt resolves to a
+    library image when its canonical form is a concept, or when it names a concept
+    with only colours or adjectives in front of it ("red apple" -> "apple").
+    """
+
+    def __init__(self, directory: Path = IMAGE_LIBRARY_DIR, version: str = IMAGE_LIBRARY_VERSION,
+                 url_prefix: str = IMAGE_LIBRARY_URL_PREFIX, card_url_prefix: str = "/images",
+                 variants: bool = image_variants.PIL_AVAILABLE):
+        self.root = Path(directory)
+        self.version = version
+        self.path = self.root / version
+        self.url_prefix = url_prefix.rstrip("/")
+        self.card_url_prefix = card_url_prefix.rstrip("/")
+        self.variants = variants
+        self._assets: dict[str, dict] = {}
+        self._by_key: dict[str, dict] = {}
+        self._manifest_mtime: float | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.path / MANIFEST_NAME
+
+    def _load(self):
+        # Reloaded when the build script rewrites the manifest, so new assets are used without a restart
+        try:
+            mtime = self.manifest_path.stat().st_mtime
+        except FileNotFoundError:
+            self._assets, self._by_key, self._manifest_mtime = {}, {}, None
+            return
+        if mtime == self._manifest_mtime:
+            return
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read image library manifest {self.manifest_path}: {e}")
+            return
+        self._assets = manifest.get("assets", {})
+        self._by_key = {asset["key"]: asset for asset in self._assets.values()}
+        self._manifest_mtime = mtime
+
+    def assets(self) -> dict[str, dict]:
+        self._load()
+        return self._assets
+
+    def _match(self, canonical: str) -> dict | None:
+        assets = self.assets()
+        if canonical in assets:
+            return assets[canonical]
+        words = canonical.split(" ")
+        # English puts the head noun last: "red apple", "big yellow bus", "happy living room"
+        for size in (2, 1):
+            head = " ".join(words[-size:])
+            if len(words) > size and head in assets and _MODIFIER_WORDS.issuperset(words[:-size]):
+                return assets[head]
+        return None
+
+    def url(self, asset: dict) -> str:
+        if image_variants.card_path(self.path, asset["key"], "jpg").exists():
+            return f"{self.card_url_prefix}/{asset['key']}"
+        return f"{self.url_prefix}/{self.version}/{asset['file']}"
+
+    def resolve(self, prompt: str) -> str | None:
+        """URL of the library image for this prompt, or None if the library does not cover it."""
+        asset = self._match(canonicalize_prompt(prompt))
+        if asset is None or not (self.path / asset["file"]).exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.url(asset)
+
+    def original_path(self, key: str) -> Path | None:
+        self._load()
+        asset = self._by_key.get(key)
+        if asset is None or not (self.path / asset["file"]).exists():
+            return None
+        return self.path / asset["file"]
+
+    def url_for_key(self, key: str) -> str | None:
+        return self.url(self._by_key[key]) if self.original_path(key) is not None else None
+
+    # --- Used by the build script ---
+
+    def has(self, concept: str) -> bool:
+        asset = self.assets().get(concept)
+        return asset is not None and (self.path / asset["file"]).exists()
+
+    def write(self, concept: str, data: bytes, extension: str, source: str) -> dict:
+        """Writes one concept's image (and card variants) and returns its manifest entry. Blocking."""
+        key = prompt_key(concept)
+        self.path.mkdir(parents=True, exist_ok=True)
+        path = self.path / f"{key}.{extension}"
+        _atomic_write(path, data)
+        if self.variants:
+            image_variants.make_variants(path, self.path, key)
+        return {"key": key, "file": path.name, "source": source, "bytes": len(data)}
+
+    def save_manifest(self, assets: dict[str, dict]):
+        manifest = {"version": self.version, "assets": dict(sorted(assets.items()))}
+        self.path.mkdir(parents=True, exist_ok=True)
+        _atomic_write(self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "version": self.version,
+            "assets": len(self.assets()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+
+def _atomic_write(path: Path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+image_library = ImageLibrary()
@@ -0,0 +1,166 @@
+import os
+import re
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+
+from app.services import image_variants
+from app.services.prompt_canon import prompt_key
+from app.services.image_library import ImageLibrary, image_library
+
+logger = logging.getLogger(__name__)
+
+CONTENT_DIR = Path(__file__).resolve().parents[2] / "content"
+# Generated images live under content/generated and are served from /static/generated
+IMAGE_STORE_DIR = Path(os.getenv("IMAGE_STORE_DIR", str(CONTENT_DIR / "generated")))
+IMAGE_STORE_URL_PREFIX = "/static/generated"
+# Card variants are served by /images/{key}, which picks WebP/JPEG by the Accept header
+IMAGE_CARD_URL_PREFIX = "/images"
+# File names are content addresses, so a response never changes and can be cached for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+_KEY = re.compile(r"^[0-9a-f]{32}$")
+
+
+def is_image_key(value: str) -> bool:
+    return bool(_KEY.match(value or ""))
+
+
+class ImageStore:
+    """
+    Content-addressed on-disk store of generated images, keyed by the canonical prompt.
+
+    An image is written once (atomically) and afterwards served as a static file,
+    so pages reference small URLs and a repeated prompt costs nothing.
+    When Pillow is installed, card-sized variants are written next to the original
+    and the store hands out the Accept-negotiated /images/{key} URL instead.
+    Prompts covered by the pre-rendered image `library` are answered from it first.
+    """
+
+    def __init__(self, directory: Path = IMAGE_STORE_DIR, url_prefix: str = IMAGE_STORE_URL_PREFIX,
+                 card_url_prefix: str = IMAGE_CARD_URL_PREFIX, variants: bool = image_variants.PIL_AVAILABLE,
+                 library: ImageLibrary | None = None):
+        self.directory = Path(directory)
+        self.library = library
+        self.url_prefix = url_prefix.rstrip("/")
+        self.card_url_prefix = card_url_prefix.rstrip("/")
+        self.variants = variants
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.variant_errors = 0
+
+    def _find(self, key: str) -> Path | None:
+        for extension in _EXTENSIONS.values():
+            path = self.directory / f"{key}.{extension}"
+            if path.exists():
+                return path
+        return None
+
+    def url_for(self, path: Path) -> str:
+        return f"{self.url_prefix}/{path.name}"
+
+    def _url(self, key: str, path: Path) -> str:
+        if image_variants.card_path(self.directory, key, "jpg").exists():
+            return f"{self.card_url_prefix}/{key}"
+        return self.url_for(path)
+
+    def original_path(self, key: str) -> Path | None:
+        path = self._find(key)
+        if path is None and self.library is not None:
+            path = self.library.original_path(key)
+        return path
+
+    def directories(self) -> list[Path]:
+        """Where images (and their card variants) are looked up: the store, then the library."""
+        return [self.directory] + ([self.library.path] if self.library is not None else [])
+
+    def url_for_key(self, key: str) -> str | None:
+        """URL of the stored (or library) image with this content address, or None."""
+        if not is_image_key(key):
+            return None
+        path = self._find(key)
+        if path is None:
+            return self.library.url_for_key(key) if self.library is not None else None
+        return self._url(key, path)
+
+    def get(self, prompt: str) -> str | None:
+        """Returns the URL of the library or stored image for this prompt, or None."""
+        if self.library is not None:
+            library_url = self.library.resolve(prompt)
+            if library_url is not None:
+                return library_url
+        key = prompt_key(prompt)
+        path = self._find(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._url(key, path)
+
+    def blur_data_url(self, image_url: str | None) -> str | None:
+        """Inline blurred placeholder for an image URL handed out by this store, if one exists."""
+        if not image_url or not image_url.startswith(self.card_url_prefix + "/"):
+            return None
+        key = image_url.rsplit("/", 1)[1]
+        if not is_image_key(key):
+            return None
+        for directory in self.directories():
+            blur = image_variants.blur_data_url(directory, key)
+            if blur is not None:
+                return blur
+        return None
+
+    def _write(self, path: Path, data: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename, so readers never see a half-written image
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    async def put(self, prompt: str, data: bytes, content_type: str = "image/jpeg") -> str:
+        """Stores the image bytes (and card variants) for this prompt and returns its URL."""
+        extension = _EXTENSIONS.get(content_type.split(";")[0].strip(), "jpg")
+        key = prompt_key(prompt)
+        path = self.directory / f"{key}.{extension}"
+        await asyncio.to_thread(self._write, path, data)
+        self.writes += 1
+        if self.variants:
+            try:
+                await asyncio.to_thread(image_variants.make_variants, path, self.directory, key)
+            except Exception as e:
+                self.variant_errors += 1
+                logger.error(f"Could not build card variants for {path.name}: {e}", exc_info=True)
+        return self._url(key, path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "writes": self.writes,
+            "variants": self.variants,
+            "variant_errors": self.variant_errors,
+        }
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles that marks every response as immutable (for content-addressed files)."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+image_store = ImageStore(library=image_library)
@@ -0,0 +1,94 @@
+import os
+import base64
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Pillow is optional: without it only the original image is stored and served
+try:
+    from PIL import Image, features
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Game cards are shown at thumbnail size on phones; the longest side of a card variant (px)
+IMAGE_CARD_SIZE = int(os.getenv("IMAGE_CARD_SIZE", "320"))
+IMAGE_WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "72"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "78"))
+# AVIF is smaller still but much slower to encode, so it is opt-in
+IMAGE_AVIF_ENABLED = os.getenv("IMAGE_AVIF_ENABLED", "0") == "1"
+# Size of the blurred placeholder shown while a card loads (inlined as a data URL)
+IMAGE_BLUR_SIZE = int(os.getenv("IMAGE_BLUR_SIZE", "16"))
+
+# Card formats in order of preference, with the media type browsers advertise in Accept
+CARD_FORMATS = [("avif", "image/avif"), ("webp", "image/webp"), ("jpg", "image/jpeg")]
+
+
+def card_path(directory: Path, key: str, extension: str) -> Path:
+    return Path(directory) / f"{key}.card.{extension}"
+
+
+def blur_path(directory: Path, key: str) -> Path:
+    return Path(directory) / f"{key}.blur.jpg"
+
+
+def _avif_enabled() -> bool:
+    return IMAGE_AVIF_ENABLED and features.check("avif")
+
+
+def _save(image, path: Path, **options):
+    # Same temp-file-and-rename pattern as the image store
+    tmp = path.with_name(path.name + ".tmp")
+    image.save(tmp, **options)
+    os.replace(tmp, path)
+
+
+def make_variants(source: Path, directory: Path, key: str) -> list[Path]:
+    """
+    Writes card-sized WebP and JPEG (and AVIF if enabled) variants of `source`,
+    plus a tiny blurred placeholder, next to the original. Blocking; run in a thread.
+    """
+    written = []
+    with Image.open(source) as original:
+        image = original.convert("RGB")
+
+    card = image.copy()
+    card.thumbnail((IMAGE_CARD_SIZE, IMAGE_CARD_SIZE), Image.LANCZOS)
+    if _avif_enabled():
+        path = card_path(directory, key, "avif")
+        _save(card, path, format="AVIF", quality=50)
+        written.append(path)
+    path = card_path(directory, key, "webp")
+    _save(card, path, format="WEBP", quality=IMAGE_WEBP_QUALITY, method=4)
+    written.append(path)
+    path = card_path(directory, key, "jpg")
+    _save(card, path, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+    written.append(path)
+
+    blur = image.copy()
+    blur.thumbnail((IMAGE_BLUR_SIZE, IMAGE_BLUR_SIZE))
+    path = blur_path(directory, key)
+    _save(blur, path, format="JPEG", quality=40)
+    written.append(path)
+    return written
+
+
+def choose_card(directory: Path, key: str, accept: str) -> tuple[Path, str] | None:
+    """Picks the best existing card variant the client accepts; JPEG is always acceptable."""
+    accept = (accept or "").lower()
+    for extension, media_type in CARD_FORMATS:
+        if media_type != "image/jpeg" and media_type not in accept:
+            continue
+        path = card_path(directory, key, extension)
+        if path.exists():
+            return path, media_type
+    return None
+
+
+def blur_data_url(directory: Path, key: str) -> str | None:
+    """The blurred placeholder as an inline data URL (a few hundred bytes), or None."""
+    path = blur_path(directory, key)
+    if not path.exists():
+        return None
+    return "data:image/jpeg;base64," + base64.b64encode(path.read_bytes()).decode("ascii")
@@ -0,0 +1,150 @@
+import re
+import json
+
+# Matching closer for every JSON container opener
+_CLOSERS = {"{": "}", "[": "]"}
+# Characters that matter inside a JSON value (outside of strings)
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+# Characters that matter inside a JSON string
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+def _is_json(candidate: str) -> bool:
+    try:
+        json.loads(candidate)
+        return True
+    except ValueError:
+        return False
+
+
+class JSONScanner:
+    """
+    Single-pass, brace-depth- and string-aware scanner for the first complete
+    JSON object or array embedded in LLM output (prose, markdown fences, ...).
+
+    Text can be fed incrementally as streamed chunks arrive; `feed` returns the
+    JSON text as soon as the first value closes and parses. Every character is
+    looked at once, so unbalanced braces or long prose cannot cause the
+    backtracking blow-ups a regex has.
+    """
+
+    def __init__(self, openers: str = "{["):
+        # Only these characters may start the top-level value; nested values can be either kind
+        self._start = re.compile("[" + re.escape(openers) + "]")
+        self._openers = openers
+        self.text = ""
+        self.result: str | None = None
+        self._pos = 0
+        self._stack: list[tuple[str, int]] = []
+        self._in_string = False
+        # Spans of nested values that closed inside the current top-level candidate
+        self._closed: list[tuple[int, int]] = []
+
+    def feed(self, chunk: str) -> str | None:
+        """Adds a chunk of text and returns the JSON text once a complete value has been found."""
+        if self.result is None:
+            self.text += chunk
+            self._scan()
+        return self.result
+
+    def finish(self) -> str | None:
+        """
+        Called when no more text will arrive. If the top-level candidate never closed
+        (e.g. a stray "{" in the prose before the real JSON), falls back to the first
+        complete value nested inside it.
+        """
+        if self.result is None and self._stack:
+            self._salvage()
+        return self.result
+
+    def _reset_candidate(self):
+        self._stack.clear()
+        self._closed.clear()
+        self._in_string = False
+
+    def _salvage(self):
+        """Picks the first outermost closed nested value that is valid JSON."""
+        text = self.text
+        covered_until = -1
+        for start, end in sorted(self._closed, key=lambda span: (span[0], -span[1])):
+            if start < covered_until or text[start] not in self._openers:
+                continue
+            covered_until = end
+            candidate = text[start:end]
+            if _is_json(candidate):
+                self.result = candidate
+                return
+        self._reset_candidate()
+
+    def _scan(self):
+        text = self.text
+        end_of_text = len(text)
+        pos = self._pos
+        stack = self._stack
+
+        while pos < end_of_text:
+            if not stack:
+                match = self._start.search(text, pos)
+                if not match:
+                    pos = end_of_text
+                    break
+                pos = match.start()
+                stack.append((_CLOSERS[text[pos]], pos))
+                pos += 1
+                continue
+
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, pos)
+                if not match:
+                    pos = end_of_text
+                    break
+                if match.group() == "\\":
+                    if match.start() + 1 >= end_of_text:
+                        # The escaped character is in the next chunk
+                        pos = match.start()
+                        break
+                    pos = match.start() + 2
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+
+            match = _STRUCTURAL.search(text, pos)
+            if not match:
+                pos = end_of_text
+                break
+            char, index = match.group(), match.start()
+            pos = index + 1
+
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                stack.append((_CLOSERS[char], index))
+            else:
+                expected, start = stack[-1]
+                if char != expected:
+                    # Mismatched brackets: this candidate is not JSON, keep scanning after it
+                    self._salvage()
+                    if self.result is not None:
+                        break
+                    continue
+                stack.pop()
+                if stack:
+                    self._closed.append((start, pos))
+                    continue
+                candidate = text[start:pos]
+                if _is_json(candidate):
+                    self.result = candidate
+                    break
+                self._salvage()
+                if self.result is not None:
+                    break
+
+        self._pos = pos
+
+
+def find_json(text: str, openers: str = "{[") -> str | None:
+    """Returns the first complete JSON value in `text`, or None if there is none."""
+    scanner = JSONScanner(openers)
+    scanner.feed(text)
+    return scanner.finish()
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).resolve().parents[2] / "cache"
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(CACHE_DIR / "llm_cache.sqlite3"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+# Size limits are enforced every N writes rather than on each one
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "50"))
+# Hits only update last_access in memory; the updates are written in one batch every N hits (and before writes)
+LLM_CACHE_TOUCH_FLUSH_EVERY = int(os.getenv("LLM_CACHE_TOUCH_FLUSH_EVERY", "100"))
+# Expired entries are kept this long so they can still be served while DeepSeek is down
+LLM_CACHE_STALE_GRACE = float(os.getenv("LLM_CACHE_STALE_GRACE", str(7 * 24 * 3600)))
+
+
+def cache_key(payload: dict) -> str:
+    """Content address of a chat request: hash of (model, messages, temperature, max_tokens)."""
+    material = {
+        "model": payload.get("model"),
+        "messages": payload.get("messages"),
+        "temperature": payload.get("temperature"),
+        "max_tokens": payload.get("max_tokens"),
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class LLMCache:
+    """
+    On-disk cache of LLM responses backed by SQLite.
+
+    Entries carry a per-call-site TTL and are evicted least-recently-used first
+    once the entry or byte limit is exceeded. Lookups are local-disk reads
+    (sub-millisecond), so they are done inline even from async handlers; a hit's
+    LRU timestamp is batched in memory rather than written and committed per hit.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES, enabled: bool = LLM_CACHE_ENABLED):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        # key -> last access time not yet written to the database
+        self._touched: dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, payload: dict, stale_ok: bool = False) -> str | None:
+        """
+        Returns the cached response for this request, or None on a miss or expiry.
+        With `stale_ok` an expired entry still inside the grace period is returned too
+        (used when the upstream is failing).
+        """
+        if not self.enabled:
+            return None
+        key = cache_key(payload)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is None or (row[1] <= now and not stale_ok):
+                    self.misses += 1
+                    return None
+                self._touched[key] = now
+                if len(self._touched) >= LLM_CACHE_TOUCH_FLUSH_EVERY:
+                    self._flush_touches(conn)
+                    conn.commit()
+                if row[1] <= now:
+                    self.stale_hits += 1
+                else:
+                    self.hits += 1
+                return row[0]
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache read failed: {e}")
+            self.misses += 1
+            return None
+
+    def set(self, payload: dict, value: str, ttl: float):
+        """Stores a response for `ttl` seconds."""
+        if not self.enabled or not ttl or ttl <= 0:
+            return
+        key = cache_key(payload)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connection()
+                self._flush_touches(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value.encode("utf-8")), now + ttl, now),
+                )
+                conn.commit()
+                self.writes += 1
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= LLM_CACHE_EVICT_EVERY:
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache write failed: {e}")
+
+    def _flush_touches(self, conn: sqlite3.Connection):
+        """Writes the batched last_access updates (the caller holds the lock and commits)."""
+        if self._touched:
+            touched = [(accessed, key) for key, accessed in self._touched.items()]
+            self._touched.clear()
+            conn.executemany("UPDATE llm_cache SET last_access = MAX(last_access, ?) WHERE key = ?", touched)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drops entries expired past the stale grace period, then least recently used ones until both limits hold."""
+        self._writes_since_evict = 0
+        removed = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now - LLM_CACHE_STALE_GRACE,)).rowcount
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count > self.max_entries or total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access ASC").fetchall()
+            doomed = []
+            for key, size in rows:
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                count -= 1
+                total -= size
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+            removed += len(doomed)
+        conn.commit()
+        self.evictions += removed
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            self._touched.clear()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "stale_hits": self.stale_hits,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
+
+
+llm_cache = LLMCache()
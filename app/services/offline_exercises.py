@@ -0,0 +1,292 @@
+import os
+import json
+import random
+import logging
+from pathlib import Path
+
+from scripts.vocab import VOCAB
+from app.services.progress import _hash_exercise
+
+logger = logging.getLogger(__name__)
+
+# Levels served from the local vocabulary by default, without a DeepSeek call
+OFFLINE_EXERCISE_LEVELS = {
+    level.strip().lower() for level in os.getenv("OFFLINE_EXERCISE_LEVELS", "beginner").split(",") if level.strip()
+}
+
+TOPICS_PATH = Path(__file__).resolve().parents[2] / "content" / "topics.json"
+
+# Language slugs used by the app -> language codes used in scripts/vocab.py
+LANG_CODES = {"english": "en", "russian": "ru", "uzbek": "uz", "korean": "ko"}
+
+# Vocabulary groups behind each entry of content/topics.json (same order in every language)
+TOPIC_VOCAB_GROUPS = [
+    ["animals", "wild_animals", "birds", "sea_animals", "insects"],
+    ["food", "fruits", "vegetables", "drinks", "meals"],
+    ["family", "extended_family", "people"],
+    ["colors", "more_colors"],
+    ["weather", "nature", "seasons"],
+    ["hobbies", "sports"],
+    ["numbers_1_5", "numbers_6_10", "big_numbers"],
+    ["clothes", "accessories"],
+]
+
+# Question templates per native language; {lang} is the learned language in the native one
+PICTURE_QUESTIONS = {
+    "uzbek": "Бу нима?",
+    "russian": "Что это?",
+    "english": "What is this?",
+    "korean": "이것은 무엇일까요?",
+}
+TRANSLATE_QUESTIONS = {
+    "uzbek": "'{word}' {lang} қандай бўлади?",
+    "russian": "Как будет '{word}' {lang}?",
+    "english": "How do you say '{word}' in {lang}?",
+    "korean": "{lang}로 '{word}'은(는) 무엇일까요?",
+}
+EXPLANATIONS = {
+    "uzbek": "'{answer}' сўзи ўзбек тилида '{word}' дегани.",
+    "russian": "'{answer}' переводится как '{word}'.",
+    "english": "'{answer}' means '{word}'.",
+    "korean": "'{answer}'은(는) '{word}'라는 뜻이에요.",
+}
+LANG_IN_NATIVE = {
+    "uzbek": {"english": "инглиз тилида", "russian": "рус тилида", "korean": "корейс тилида", "uzbek": "ўзбек тилида"},
+    "russian": {"english": "по-английски", "russian": "по-русски", "korean": "по-корейски", "uzbek": "по-узбекски"},
+    "english": {"english": "English", "russian": "Russian", "korean": "Korean", "uzbek": "Uzbek"},
+    "korean": {"english": "영어", "russian": "러시아어", "korean": "한국어", "uzbek": "우즈베크어"},
+}
+
+# Uzbek Latin -> Uzbek Cyrillic (the app shows Uzbek in Cyrillic, the vocabulary is in Latin)
+_UZ_DIGRAPHS = {
+    "o'": "ў", "g'": "ғ", "sh": "ш", "ch": "ч", "yo": "ё", "yu": "ю", "ya": "я", "ye": "е",
+}
+_UZ_LETTERS = {
+    "a": "а", "b": "б", "d": "д", "e": "е", "f": "ф", "g": "г", "h": "ҳ", "i": "и", "j": "ж",
+    "k": "к", "l": "л", "m": "м", "n": "н", "o": "о", "p": "п", "q": "қ", "r": "р", "s": "с",
+    "t": "т", "u": "у", "v": "в", "x": "х", "y": "й", "z": "з", "c": "с", "w": "в",
+    "'": "ъ",
+}
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "ʻ": "'", "ʼ": "'", "`": "'"})
+
+
+def uzbek_latin_to_cyrillic(text: str) -> str:
+    """Transliterates Uzbek Latin script to Uzbek Cyrillic, keeping capitalisation."""
+    text = text.translate(_APOSTROPHES)
+    result = []
+    i = 0
+    while i < len(text):
+        pair = text[i:i + 2].lower()
+        # "yo'" is "й" + "ў", not "ё" + "ъ"
+        if pair in _UZ_DIGRAPHS and text[i + 1:i + 3].lower() not in ("o'", "g'"):
+            letter, step = _UZ_DIGRAPHS[pair], 2
+        elif text[i].lower() in _UZ_LETTERS:
+            lower = text[i].lower()
+            at_word_start = i == 0 or not text[i - 1].isalpha()
+            # Word-initial "e" is written "э"
+            letter = "э" if lower == "e" and at_word_start else _UZ_LETTERS[lower]
+            step = 1
+        else:
+            result.append(text[i])
+            i += 1
+            continue
+        result.append(letter.upper() if text[i].isupper() else letter)
+        i += step
+    return "".join(result)
+
+
+def _word(group: str, index: int, language: str) -> str:
+    word = VOCAB[group][LANG_CODES[language]][index]
+    return uzbek_latin_to_cyrillic(word) if language == "uzbek" else word
+
+
+def _build_topic_index() -> dict[str, list[str]]:
+    """Maps every topic name from content/topics.json (any language), and every vocab group name, to vocab groups."""
+    index = {group: [group] for group in VOCAB}
+    try:
+        with open(TOPICS_PATH, "r", encoding="utf-8") as f:
+            topics = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logger.error(f"Could not load topics for offline exercises: {e}")
+        topics = {}
+    for names in topics.values():
+        for name, groups in zip(names, TOPIC_VOCAB_GROUPS):
+            index[name.strip().lower()] = [group for group in groups if group in VOCAB]
+    return index
+
+
+_TOPIC_INDEX = _build_topic_index()
+
+
+def vocab_groups_for_topic(topic: str) -> list[str]:
+    return _TOPIC_INDEX.get((topic or "").strip().lower(), [])
+
+
+def supports(learn_language: str, native_language: str, topic: str) -> bool:
+    """True if an exercise for this language pair and topic can be built locally."""
+    return (
+        learn_language in LANG_CODES
+        and native_language in LANG_CODES
+        and learn_language != native_language
+        and bool(vocab_groups_for_topic(topic))
+    )
+
+
+def _build_exercise(learn_language: str, native_language: str, groups: list[str], group: str, index: int,
+                    picture: bool, rng: random.Random) -> dict:
+    answer = _word(group, index, learn_language)
+    native_word = _word(group, index, native_language)
+
+    # Distractors come from the same vocab group first, then the rest of the topic
+    distractors = []
+    for candidate_group in [group] + [g for g in groups if g != group]:
+        words = [_word(candidate_group, i, learn_language) for i in range(len(VOCAB[candidate_group]["en"]))]
+        rng.shuffle(words)
+        for word in words:
+            if word != answer and word not in distractors:
+                distractors.append(word)
+        if len(distractors) >= 3:
+            break
+
+    options = distractors[:3] + [answer]
+    rng.shuffle(options)
+
+    if picture:
+        question = PICTURE_QUESTIONS[native_language]
+    else:
+        question = TRANSLATE_QUESTIONS[native_language].format(
+            word=native_word, lang=LANG_IN_NATIVE[native_language][learn_language]
+        )
+    return {
+        "question": question,
+        "options": options,
+        "correct_answer_index": options.index(answer),
+        "explanation": EXPLANATIONS[native_language].format(answer=answer, word=native_word),
+        "visual_prompt": f"A simple, friendly cartoon picture of a {VOCAB[group]['en'][index]} for a child.",
+    }
+
+
+def generate_offline_exercises(learn_language: str, native_language: str, level: str, topic: str, count: int = 5,
+                               exclude_hashes: list[str] = None, rng: random.Random = None,
+                               pictures: bool = True) -> list[dict]:
+    """
+    Builds up to `count` distinct multiple-choice exercises from the bundled vocabulary.
+    Returns the same dicts as `generate_multiple_choice_exercise` ("what is this?" picture
+    questions and "how do you say X?" translation questions), or [] for unsupported topics.
+    Callers that cannot show the picture pass `pictures=False` to get translation questions only.
+    """
+    if not supports(learn_language, native_language, topic):
+        return []
+    rng = rng or random
+    groups = vocab_groups_for_topic(topic)
+    exclude = set(exclude_hashes or [])
+
+    words = [(group, i) for group in groups for i in range(len(VOCAB[group]["en"]))]
+    rng.shuffle(words)
+    exercises = []
+    for group, index in words:
+        if len(exercises) >= count:
+            break
+        picture = pictures and rng.random() < 0.5
+        exercise = _build_exercise(learn_language, native_language, groups, group, index, picture, rng)
+        exercise_hash = _hash_exercise(exercise)
+        if exercise_hash in exclude:
+            continue
+        exclude.add(exercise_hash)
+        exercises.append(exercise)
+    return exercises
+
+
+def generate_offline_exercise(learn_language: str, native_language: str, level: str, topic: str,
+                              exclude_hashes: list[str] = None, rng: random.Random = None,
+                              pictures: bool = True) -> dict | None:
+    """Single local exercise, or None if the topic or language pair is not covered by the vocabulary."""
+    exercises = generate_offline_exercises(learn_language, native_language, level, topic, 1, exclude_hashes, rng,
+                                           pictures=pictures)
+    return exercises[0] if exercises else None
+
+
+
+GAME_TITLES = {
+    "uzbek": "Сўзларни ўрганамиз",
+    "russian": "Учим слова",
+    "english": "Let's learn words",
+    "korean": "단어를 배워요",
+}
+GAME_INSTRUCTIONS = {
+    "matching": {
+        "uzbek": "Расмларни тўғри сўзлар билан мослаштиринг",
+        "russian": "Соедини картинки с правильными словами",
+        "english": "Match the pictures with the right words",
+        "korean": "그림과 알맞은 단어를 연결하세요",
+    },
+    "memory": {
+        "uzbek": "Бир хил жуфтликларни топинг",
+        "russian": "Найди одинаковые пары",
+        "english": "Find the matching pairs",
+        "korean": "같은 짝을 찾아보세요",
+    },
+    "drag_drop": {
+        "uzbek": "Сўзларни тўғри расмларга олиб боринг",
+        "russian": "Перетащи слова к правильным картинкам",
+        "english": "Drag the words to the right pictures",
+        "korean": "단어를 알맞은 그림으로 옮기세요",
+    },
+    "quiz": {
+        "uzbek": "Тўғри жавобни танланг",
+        "russian": "Выбери правильный ответ",
+        "english": "Choose the right answer",
+        "korean": "정답을 고르세요",
+    },
+}
+# Same item counts the game prompts ask DeepSeek for
+GAME_ITEM_COUNTS = {"matching": 6, "memory": 8, "drag_drop": 6, "quiz": 5}
+
+
+def generate_offline_game(learn_language: str, native_language: str, level: str, topic: str, game_type: str = "matching",
+                          rng: random.Random = None) -> dict | None:
+    """
+    Builds an interactive game from the bundled vocabulary with the same structure
+    `generate_interactive_game` returns, or None if the topic or language pair is not covered.
+    """
+    if not supports(learn_language, native_language, topic):
+        return None
+    rng = rng or random
+    game_type = game_type if game_type in GAME_ITEM_COUNTS else "matching"
+    count = GAME_ITEM_COUNTS[game_type]
+    game = {
+        "game_type": game_type,
+        "title": GAME_TITLES[native_language],
+        "instructions": GAME_INSTRUCTIONS[game_type][native_language],
+    }
+
+    if game_type == "quiz":
+        exercises = generate_offline_exercises(learn_language, native_language, level, topic, count, rng=rng)
+        game["questions"] = [
+            {
+                "id": i,
+                "question": exercise["question"],
+                "visual_prompt": exercise["visual_prompt"],
+                "options": exercise["options"],
+                "correct_index": exercise["correct_answer_index"],
+                "sound_text": exercise["options"][exercise["correct_answer_index"]],
+            }
+            for i, exercise in enumerate(exercises, start=1)
+        ]
+        return game
+
+    groups = vocab_groups_for_topic(topic)
+    words = [(group, i) for group in groups for i in range(len(VOCAB[group]["en"]))]
+    rng.shuffle(words)
+    items = []
+    for group, index in words[:count]:
+        word = _word(group, index, learn_language)
+        items.append({
+            "id": len(items) + 1,
+            "word": word,
+            "translation": _word(group, index, native_language),
+            "visual_prompt": f"{VOCAB[group]['en'][index]}, cartoon style",
+            "sound_text": word,
+        })
+    game["pairs" if game_type == "memory" else "items"] = items
+    return game
@@ -0,0 +1,142 @@
+import os
+import re
+import hashlib
+
+from scripts.vocab import VOCAB
+
+# Map synonyms onto the English vocabulary word they depict ("kitten" -> "cat")
+IMAGE_PROMPT_CONCEPTS = os.getenv("IMAGE_PROMPT_CONCEPTS", "1") == "1"
+
+_WHITESPACE = re.compile(r"\s+")
+_TOKEN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+
+# Style and audience phrases the LLM appends to a prompt; the image API call adds its own style
+_STYLE_PHRASES = re.compile(
+    r"\b(?:"
+    r"(?:on|against|with) (?:a |an )?(?:plain |simple |clean )?white background"
+    r"|(?:plain |simple |clean )?white background"
+    r"|(?:in )?(?:a )?(?:simple |cute |flat )?(?:cartoon|cartoonish|anime|kawaii|vector|flat|2d|3d) (?:style|art|illustration|drawing)"
+    r"|clip ?art"
+    r"|for (?:a |the |little |small |young )?(?:kids?|children|child|toddlers?|learners?)"
+    r"|(?:kid|child|children)-friendly"
+    r")\b"
+)
+
+# Words that describe how to draw the picture, not what is in it
+_STYLE_WORDS = {
+    "cartoon", "cartoonish", "style", "styled", "drawing", "drawn", "illustration", "illustrated",
+    "picture", "image", "photo", "photograph", "clipart", "icon", "vector", "sketch", "art", "artwork",
+    "render", "hd", "4k", "background", "isolated", "centered", "minimalist", "flat", "2d", "3d",
+    "emoji", "kawaii", "anime", "realistic", "detailed", "high", "quality",
+}
+
+# Articles, connectives and decoration that do not change what is depicted.
+# Spatial prepositions stay: "a cat in the box" and "a cat on the box" are different pictures
+_FILLER_WORDS = {
+    "a", "an", "the", "of", "with", "and", "is", "are", "that", "this", "some", "very",
+    "friendly", "smiling", "smiley", "cute", "cheerful", "funny", "little", "adorable", "colorful",
+    "colourful", "lovely", "nice", "simple", "plain", "bright", "shiny", "fresh", "single", "showing",
+}
+
+_IRREGULAR = {
+    "mice": "mouse", "children": "child", "teeth": "tooth", "feet": "foot", "men": "man", "women": "woman",
+    "geese": "goose", "oxen": "ox", "people": "person", "babies": "baby", "leaves": "leaf", "knives": "knife",
+    "wolves": "wolf", "shelves": "shelf", "fish": "fish", "sheep": "sheep", "deer": "deer",
+}
+
+_SYNONYMS = {
+    "kitten": "cat", "kitty": "cat", "puppy": "dog", "doggy": "dog", "hen": "chicken", "rooster": "chicken",
+    "bunny": "rabbit", "automobile": "car", "bike": "bicycle", "airplane": "plane", "aeroplane": "plane",
+    "jet": "plane", "tv": "television", "smartphone": "phone", "cellphone": "phone", "telephone": "phone",
+    "laptop": "computer", "mom": "mother", "mum": "mother", "mommy": "mother", "mummy": "mother",
+    "dad": "father", "daddy": "father", "kid": "child", "grandma": "grandmother", "granny": "grandmother",
+    "grandpa": "grandfather", "trousers": "pants", "jeans": "pants", "sneakers": "shoes", "shoe": "shoes",
+    "spectacles": "glasses", "eyeglasses": "glasses", "schoolbag": "backpack", "rucksack": "backpack",
+    "sunshine": "sun", "rainy": "rain", "snowy": "snow", "windy": "wind", "cloudy": "cloud",
+    "store": "shop", "soccer": "football", "metro": "subway", "underground": "subway", "cab": "taxi",
+    "tomatoe": "tomato", "potatoe": "potato",
+}
+
+_VOCAB_WORDS = {word.lower() for group in VOCAB.values() for word in group["en"]}
+_VOCAB_PHRASES = {word for word in _VOCAB_WORDS if " " in word}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lower-cases a visual prompt and collapses whitespace and trailing punctuation."""
+    return _WHITESPACE.sub(" ", (prompt or "").lower()).strip(" .,;:!?\"'")
+
+
+def lemmatize(word: str) -> str:
+    """Singular / base form of an English word, preferring forms that are vocabulary words."""
+    if word in _VOCAB_WORDS or len(word) <= 3:
+        return word
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+
+    candidates = []
+    if word.endswith("ies"):
+        candidates.append(word[:-3] + "y")
+    if word.endswith("ves"):
+        candidates += [word[:-3] + "f", word[:-3] + "fe"]
+    if word.endswith("es"):
+        candidates.append(word[:-2])
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        candidates.append(word[:-1])
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            candidates += [stem, stem + "e"]
+            if len(stem) > 2 and stem[-1] == stem[-2]:
+                candidates.append(stem[:-1])
+    for candidate in candidates:
+        if candidate in _VOCAB_WORDS:
+            return candidate
+
+    # Not a vocabulary word: apply the regular plural rules only
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "sses", "zes", "oes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _merge_phrases(tokens: list[str]) -> list[str]:
+    merged = []
+    i = 0
+    while i < len(tokens):
+        pair = " ".join(tokens[i:i + 2])
+        if pair in _VOCAB_PHRASES:
+            merged.append(pair)
+            i += 2
+        else:
+            merged.append(tokens[i])
+            i += 1
+    return merged
+
+
+def canonicalize_prompt(prompt: str, concepts: bool = IMAGE_PROMPT_CONCEPTS) -> str:
+    """
+    Reduces a visual prompt to what it depicts, so that "red apple, cartoon style",
+    "A friendly red apple smiling." and "red apple cartoon" all become "red apple".
+
+    Style suffixes and filler are dropped, words are lemmatized and, with `concepts`,
+    synonyms are mapped to the vocabulary word they show. Word order is kept.
+    """
+    text = _STYLE_PHRASES.sub(" ", normalize_prompt(prompt))
+    words = []
+    for token in _merge_phrases(_TOKEN.findall(text)):
+        if token in _STYLE_WORDS or token in _FILLER_WORDS:
+            continue
+        word = lemmatize(token)
+        if concepts:
+            word = _SYNONYMS.get(word, word)
+        if word not in words:
+            words.append(word)
+    return " ".join(words) or normalize_prompt(prompt)
+
+
+def prompt_key(prompt: str) -> str:
+    """Content address of a visual prompt (hex digest of its canonical form)."""
+    return hashlib.sha256(canonicalize_prompt(prompt).encode("utf-8")).hexdigest()[:32]
@@ -0,0 +1,295 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, NamedTuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker: opens when at least MIN_CALLS calls in the rolling window failed at FAILURE_RATIO or worse
+BREAKER_WINDOW_SECONDS = float(os.getenv("DEEPSEEK_BREAKER_WINDOW_SECONDS", "60"))
+BREAKER_MIN_CALLS = int(os.getenv("DEEPSEEK_BREAKER_MIN_CALLS", "6"))
+BREAKER_FAILURE_RATIO = float(os.getenv("DEEPSEEK_BREAKER_FAILURE_RATIO", "0.5"))
+# How long the breaker stays open before a single probe request is let through
+BREAKER_OPEN_SECONDS = float(os.getenv("DEEPSEEK_BREAKER_OPEN_SECONDS", "30"))
+
+# Hedging: a second identical request is sent if the first has not answered by the call site's p95
+HEDGE_ENABLED = os.getenv("DEEPSEEK_HEDGE_ENABLED", "0") == "1"
+# Hedges only start once a call site has this many latency samples
+HEDGE_MIN_SAMPLES = int(os.getenv("DEEPSEEK_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("DEEPSEEK_HEDGE_MIN_DELAY", "1.0"))
+# Hedges may add at most this fraction of extra upstream calls
+HEDGE_MAX_RATIO = float(os.getenv("DEEPSEEK_HEDGE_MAX_RATIO", "0.1"))
+
+LATENCY_WINDOW = int(os.getenv("DEEPSEEK_LATENCY_WINDOW", "500"))
+# Latency objectives per call site (seconds); override with DEEPSEEK_SLO_<SITE>
+DEFAULT_SLO_SECONDS = {
+    "translation": 5.0,
+    "exercise": 10.0,
+    "exercise_batch": 30.0,
+    "exercise_stream": 10.0,
+    "game": 20.0,
+    "content": 30.0,
+    "tutor": 15.0,
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class Admission(NamedTuple):
+    """A call let through by a breaker: the breaker generation it was admitted in, and whether it is the probe."""
+    generation: int
+    probe: bool
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx count against the breaker; other 4xx are our own bugs."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    Closed: calls go through and outcomes are recorded. Open: calls fail fast
+    for `open_seconds`. Half-open: one probe is let through; its outcome closes
+    or re-opens the circuit. Every transition starts a new generation, and outcomes
+    of calls admitted in an earlier generation (stragglers) are ignored.
+    """
+
+    def __init__(self, name: str, window_seconds: float = BREAKER_WINDOW_SECONDS, min_calls: int = BREAKER_MIN_CALLS,
+                 failure_ratio: float = BREAKER_FAILURE_RATIO, open_seconds: float = BREAKER_OPEN_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._opened_at: float | None = None
+        self._probe_in_flight = False
+        self._generation = 0
+        self.opened = 0
+        self.rejected = 0
+        self.stragglers = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at < self.open_seconds:
+            return "open"
+        return "half_open"
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _transition(self, opened_at: float | None):
+        self._opened_at = opened_at
+        self._probe_in_flight = False
+        self._generation += 1
+
+    def allow(self) -> Admission | None:
+        """An Admission if a call may go upstream now (pass it to `record`/`release`), else None."""
+        state = self.state
+        if state == "closed":
+            return Admission(self._generation, False)
+        if state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return Admission(self._generation, True)
+        self.rejected += 1
+        return None
+
+    def release(self, admission: Admission | None = None):
+        """Gives back a half-open probe slot whose call ended without a verdict (e.g. cancelled)."""
+        if admission is None or (admission.probe and admission.generation == self._generation):
+            self._probe_in_flight = False
+
+    def record(self, ok: bool, admission: Admission | None = None):
+        now = self._clock()
+        if admission is not None and admission.generation != self._generation:
+            # Admitted before the last transition; says nothing about the upstream now
+            self.stragglers += 1
+            return
+        if self._opened_at is not None:
+            # Outcome of the half-open probe
+            if ok:
+                logger.info(f"Circuit '{self.name}' closed after a successful probe.")
+                self._transition(None)
+                self._outcomes.clear()
+            else:
+                self._transition(now)
+            return
+
+        self._outcomes.append((now, ok))
+        self._trim(now)
+        failures = sum(1 for _, success in self._outcomes if not success)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_ratio:
+            self._transition(now)
+            self.opened += 1
+            logger.warning(
+                f"Circuit '{self.name}' opened: {failures}/{len(self._outcomes)} calls failed "
+                f"in the last {self.window_seconds:.0f}s."
+            )
+
+    def stats(self) -> dict:
+        self._trim(self._clock())
+        failures = sum(1 for _, success in self._outcomes if not success)
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_failures": failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "stragglers": self.stragglers,
+        }
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LatencyTracker:
+    """Recent latencies and SLO compliance per call site."""
+
+    def __init__(self, window: int = LATENCY_WINDOW, slos: dict[str, float] = None):
+        self.window = window
+        self.slos = dict(DEFAULT_SLO_SECONDS if slos is None else slos)
+        self._samples: dict[str, deque[float]] = {}
+        self._counts: dict[str, dict[str, int]] = {}
+
+    def slo(self, site: str) -> float | None:
+        override = os.getenv(f"DEEPSEEK_SLO_{site.upper()}")
+        return float(override) if override else self.slos.get(site)
+
+    def observe(self, site: str, seconds: float, ok: bool):
+        self._samples.setdefault(site, deque(maxlen=self.window)).append(seconds)
+        counts = self._counts.setdefault(site, {"calls": 0, "errors": 0, "slo_breaches": 0})
+        counts["calls"] += 1
+        if not ok:
+            counts["errors"] += 1
+        slo = self.slo(site)
+        if slo is not None and (not ok or seconds > slo):
+            counts["slo_breaches"] += 1
+
+    def percentile(self, site: str, q: float, min_samples: int = 1) -> float | None:
+        samples = self._samples.get(site)
+        if not samples or len(samples) < min_samples:
+            return None
+        return _percentile(sorted(samples), q)
+
+    def stats(self) -> dict:
+        result = {}
+        for site, samples in self._samples.items():
+            ordered = sorted(samples)
+            counts = self._counts[site]
+            result[site] = {
+                **counts,
+                "p50": round(_percentile(ordered, 0.5), 3),
+                "p95": round(_percentile(ordered, 0.95), 3),
+                "slo": self.slo(site),
+                "slo_compliance": round(1 - counts["slo_breaches"] / counts["calls"], 3),
+            }
+        return result
+
+
+class ResilientUpstream:
+    """
+    Shared resilience layer for one upstream API: circuit breaker, per-call-site
+    latency tracking and (optionally) hedged requests.
+    """
+
+    def __init__(self, name: str, breaker: CircuitBreaker = None, latency: LatencyTracker = None,
+                 hedge_enabled: bool = HEDGE_ENABLED):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latency = latency or LatencyTracker()
+        self.hedge_enabled = hedge_enabled
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _hedge_delay(self, site: str) -> float | None:
+        if not self.hedge_enabled or self.hedges >= HEDGE_MAX_RATIO * max(self.calls, 1):
+            return None
+        p95 = self.latency.percentile(site, 0.95, HEDGE_MIN_SAMPLES)
+        return None if p95 is None else max(p95, HEDGE_MIN_DELAY)
+
+    async def _hedged(self, fn: Callable[[], Awaitable], delay: float):
+        """Runs `fn`; if it has not finished after `delay`, races a second attempt and keeps the first success."""
+        first = asyncio.create_task(fn())
+        pending = {first}
+        error = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+
+            self.hedges += 1
+            second = asyncio.create_task(fn())
+            pending.add(second)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def guard(self) -> Admission:
+        """Raises CircuitOpenError if the upstream should not be called right now; else returns the admission."""
+        admission = self.breaker.allow()
+        if admission is None:
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        return admission
+
+    def record(self, site: str, seconds: float, error: BaseException | None = None, admission: Admission | None = None):
+        """Records the outcome of a call made outside `call` (e.g. a streamed response)."""
+        failed = error is not None and is_upstream_failure(error)
+        self.breaker.record(not failed, admission)
+        self.latency.observe(site, seconds, error is None)
+
+    async def call(self, site: str, fn: Callable[[], Awaitable]):
+        """Calls `fn` through the breaker, tracking latency for `site` and hedging slow calls."""
+        admission = self.guard()
+        self.calls += 1
+        started = time.perf_counter()
+        try:
+            delay = self._hedge_delay(site)
+            result = await (self._hedged(fn, delay) if delay is not None else fn())
+        except asyncio.CancelledError:
+            # The caller went away; say nothing about the upstream's health
+            self.breaker.release(admission)
+            raise
+        except Exception as e:
+            self.record(site, time.perf_counter() - started, e, admission)
+            raise
+        self.record(site, time.perf_counter() - started, admission=admission)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.stats(),
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency": self.latency.stats(),
+        }
+
+
+deepseek_upstream = ResilientUpstream("deepseek")
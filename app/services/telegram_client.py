@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+import httpx
+
+from app.services.http_client import get_http_client, build_timeout
+from app.services.tg_file_registry import TelegramFileRegistry, tg_file_registry, file_id_from_result
+from app.services.tg_rate_limiter import TelegramRateLimiter, tg_rate_limiter, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN") or os.getenv("TG_BOT_TOKEN")
+# Bot API calls are small; uploads get a longer write timeout
+TELEGRAM_READ_TIMEOUT = float(os.getenv("TELEGRAM_READ_TIMEOUT", "15"))
+# Times a call rate-limited by Telegram (429) is retried after its retry_after
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+
+
+class TelegramAPIError(Exception):
+    """A Bot API call that Telegram answered with ok=false (or a non-2xx status)."""
+
+    def __init__(self, method: str, status_code: int, description: str, parameters: dict | None = None):
+        super().__init__(f"Telegram {method} failed ({status_code}): {description}")
+        self.method = method
+        self.status_code = status_code
+        self.description = description
+        self.parameters = parameters or {}
+
+
+class TelegramClient:
+    """
+    Async Bot API client on the shared pooled HTTP client.
+
+    Every send is a task. Sends to one chat are delivered in the order they were
+    issued (each waits for the chat's previous send), while sends to different
+    chats, and the preparation of media such as voice synthesis, run concurrently.
+    Every call passes the rate limiter first, at the priority of the send.
+    """
+
+    def __init__(self, token: str | None = BOT_TOKEN, registry: TelegramFileRegistry = tg_file_registry,
+                 http: Callable[[], httpx.AsyncClient] = get_http_client,
+                 limiter: TelegramRateLimiter = tg_rate_limiter):
+        self.token = token
+        self.registry = registry
+        self._http = http
+        self.limiter = limiter
+        # Last send issued per chat; the next one for that chat waits for it
+        self._tails: dict[int, asyncio.Task] = {}
+        self.calls = 0
+        self.errors = 0
+        self.call_seconds = 0.0
+
+    @property
+    def api_url(self) -> str:
+        return f"https://api.telegram.org/bot{self.token}"
+
+    async def call(self, method: str, payload: dict | None = None, files: dict | None = None,
+                   priority: int = PRIORITY_INTERACTIVE) -> dict:
+        """
+        Calls a Bot API method and returns its result; raises TelegramAPIError on failure.
+        Waits for the rate limiter, and on a 429 backs off for Telegram's retry_after and retries.
+        """
+        chat_id = (payload or {}).get("chat_id")
+        for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+            await self.limiter.acquire(chat_id, priority)
+            try:
+                return await self._post(method, payload, files)
+            except TelegramAPIError as e:
+                retry_after = e.parameters.get("retry_after")
+                if e.status_code != 429 or retry_after is None or attempt == TELEGRAM_MAX_RETRIES:
+                    raise
+                self.limiter.backoff(chat_id, float(retry_after))
+
+    async def _post(self, method: str, payload: dict | None, files: dict | None) -> dict:
+        started = time.perf_counter()
+        self.calls += 1
+        try:
+            client = self._http()
+            if files:
+                response = await client.post(f"{self.api_url}/{method}", data=payload, files=files,
+                                             timeout=build_timeout(TELEGRAM_READ_TIMEOUT))
+            else:
+                response = await client.post(f"{self.api_url}/{method}", json=payload,
+                                             timeout=build_timeout(TELEGRAM_READ_TIMEOUT))
+            try:
+                body = response.json()
+            except ValueError:
+                body = {"ok": False, "description": response.text}
+            if response.status_code >= 400 or not body.get("ok"):
+                raise TelegramAPIError(method, response.status_code, body.get("description", ""), body.get("parameters"))
+            return body.get("result", {})
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.call_seconds += time.perf_counter() - started
+
+    def _ordered(self, chat_id, send: Callable[[], Awaitable], prepare: Callable[[], Awaitable] | None = None) -> asyncio.Task:
+        previous = self._tails.get(chat_id)
+
+        async def run():
+            prepared = await prepare() if prepare is not None else None
+            if previous is not None:
+                # Only the order matters here; the previous send reports its own failure
+                await asyncio.gather(previous, return_exceptions=True)
+            return await (send(prepared) if prepare is not None else send())
+
+        task = asyncio.create_task(run())
+        self._tails[chat_id] = task
+        task.add_done_callback(lambda t: self._finished(chat_id, t))
+        return task
+
+    def _finished(self, chat_id, task: asyncio.Task):
+        if self._tails.get(chat_id) is task:
+            del self._tails[chat_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Telegram send to chat {chat_id} failed: {task.exception()}")
+
+    async def flush(self, chat_id):
+        """Waits until everything issued so far for this chat has been sent (or has failed)."""
+        tail = self._tails.get(chat_id)
+        if tail is not None:
+            await asyncio.gather(tail, return_exceptions=True)
+
+    async def flush_all(self):
+        await asyncio.gather(*self._tails.values(), return_exceptions=True)
+
+    def send_message(self, chat_id, text: str, reply_markup: dict | None = None,
+                     priority: int = PRIORITY_INTERACTIVE, **extra) -> asyncio.Task:
+        payload = {"chat_id": chat_id, "text": text, **extra}
+        if reply_markup:
+            payload["reply_markup"] = json.dumps(reply_markup)  # Ensure reply_markup is JSON string
+        return self._ordered(chat_id, lambda: self.call("sendMessage", payload, priority=priority))
+
+    def edit_message_text(self, chat_id, message_id: int, text: str, reply_markup: dict | None = None) -> asyncio.Task:
+        """Replaces the text (and inline keyboard) of a message the bot sent, instead of sending a new one."""
+        payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
+        if reply_markup:
+            payload["reply_markup"] = json.dumps(reply_markup)
+        return self._ordered(chat_id, lambda: self.call("editMessageText", payload))
+
+    def answer_callback_query(self, chat_id, callback_query_id: str, text: str = "") -> asyncio.Task:
+        """
+        Acknowledges an inline button press (stops the button's spinner), with an optional
+        toast. Ordered with the chat's other sends, so it goes out ahead of the edit it precedes.
+        """
+        payload = {"callback_query_id": callback_query_id}
+        if text:
+            payload["text"] = text
+        return self._ordered(chat_id, lambda: self.call("answerCallbackQuery", payload))
+
+    def send_photo(self, chat_id, photo_url: str, caption: str = "") -> asyncio.Task:
+        return self._ordered(chat_id, lambda: self.call("sendPhoto", {"chat_id": chat_id, "photo": photo_url, "caption": caption}))
+
+    def send_media(self, chat_id, method: str, field: str, key: str,
+                   load: Callable[[], tuple[str, bytes, str]], data: dict | None = None,
+                   priority: int = PRIORITY_INTERACTIVE,
+                   upload_key: Callable[[tuple[str, bytes, str]], str | None] | None = None) -> asyncio.Task:
+        """
+        Sends a media file by its Telegram file_id if it was uploaded before, else uploads it.
+        `load` (blocking: synthesis, encoding, disk) runs in a thread only when an upload is
+        needed, and before waiting for the chat's earlier sends. When what `load` produced
+        can differ from what `key` stands for (e.g. an encoding fallback), `upload_key` maps
+        the loaded file to the key its file_id is registered under (None: not registered).
+        """
+        payload = {"chat_id": chat_id, **(data or {})}
+        file_id = self.registry.get(key)
+
+        async def prepare():
+            return None if file_id is not None else await asyncio.to_thread(load)
+
+        async def send(loaded):
+            if loaded is None:
+                started = time.perf_counter()
+                try:
+                    result = await self.call(method, {**payload, field: file_id}, priority=priority)
+                    self.registry.file_id_sends += 1
+                    self.registry.file_id_seconds += time.perf_counter() - started
+                    return result
+                except TelegramAPIError as e:
+                    if e.status_code != 400:
+                        raise
+                    # Telegram rejected the stored file_id; upload the bytes again
+                    logger.warning(f"Telegram rejected stored file_id for {key[:12]}: {e.description}")
+                    self.registry.forget(key)
+                    loaded = await asyncio.to_thread(load)
+            return await self._upload(method, field, upload_key(loaded) if upload_key else key, payload, loaded, priority)
+
+        return self._ordered(chat_id, send, prepare)
+
+    async def _upload(self, method: str, field: str, key: str | None, payload: dict, loaded: tuple[str, bytes, str],
+                      priority: int = PRIORITY_INTERACTIVE) -> dict:
+        filename, content, content_type = loaded
+        started = time.perf_counter()
+        result = await self.call(method, payload, files={field: (filename, content, content_type)}, priority=priority)
+        self.registry.uploads += 1
+        self.registry.upload_bytes += len(content)
+        self.registry.upload_seconds += time.perf_counter() - started
+        new_file_id = file_id_from_result(result, field)
+        if new_file_id and key:
+            self.registry.put(key, field, new_file_id)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_call_ms": round(self.call_seconds / self.calls * 1000, 1) if self.calls else None,
+            "chats_sending": len(self._tails),
+        }
+
+
+telegram_client = TelegramClient()
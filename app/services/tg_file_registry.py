@@ -0,0 +1,127 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).resolve().parents[2] / "cache"
+TG_FILE_REGISTRY_PATH = os.getenv("TG_FILE_REGISTRY_PATH", str(CACHE_DIR / "tg_files.sqlite3"))
+
+
+def media_key(kind: str, content: bytes | str) -> str:
+    """Content address of a media file (or of what determines it, e.g. a TTS phrase key)."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(kind.encode("utf-8") + b"\0" + content).hexdigest()
+
+
+def file_id_from_result(result: dict, field: str) -> str | None:
+    """The file_id Telegram assigned to an uploaded file, from a send* method's result message."""
+    # Telegram may file an upload under another type (e.g. an MP3 sent as voice becomes audio)
+    for name in (field, "voice", "audio", "document", "photo", "animation"):
+        media = result.get(name)
+        if isinstance(media, list) and media:
+            # Photos come in several sizes; the last is the largest
+            media = media[-1]
+        if isinstance(media, dict) and media.get("file_id"):
+            return media["file_id"]
+    return None
+
+
+class TelegramFileRegistry:
+    """
+    Persistent map from a media content hash to the Telegram file_id of its first upload.
+
+    Telegram keeps uploaded files and accepts their file_id in place of the bytes,
+    so each voice phrase or character asset is uploaded once per bot and afterwards
+    sent as a single small API call.
+    """
+
+    def __init__(self, path: str = TG_FILE_REGISTRY_PATH):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uploads = 0
+        self.upload_bytes = 0
+        self.stale = 0
+        # Seconds spent in send calls, to compare uploads with file_id sends
+        self.upload_seconds = 0.0
+        self.file_id_sends = 0
+        self.file_id_seconds = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tg_files ("
+                " key TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " file_id TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> str | None:
+        try:
+            with self._lock:
+                row = self._connection().execute("SELECT file_id FROM tg_files WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Telegram file registry read failed: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, kind: str, file_id: str):
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO tg_files (key, kind, file_id, created_at) VALUES (?, ?, ?, ?)",
+                    (key, kind, file_id, time.time()),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Telegram file registry write failed: {e}")
+
+    def forget(self, key: str):
+        """Drops a file_id Telegram no longer accepts (e.g. after the bot token changed)."""
+        self.stale += 1
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("DELETE FROM tg_files WHERE key = ?", (key,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Telegram file registry delete failed: {e}")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "uploads": self.uploads,
+            "upload_bytes": self.upload_bytes,
+            "avg_upload_ms": round(self.upload_seconds / self.uploads * 1000, 1) if self.uploads else None,
+            "avg_file_id_send_ms": (
+                round(self.file_id_seconds / self.file_id_sends * 1000, 1) if self.file_id_sends else None
+            ),
+            "stale": self.stale,
+        }
+
+
+tg_file_registry = TelegramFileRegistry()
+
@@ -0,0 +1,199 @@
+import os
+import time
+import asyncio
+import bisect
+import logging
+import itertools
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows about 30 messages per second overall and about one per second in a chat
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_GLOBAL_BURST = float(os.getenv("TELEGRAM_GLOBAL_BURST", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+# A reply of a few messages goes out at once; longer runs are paced
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+# Idle per-chat buckets are dropped once more than this many chats are tracked
+TELEGRAM_RATE_MAX_CHATS = int(os.getenv("TELEGRAM_RATE_MAX_CHATS", "10000"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BROADCAST = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BROADCAST: "broadcast"}
+
+
+class TokenBucket:
+    """`rate` tokens per second up to `burst`; a rate of 0 or less means unlimited."""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = now
+        # Set from a 429's retry_after: nothing passes before this time
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        blocked = self.blocked_until - now
+        if self.rate <= 0:
+            return max(blocked, 0.0)
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, blocked, 0.0)
+
+    def take(self, now: float):
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst and self.blocked_until <= now
+
+
+class TelegramRateLimiter:
+    """
+    Token-bucket scheduler for outbound Bot API calls: one global bucket and one per chat.
+
+    A call takes a token from both buckets before it is sent. When none is available it
+    waits in a queue ordered by priority, then arrival, so interactive replies go ahead
+    of a broadcast; a waiter held back only by its own chat's bucket does not block
+    other chats. A 429 blocks the chat (or everything) for its retry_after.
+    """
+
+    def __init__(self, global_rate: float = TELEGRAM_GLOBAL_RATE, global_burst: float = TELEGRAM_GLOBAL_BURST,
+                 chat_rate: float = TELEGRAM_CHAT_RATE, chat_burst: float = TELEGRAM_CHAT_BURST,
+                 clock: Callable[[], float] = time.monotonic):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._clock = clock
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._chats: dict[int, TokenBucket] = {}
+        # Sorted by (priority, arrival); entries are (priority, seq, chat_id, future)
+        self._waiting: list[tuple[int, int, int | None, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+        self.granted = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.retry_after_backoffs = 0
+        self.max_depth_seen = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            now = self._clock()
+            if len(self._chats) >= TELEGRAM_RATE_MAX_CHATS:
+                self._chats = {key: b for key, b in self._chats.items() if not b.idle(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _delay(self, chat_id: int | None, now: float) -> tuple[float, float]:
+        """(global delay, delay including the chat's bucket) for a call to `chat_id`."""
+        global_delay = self._global.delay(now)
+        if chat_id is None:
+            return global_delay, global_delay
+        return global_delay, max(global_delay, self._chat_bucket(chat_id).delay(now))
+
+    def _take(self, chat_id: int | None, now: float):
+        self._global.take(now)
+        if chat_id is not None:
+            self._chat_bucket(chat_id).take(now)
+        self.granted += 1
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures and the dispatcher belong to one event loop
+            self._loop = loop
+            self._waiting = []
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+
+    async def acquire(self, chat_id: int | None = None, priority: int = PRIORITY_INTERACTIVE):
+        """Waits until a call to `chat_id` (None for calls not aimed at a chat) may be sent."""
+        self._bind_loop()
+        now = self._clock()
+        if not self._waiting and self._delay(chat_id, now)[1] <= 0:
+            self._take(chat_id, now)
+            return
+
+        future = self._loop.create_future()
+        bisect.insort(self._waiting, (priority, next(self._seq), chat_id, future), key=lambda entry: entry[:2])
+        self.throttled += 1
+        self.max_depth_seen = max(self.max_depth_seen, len(self._waiting))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+        try:
+            await future
+        finally:
+            self.wait_seconds += self._clock() - now
+
+    def _grant_next(self, now: float) -> float:
+        """Grants the first waiter that may go now; otherwise returns how long until one may."""
+        self._waiting = [entry for entry in self._waiting if not entry[3].done()]
+        soonest = None
+        for index, (priority, seq, chat_id, future) in enumerate(self._waiting):
+            global_delay, delay = self._delay(chat_id, now)
+            if delay <= 0:
+                self._take(chat_id, now)
+                del self._waiting[index]
+                future.set_result(None)
+                return 0.0
+            soonest = delay if soonest is None else min(soonest, delay)
+            if global_delay > 0:
+                # Nobody goes before the global bucket refills
+                break
+        return soonest if soonest is not None else 0.0
+
+    async def _dispatch(self):
+        while True:
+            if not self._waiting:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._grant_next(self._clock())
+            if delay <= 0:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def backoff(self, chat_id: int | None, retry_after: float):
+        """Holds back calls to the chat (or all calls, without a chat) for Telegram's retry_after."""
+        self.retry_after_backoffs += 1
+        until = self._clock() + retry_after
+        bucket = self._global if chat_id is None else self._chat_bucket(chat_id)
+        bucket.blocked_until = max(bucket.blocked_until, until)
+        logger.warning(f"Telegram rate limit hit for {'all chats' if chat_id is None else f'chat {chat_id}'}; "
+                       f"pausing {retry_after}s.")
+
+    def stats(self) -> dict:
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, future in self._waiting:
+            if not future.done():
+                depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        return {
+            "depth": sum(depth.values()),
+            "depth_by_priority": depth,
+            "max_depth_seen": self.max_depth_seen,
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "avg_throttle_wait_ms": round(self.wait_seconds / self.throttled * 1000, 1) if self.throttled else None,
+            "retry_after_backoffs": self.retry_after_backoffs,
+            "chats_tracked": len(self._chats),
+        }
+
+
+tg_rate_limiter = TelegramRateLimiter()
@@ -0,0 +1,145 @@
+import io
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+
+from app.services.single_flight import generation_flight
+from app.services.audio_library import AudioLibrary, audio_library
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).resolve().parents[2] / "cache"
+TTS_CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", str(CACHE_DIR / "tts")))
+
+# gTTS voices by language code or name. gTTS has no Uzbek voice; Uzbek Cyrillic is read with the Russian one
+TTS_LANGS = {
+    "en": "en", "ru": "ru", "ko": "ko", "uz": "ru",
+    "english": "en", "russian": "ru", "korean": "ko", "uzbek": "ru",
+}
+
+_EMOJI = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F700-\U0001F77F"  # alchemical symbols
+    "\U0001F780-\U0001F7FF"  # Geometric Shapes Extended
+    "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
+    "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
+    "\U0001FA00-\U0001FA6F"  # Chess Symbols
+    "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
+    "\U00002600-\U000027BF"  # Miscellaneous Symbols and Dingbats
+    "\U0001F1E6-\U0001F1FF"  # flags
+    "\U0000FE0F\U0000200D"   # variation selector, zero-width joiner
+    "]+",
+    flags=re.UNICODE,
+)
+
+
+def clean_text_for_tts(text: str) -> str:
+    """Removes emojis and other non-verbal characters for cleaner TTS output."""
+    if not isinstance(text, str):
+        return ""
+    # Only emoji and pictograph blocks: Cyrillic, Hangul and Latin text must survive
+    return _EMOJI.sub("", text).strip()
+
+
+def tts_lang(lang: str) -> str:
+    """gTTS language for a language code or name; English if unknown."""
+    return TTS_LANGS.get((lang or "").lower(), "en")
+
+
+def tts_key(text: str, lang: str, slow: bool = True) -> str:
+    """Content address of a synthesized phrase: its cleaned text, voice language and speed."""
+    raw = f"{tts_lang(lang)}\0{int(slow)}\0{clean_text_for_tts(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def synthesize_mp3(text: str, lang: str, slow: bool = True) -> bytes:
+    """Runs gTTS and returns the MP3 bytes. Blocking (network); run in a thread."""
+    from gtts import gTTS
+
+    mp3 = io.BytesIO()
+    gTTS(text=text, lang=lang, slow=slow).write_to_fp(mp3)
+    return mp3.getvalue()
+
+
+class TTSCache:
+    """
+    Disk cache of synthesized speech, one MP3 per (cleaned text, language, speed).
+
+    A phrase is synthesized once, off the event loop, and afterwards served as a
+    plain file; concurrent requests for the same phrase share one synthesis.
+    Phrases pre-rendered into the audio `library` are served from it first.
+    """
+
+    def __init__(self, directory: Path = TTS_CACHE_DIR, synthesize=synthesize_mp3,
+                 library: AudioLibrary | None = None):
+        self.directory = Path(directory)
+        self._synthesize = synthesize
+        self.library = library
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def path_for(self, key: str) -> Path:
+        # Two-level fan-out keeps directories small with tens of thousands of phrases
+        return self.directory / key[:2] / f"{key}.mp3"
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    async def _create(self, text: str, lang: str, slow: bool, path: Path) -> Path:
+        data = await asyncio.to_thread(self._synthesize, text, lang, slow)
+        await asyncio.to_thread(self._write, path, data)
+        return path
+
+    async def get(self, text: str, lang: str, slow: bool = True) -> tuple[str, Path] | None:
+        """
+        Returns (key, path) of the MP3 for this phrase, synthesizing it on a miss.
+        Returns None if nothing is left to say after cleaning; synthesis errors propagate.
+        """
+        cleaned = clean_text_for_tts(text)
+        if not cleaned:
+            return None
+        key = tts_key(cleaned, lang, slow)
+        if self.library is not None:
+            prerendered = self.library.path_for_key(key)
+            if prerendered is not None:
+                return key, prerendered
+        path = self.path_for(key)
+        if path.exists():
+            self.hits += 1
+            return key, path
+
+        self.misses += 1
+        try:
+            await generation_flight.do(("tts", key), lambda: self._create(cleaned, tts_lang(lang), slow, path))
+        except Exception:
+            self.errors += 1
+            raise
+        return key, path
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "errors": self.errors,
+        }
+
+
+tts_cache = TTSCache(library=audio_library)
@@ -0,0 +1,129 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Telegram keeps redelivering an unacknowledged update for up to a day
+TELEGRAM_DEDUP_TTL = float(os.getenv("TELEGRAM_DEDUP_TTL", str(24 * 3600)))
+TELEGRAM_DEDUP_MAX_ENTRIES = int(os.getenv("TELEGRAM_DEDUP_MAX_ENTRIES", "50000"))
+# Set to share the seen-set between processes serving the webhook (e.g. several uvicorn workers)
+TELEGRAM_DEDUP_PATH = os.getenv("TELEGRAM_DEDUP_PATH", "")
+# Expired rows are deleted every N new updates rather than on each one
+TELEGRAM_DEDUP_PRUNE_EVERY = int(os.getenv("TELEGRAM_DEDUP_PRUNE_EVERY", "500"))
+
+
+class UpdateDeduplicator:
+    """
+    Time-windowed set of Telegram update_ids already accepted, to drop redeliveries.
+
+    The in-process set is an OrderedDict in arrival order, so lookups are O(1) and the
+    oldest ids are evicted first once it is full or they are older than the TTL. With a
+    SQLite path the set is also shared between processes: an insert that hits an
+    existing, unexpired row means another worker has the update already.
+    """
+
+    def __init__(self, ttl: float = TELEGRAM_DEDUP_TTL, max_entries: int = TELEGRAM_DEDUP_MAX_ENTRIES,
+                 path: str = TELEGRAM_DEDUP_PATH):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._seen: OrderedDict[int, float] = OrderedDict()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._inserts_since_prune = 0
+        self.accepted = 0
+        self.duplicates = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tg_updates ("
+                " update_id INTEGER PRIMARY KEY,"
+                " seen_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tg_updates_seen_at ON tg_updates (seen_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _expire(self, now: float):
+        while self._seen:
+            update_id, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.ttl and len(self._seen) <= self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def _claim_shared(self, update_id: int, now: float) -> bool:
+        """Records the update in the shared table; False if another process already has it."""
+        try:
+            with self._lock:
+                conn = self._connection()
+                # Inserts a new row, or takes over one whose window has passed; no change means a live duplicate
+                cursor = conn.execute(
+                    "INSERT INTO tg_updates (update_id, seen_at) VALUES (?, ?)"
+                    " ON CONFLICT(update_id) DO UPDATE SET seen_at = excluded.seen_at WHERE seen_at < ?",
+                    (update_id, now, now - self.ttl),
+                )
+                self._inserts_since_prune += 1
+                if self._inserts_since_prune >= TELEGRAM_DEDUP_PRUNE_EVERY:
+                    self._inserts_since_prune = 0
+                    conn.execute("DELETE FROM tg_updates WHERE seen_at < ?", (now - self.ttl,))
+                conn.commit()
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            # Better to risk handling a redelivery twice than to drop a new update
+            logger.error(f"Telegram update de-duplication store failed: {e}")
+            return True
+
+    def seen(self, update_id: int | None) -> bool:
+        """Records `update_id`; returns True if it was already accepted within the window (a redelivery)."""
+        if update_id is None:
+            return False
+        now = time.time()
+        seen_at = self._seen.get(update_id)
+        if seen_at is not None and now - seen_at < self.ttl:
+            self.duplicates += 1
+            return True
+        duplicate = bool(self.path) and not self._claim_shared(update_id, now)
+        self._seen[update_id] = now
+        self._seen.move_to_end(update_id)
+        self._expire(now)
+        if duplicate:
+            self.duplicates += 1
+        else:
+            self.accepted += 1
+        return duplicate
+
+    def forget(self, update_id: int | None):
+        """Un-records an update that was not processed after all, so its redelivery is accepted."""
+        if update_id is None:
+            return
+        self._seen.pop(update_id, None)
+        if self.path:
+            try:
+                with self._lock:
+                    conn = self._connection()
+                    conn.execute("DELETE FROM tg_updates WHERE update_id = ?", (update_id,))
+                    conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Telegram update de-duplication store failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "accepted": self.accepted,
+            "duplicates_dropped": self.duplicates,
+            "tracked": len(self._seen),
+            "shared": bool(self.path),
+        }
+
+
+update_dedup = UpdateDeduplicator()
@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_UPDATE_WORKERS = int(os.getenv("TELEGRAM_UPDATE_WORKERS", "8"))
+# Updates waiting beyond this are refused (Telegram redelivers them later)
+TELEGRAM_UPDATE_QUEUE_MAX = int(os.getenv("TELEGRAM_UPDATE_QUEUE_MAX", "1000"))
+# How long shutdown waits for queued updates to be processed
+TELEGRAM_UPDATE_DRAIN_SECONDS = float(os.getenv("TELEGRAM_UPDATE_DRAIN_SECONDS", "20"))
+
+
+class UpdateQueue:
+    """
+    Work queue for incoming Telegram updates, processed by a pool of async workers.
+
+    Updates of one chat are processed strictly one after another, in arrival order;
+    different chats are processed in parallel. A chat is handed to one worker at a
+    time through the ready queue, so no locks are needed.
+    """
+
+    def __init__(self, handler: Callable[[dict], Awaitable], workers: int = TELEGRAM_UPDATE_WORKERS,
+                 max_depth: int = TELEGRAM_UPDATE_QUEUE_MAX):
+        self._handler = handler
+        self.workers = workers
+        self.max_depth = max_depth
+        self._pending: dict[int, deque[tuple[float, dict]]] = {}
+        self._ready: asyncio.Queue | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._idle: asyncio.Event | None = None
+        self._accepting = True
+        self.depth = 0
+        self.max_depth_seen = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.process_seconds = 0.0
+
+    def _ensure_ready(self) -> asyncio.Queue:
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+            self._idle = asyncio.Event()
+            self._idle.set()
+        return self._ready
+
+    def submit(self, chat_id: int, update: dict) -> bool:
+        """Queues an update; returns False if the queue is full (or shutting down) and the update was refused."""
+        ready = self._ensure_ready()
+        if not self._accepting or self.depth >= self.max_depth:
+            self.rejected += 1
+            return False
+        if not self._worker_tasks:
+            self.start()
+
+        chat_queue = self._pending.get(chat_id)
+        if chat_queue is None:
+            # The chat had no work: hand it to a worker. Otherwise its worker picks this up next
+            chat_queue = self._pending[chat_id] = deque()
+            ready.put_nowait(chat_id)
+        chat_queue.append((time.monotonic(), update))
+        self.accepted += 1
+        self.depth += 1
+        self.max_depth_seen = max(self.max_depth_seen, self.depth)
+        self._idle.clear()
+        return True
+
+    async def _work(self):
+        ready = self._ensure_ready()
+        while True:
+            chat_id = await ready.get()
+            chat_queue = self._pending[chat_id]
+            queued_at, update = chat_queue.popleft()
+            started = time.monotonic()
+            self.wait_seconds += started - queued_at
+            try:
+                await self._handler(update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Telegram update for chat {chat_id} failed: {e}", exc_info=True)
+            finally:
+                self.process_seconds += time.monotonic() - started
+                self.depth -= 1
+                if chat_queue:
+                    # Back of the line, so a busy chat does not starve the others
+                    ready.put_nowait(chat_id)
+                else:
+                    del self._pending[chat_id]
+                if self.depth == 0:
+                    self._idle.set()
+
+    def start(self):
+        self._ensure_ready()
+        self._accepting = True
+        if not any(not task.done() for task in self._worker_tasks):
+            self._worker_tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+            logger.info(f"Telegram update queue started with {self.workers} workers.")
+
+    async def stop(self, drain_seconds: float = TELEGRAM_UPDATE_DRAIN_SECONDS):
+        """Stops accepting updates, lets the workers finish what is queued (up to `drain_seconds`), then stops them."""
+        self._accepting = False
+        if self._idle is not None and self.depth:
+            logger.info(f"Draining {self.depth} queued Telegram updates...")
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=drain_seconds)
+            except asyncio.TimeoutError:
+                logger.warning(f"{self.depth} Telegram updates were still queued at shutdown.")
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        logger.info("Telegram update queue stopped.")
+
+    def stats(self) -> dict:
+        handled = self.processed + self.failed
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "max_depth_seen": self.max_depth_seen,
+            "chats_waiting": len(self._pending),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.wait_seconds / handled * 1000, 1) if handled else None,
+            "avg_process_ms": round(self.process_seconds / handled * 1000, 1) if handled else None,
+            "workers": len(self._worker_tasks),
+        }
@@ -0,0 +1,97 @@
+import os
+import time
+import shutil
+import logging
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# Telegram voice notes are OGG/Opus; speech for kids is intelligible at a low mono bitrate
+VOICE_OPUS_ENABLED = os.getenv("VOICE_OPUS_ENABLED", "1") == "1"
+VOICE_OPUS_BITRATE = os.getenv("VOICE_OPUS_BITRATE", "24k")
+VOICE_OPUS_SAMPLE_RATE = int(os.getenv("VOICE_OPUS_SAMPLE_RATE", "24000"))
+VOICE_ENCODE_TIMEOUT = float(os.getenv("VOICE_ENCODE_TIMEOUT", "10"))
+
+OPUS_CONTENT_TYPE = "audio/ogg"
+
+
+def find_ffmpeg() -> str | None:
+    """The ffmpeg binary pydub is configured with, or the one on PATH."""
+    try:
+        from pydub import AudioSegment
+        converter = AudioSegment.converter
+    except ImportError:
+        converter = "ffmpeg"
+    return shutil.which(converter) or shutil.which("ffmpeg")
+
+
+class VoiceEncoder:
+    """
+    Re-encodes MP3 speech to OGG/Opus in memory by piping it through ffmpeg.
+
+    Nothing touches the disk: the MP3 goes to ffmpeg's stdin and the Opus stream
+    comes back on stdout. Without ffmpeg (or if encoding fails) the MP3 is sent as is.
+    """
+
+    def __init__(self, ffmpeg: str | None = None, enabled: bool = VOICE_OPUS_ENABLED,
+                 bitrate: str = VOICE_OPUS_BITRATE, sample_rate: int = VOICE_OPUS_SAMPLE_RATE):
+        self.enabled = enabled
+        self.ffmpeg = ffmpeg if ffmpeg is not None else (find_ffmpeg() if enabled else None)
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.encoded = 0
+        self.fallbacks = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.encode_seconds = 0.0
+        if enabled and not self.ffmpeg:
+            logger.warning("ffmpeg not found; voice messages will be sent as MP3.")
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and bool(self.ffmpeg)
+
+    def _to_opus(self, mp3: bytes) -> bytes:
+        result = subprocess.run(
+            [
+                self.ffmpeg, "-hide_banner", "-loglevel", "error",
+                "-i", "pipe:0",
+                "-ac", "1", "-ar", str(self.sample_rate),
+                "-c:a", "libopus", "-b:a", self.bitrate, "-application", "voip",
+                "-f", "ogg", "pipe:1",
+            ],
+            input=mp3,
+            capture_output=True,
+            timeout=VOICE_ENCODE_TIMEOUT,
+            check=True,
+        )
+        return result.stdout
+
+    def encode(self, mp3: bytes) -> tuple[str, bytes, str]:
+        """Returns (file name, bytes, content type) for a voice upload: Opus if possible, else the MP3."""
+        if self.available:
+            started = time.perf_counter()
+            try:
+                opus = self._to_opus(mp3)
+                if opus:
+                    self.encoded += 1
+                    self.input_bytes += len(mp3)
+                    self.output_bytes += len(opus)
+                    self.encode_seconds += time.perf_counter() - started
+                    return "voice.ogg", opus, OPUS_CONTENT_TYPE
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.error(f"Opus encoding failed, sending MP3: {e}")
+        self.fallbacks += 1
+        return "voice.mp3", mp3, "audio/mpeg"
+
+    def stats(self) -> dict:
+        return {
+            "available": self.available,
+            "encoded": self.encoded,
+            "fallbacks": self.fallbacks,
+            "size_ratio": round(self.output_bytes / self.input_bytes, 3) if self.input_bytes else None,
+            "avg_encode_ms": round(self.encode_seconds / self.encoded * 1000, 1) if self.encoded else None,
+        }
+
+
+voice_encoder = VoiceEncoder()
@@ -138,6 +138,13 @@ TRANSLATIONS = {
     }
 }
 
+# The bot's keyboard buttons; the route strips the flag and echoes the name in native_selected / learn_selected
+LANGUAGE_BUTTON_NAMES = {"russian": "Рус тили", "english": "Инглиз тили", "korean": "Корейс тили", "uzbek": "Ўзбек тили"}
+LANGUAGE_FLAGS = {"russian": "🇷🇺", "english": "🇬🇧", "korean": "🇰🇷", "uzbek": "🇺🇿"}
+# Level slugs; buttons and level_selected show them capitalized
+LEVELS = ["beginner", "intermediate", "advanced"]
+
+
 def get_text(language_code: str, key: str, **kwargs) -> str:
     """
     Get translated text for a given language and key.
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compares single-shot and batched exercise generation against the live DeepSeek API.
+
+Reports tokens-per-exercise and seconds-per-exercise for both paths.
+Needs DEEPSEEK_API_KEY. Run from the repository root:
+
+    python -m scripts.bench_exercise_generation --count 5 --rounds 2
+"""
+import argparse
+import asyncio
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import ai_content  # noqa: E402
+from app.services.http_client import close_http_client  # noqa: E402
+
+
+async def _single(args) -> tuple[int, int, float]:
+    """Generates `count` exercises one call at a time (sequentially, as a user would)."""
+    tokens = valid = 0
+    started = time.perf_counter()
+    for _ in range(args.count):
+        payload = ai_content._exercise_payload(args.learn, args.native, args.level, args.topic)
+        data = await ai_content._post_deepseek(payload, timeout=30.0)
+        tokens += data.get("usage", {}).get("total_tokens", 0)
+        valid += len(ai_content.parse_exercise_batch(data["choices"][0]["message"]["content"]))
+    return tokens, valid, time.perf_counter() - started
+
+
+async def _batch(args) -> tuple[int, int, float]:
+    """Generates `count` exercises with a single batched call."""
+    started = time.perf_counter()
+    payload = ai_content._exercise_batch_payload(args.learn, args.native, args.level, args.topic, args.count)
+    data = await ai_content._post_deepseek(payload, timeout=60.0)
+    tokens = data.get("usage", {}).get("total_tokens", 0)
+    valid = len(ai_content.parse_exercise_batch(data["choices"][0]["message"]["content"]))
+    return tokens, valid, time.perf_counter() - started
+
+
+def _report(name: str, results: list[tuple[int, int, float]]):
+    tokens = sum(r[0] for r in results)
+    valid = sum(r[1] for r in results)
+    seconds = sum(r[2] for r in results)
+    if not valid:
+        print(f"{name:>8}: no valid exercises")
+        return
+    print(f"{name:>8}: {valid} valid exercises, "
+          f"{tokens / valid:7.1f} tokens/exercise, {seconds / valid:6.2f} s/exercise")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--learn", default="english")
+    parser.add_argument("--native", default="uzbek")
+    parser.add_argument("--level", default="beginner")
+    parser.add_argument("--topic", default="Animals")
+    parser.add_argument("--count", type=int, default=5, help="exercises per round")
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    if not ai_content.DEEPSEEK_API_KEY:
+        raise SystemExit("DEEPSEEK_API_KEY is not set.")
+
+    single, batch = [], []
+    try:
+        for _ in range(args.rounds):
+            single.append(await _single(args))
+            batch.append(await _batch(args))
+    finally:
+        await close_http_client()
+
+    _report("single", single)
+    _report("batch", batch)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-pass JSON scanner vs. the old regex-based extractor.
+
+Runs both over adversarial LLM outputs (unbalanced braces, long prose,
+nested code fences) and prints the best time per call. Run from the
+repository root:
+
+    python -m scripts.bench_json_extract
+"""
+import re
+import json
+import timeit
+
+from app.services.json_stream import find_json
+
+EXERCISE = json.dumps({
+    "question": "Бу нима?",
+    "options": ["Яблоко", "Банан", "Виноград", "Гранат"],
+    "correct_answer_index": 0,
+    "explanation": "'Яблоко' сўзи ўзбек тилида 'Олма' дегани.",
+    "visual_prompt": "A friendly red apple smiling.",
+}, ensure_ascii=False)
+
+
+def legacy_extract(text: str) -> str:
+    """The previous extract_json_from_markdown implementation, kept here for comparison."""
+    match = re.search(r'```(?:json)?\s*(\{[\s\S]*?\})\s*```', text, re.DOTALL | re.MULTILINE)
+    if match:
+        return match.group(1).strip()
+    json_match = re.search(r'(\{[\s\S]*\})', text, re.DOTALL)
+    if json_match:
+        return json_match.group(1).strip()
+    return text.strip()
+
+
+def scanner_extract(text: str) -> str:
+    found = find_json(text, "{")
+    return found.strip() if found is not None else text.strip()
+
+
+CASES = {
+    "clean fenced json": f"```json\n{EXERCISE}\n```",
+    "50 KB prose + json": ("The child is learning words. " * 1800) + EXERCISE,
+    "unbalanced braces": "{" * 5000 + " no closing brace",
+    "braces then json": "{ " * 2000 + f"```json\n{EXERCISE}\n```",
+    "nested code fences": ("```markdown\n```json\n{ \"partial\": \n```\n```\n" * 300) + EXERCISE,
+    "truncated output": "```json\n" + EXERCISE[:-1] * 20,
+}
+
+
+def _best(fn, text: str, number: int) -> float:
+    return min(timeit.repeat(lambda: fn(text), number=number, repeat=3)) / number
+
+
+def main():
+    print(f"{'case':<22}{'size':>9}{'regex (ms)':>13}{'scanner (ms)':>15}")
+    for name, text in CASES.items():
+        number = 3 if len(text) > 10_000 else 50
+        legacy = _best(legacy_extract, text, number) * 1000
+        scanner = _best(scanner_extract, text, number) * 1000
+        print(f"{name:<22}{len(text):>9}{legacy:>13.3f}{scanner:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
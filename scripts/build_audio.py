@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Pre-renders speech for every bot string in app/translations.TRANSLATIONS and
+every word in scripts/vocab.VOCAB into content/tts/, with a manifest.json that
+/tts and send_voice consult before calling gTTS. Run from the repository root:
+
+    python -m scripts.build_audio --workers 8
+
+Entries are keyed by the TTS cache key (cleaned text, voice, speed), so an
+unchanged string is skipped and an edited one is rendered under its new key.
+Strings with {placeholders} are rendered for every value the bot can fill in
+from a fixed set (language buttons, levels, topics); the rest, such as a
+question, are only known at runtime and are left to the TTS cache.
+Synthesis runs in a process pool; the manifest is saved as results arrive, so an
+interrupted build resumes where it stopped.
+"""
+import os
+import json
+import argparse
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from scripts.vocab import VOCAB
+from app.translations import TRANSLATIONS, LANGUAGE_BUTTON_NAMES, LEVELS, get_text
+from app.services.tts_cache import clean_text_for_tts, tts_key, tts_lang, synthesize_mp3
+from app.services.audio_library import AUDIO_LIBRARY_DIR, MANIFEST_NAME
+from app.services.offline_exercises import TOPICS_PATH, uzbek_latin_to_cyrillic
+
+# Speed used by the bot's send_voice and the web /tts default
+SLOW = True
+SAVE_EVERY = 20
+
+
+def template_values() -> dict[str, list[dict]]:
+    """Format arguments the bot voices each template with, as app/routes/telegram.py fills them in."""
+    topics = json.loads(TOPICS_PATH.read_text(encoding="utf-8"))
+    languages = [{"lang": name} for name in LANGUAGE_BUTTON_NAMES.values()]
+    return {
+        "native_selected": languages,
+        "learn_selected": languages,
+        "level_selected": [{"level": level.capitalize()} for level in LEVELS],
+        "topic_selected": [{"topic": topic} for names in topics.values() for topic in names],
+    }
+
+
+def collect_entries() -> dict[str, dict]:
+    """Every phrase to pre-render, keyed by its TTS cache key."""
+    entries: dict[str, dict] = {}
+
+    def add(text: str, lang: str, source: str):
+        cleaned = clean_text_for_tts(text)
+        if not cleaned or "{" in cleaned:
+            return
+        key = tts_key(cleaned, lang, SLOW)
+        entry = entries.setdefault(key, {
+            "text": cleaned,
+            "lang": tts_lang(lang),
+            "slow": SLOW,
+            "file": f"{key[:2]}/{key}.mp3",
+            "sources": [],
+        })
+        entry["sources"].append(source)
+
+    templates = template_values()
+    for language, strings in TRANSLATIONS.items():
+        for name, text in strings.items():
+            add(text, language, f"translations:{language}.{name}")
+            for values in templates.get(name, []):
+                add(get_text(language, name, **values), language, f"translations:{language}.{name}")
+
+    for group, words in VOCAB.items():
+        for code, lang_words in words.items():
+            for word in lang_words:
+                add(word, code, f"vocab:{group}.{code}")
+                if code == "uz":
+                    # The bot writes Uzbek in Cyrillic
+                    add(uzbek_latin_to_cyrillic(word), code, f"vocab:{group}.{code}")
+    return entries
+
+
+def _render(text: str, lang: str, slow: bool) -> bytes:
+    return synthesize_mp3(text, lang, slow)
+
+
+def _atomic_write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def load_manifest(directory: Path) -> dict[str, dict]:
+    try:
+        return json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8")).get("entries", {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(directory: Path, entries: dict[str, dict]):
+    manifest = {"version": 1, "entries": dict(sorted(entries.items()))}
+    _atomic_write(directory / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", type=Path, default=AUDIO_LIBRARY_DIR)
+    parser.add_argument("--workers", type=int, default=8, help="synthesis processes")
+    parser.add_argument("--limit", type=int, default=0, help="render at most this many new phrases")
+    parser.add_argument("--prune", action="store_true", help="delete audio no longer referenced by any string")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be rendered")
+    args = parser.parse_args()
+
+    wanted = collect_entries()
+    built = load_manifest(args.directory)
+    # Skip phrases whose key (a hash of text, voice and speed) is already rendered
+    done = {key: entry for key, entry in built.items() if key in wanted and (args.directory / entry["file"]).exists()}
+    todo = [key for key in wanted if key not in done]
+    if args.limit:
+        todo = todo[:args.limit]
+    stale = [key for key in built if key not in wanted]
+    print(f"{len(wanted)} phrases: {len(done)} up to date, {len(todo)} to render, {len(stale)} no longer used.")
+    if args.dry_run:
+        return
+
+    manifest = {key: {**wanted[key]} for key in done}
+    if not args.prune:
+        manifest.update({key: built[key] for key in stale})
+    else:
+        for key in stale:
+            (args.directory / built[key]["file"]).unlink(missing_ok=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(_render, wanted[key]["text"], wanted[key]["lang"], wanted[key]["slow"]): key
+            for key in todo
+        }
+        try:
+            for count, future in enumerate(as_completed(futures), 1):
+                key = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"  failed  {wanted[key]['text'][:40]!r}: {e}")
+                    continue
+                _atomic_write(args.directory / wanted[key]["file"], data)
+                manifest[key] = wanted[key]
+                if count % SAVE_EVERY == 0:
+                    save_manifest(args.directory, manifest)
+                    print(f"  {count}/{len(todo)} rendered")
+        finally:
+            save_manifest(args.directory, manifest)
+
+    covered = sum(1 for key in wanted if key in manifest)
+    print(f"Done: {len(todo) - failed} rendered, {failed} failed; {covered}/{len(wanted)} phrases pre-rendered.")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Builds the pre-rendered image library: one image per vocabulary concept, written
+to content/library/<version>/ with a manifest.json the app resolves prompts against.
+
+Images are imported from --import-dir when a file named after the concept exists
+there (e.g. apple.png, living_room.jpg), and rendered with the image model otherwise
+(needs HF_TOKEN). Concepts already in the manifest are skipped and the manifest is
+saved after every image, so an interrupted build simply resumes. Run from the
+repository root:
+
+    python -m scripts.build_image_library --concurrency 4
+    python -m scripts.build_image_library --import-dir ~/art/vocab --version v2
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.ai_content import render_image  # noqa: E402
+from app.services.http_client import close_http_client  # noqa: E402
+from app.services.image_library import ImageLibrary, IMAGE_LIBRARY_DIR, IMAGE_LIBRARY_VERSION, library_concepts  # noqa: E402
+
+_IMPORT_EXTENSIONS = {".png": "png", ".jpg": "jpg", ".jpeg": "jpg", ".webp": "webp"}
+_CONTENT_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif"}
+
+
+def find_import(import_dir: Path | None, concept: str) -> tuple[Path, str] | None:
+    if import_dir is None:
+        return None
+    for name in (concept, concept.replace(" ", "_"), concept.replace(" ", "-")):
+        for suffix, extension in _IMPORT_EXTENSIONS.items():
+            path = import_dir / f"{name}{suffix}"
+            if path.exists():
+                return path, extension
+    return None
+
+
+async def build(args) -> dict:
+    library = ImageLibrary(directory=args.directory, version=args.version)
+    assets = dict(library.assets())
+    concepts = library_concepts()
+    todo = [concept for concept in concepts if not library.has(concept)]
+    if args.limit:
+        todo = todo[:args.limit]
+    print(f"Library {library.path}: {len(concepts)} concepts, {len(concepts) - len(todo)} already built, {len(todo)} to do.")
+    if args.dry_run:
+        for concept in todo:
+            print(f"  {concept}")
+        return {"built": 0, "failed": 0}
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    lock = asyncio.Lock()
+    counts = {"imported": 0, "rendered": 0, "failed": 0}
+
+    async def build_one(concept: str):
+        async with semaphore:
+            imported = find_import(args.import_dir, concept)
+            if imported is not None:
+                path, extension = imported
+                data, source = await asyncio.to_thread(path.read_bytes), "imported"
+            else:
+                rendered = await render_image(concept)
+                if rendered is None:
+                    counts["failed"] += 1
+                    print(f"  failed    {concept}")
+                    return
+                data, content_type = rendered
+                extension, source = _CONTENT_TYPES.get(content_type.split(";")[0].strip(), "jpg"), "rendered"
+            entry = await asyncio.to_thread(library.write, concept, data, extension, source)
+        async with lock:
+            assets[concept] = entry
+            # Saved after every image so an interrupted build resumes where it stopped
+            await asyncio.to_thread(library.save_manifest, assets)
+        counts[source] += 1
+        print(f"  {source:9} {concept}")
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(build_one(concept) for concept in todo))
+    finally:
+        await close_http_client()
+    print(
+        f"Done in {time.perf_counter() - started:.1f}s: {counts['rendered']} rendered, "
+        f"{counts['imported']} imported, {counts['failed']} failed; {len(assets)}/{len(concepts)} concepts in the library."
+    )
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directory", type=Path, default=IMAGE_LIBRARY_DIR)
+    parser.add_argument("--version", default=IMAGE_LIBRARY_VERSION, help="library version (a subdirectory)")
+    parser.add_argument("--concurrency", type=int, default=4, help="images rendered at the same time")
+    parser.add_argument("--import-dir", type=Path, help="directory of ready-made images named after concepts")
+    parser.add_argument("--limit", type=int, default=0, help="build at most this many concepts")
+    parser.add_argument("--dry-run", action="store_true", help="only list the concepts still to build")
+    args = parser.parse_args()
+    counts = asyncio.run(build(args))
+    raise SystemExit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
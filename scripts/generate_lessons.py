@@ -1,7 +1,7 @@
 from scripts.vocab import VOCAB
 from scripts.levels import LEVELS
 import json
-from services.deepseek_client import ask_deepseek
+from services.deepseek_client import ask_deepseek_sync
 import os
 
 def generate(native, foreign):
@@ -85,7 +85,7 @@ for lang in LANGUAGES:
                     .replace("{{LESSON_NUMBER}}", str(lesson_number)) \
                     .replace("{{LANG}}", lang.lower())
 
-                lesson_text = ask_deepseek(prompt)
+                lesson_text = ask_deepseek_sync(prompt)
 
                 path = f"content/{lang.lower()}/{level.lower()}"
                 os.makedirs(path, exist_ok=True)
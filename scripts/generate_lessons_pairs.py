@@ -3,7 +3,7 @@ import os
 import sys
 # ensure project root is on sys.path so we can import services
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from services.deepseek_client import ask_deepseek
+from services.deepseek_client import ask_deepseek_sync
 
 PAIRS = [
     ("uz", "ru"),
@@ -46,7 +46,7 @@ def generate_pair(pair):
     for level_num, level_name in LEVELS.items():
         prompt = PROMPT_TEMPLATE.format(count=LESSONS_PER_LEVEL, pair=pair_key, level=level_name)
         try:
-            text = ask_deepseek(prompt)
+            text = ask_deepseek_sync(prompt)
             lessons = json.loads(text)
         except Exception as e:
             print("DeepSeek error, falling back to template:", e)
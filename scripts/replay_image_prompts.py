@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Replays visual prompts through the image cache key and reports how many image
+generation calls the prompt canonicalizer saves. Run from the repository root:
+
+    python -m scripts.replay_image_prompts app.log games/*.json
+
+Prompts are read from "visual_prompt" JSON fields, from the image generator's
+"Attempting to generate image for prompt: ..." log lines, or one per line from
+plain text files. Without arguments a built-in sample is replayed: every
+vocabulary word in the phrasings the exercise and game prompts ask the LLM for.
+"""
+import re
+import sys
+import json
+from collections import Counter
+
+from scripts.vocab import VOCAB
+from app.services.prompt_canon import normalize_prompt, canonicalize_prompt
+
+_JSON_FIELD = re.compile(r'"visual_prompt"\s*:\s*("(?:[^"\\]|\\.)*")')
+_LOG_LINE = re.compile(r"Attempting to generate image for prompt: (.+)$")
+
+SAMPLE_PHRASINGS = [
+    "{word}, cartoon style",
+    "A friendly {word} smiling.",
+    "{word} cartoon",
+    "A simple, friendly cartoon picture of a {word} for a child.",
+    "{word}",
+]
+
+
+def prompts_from_file(path: str) -> list[str]:
+    prompts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = _JSON_FIELD.findall(line)
+            if fields:
+                prompts += [json.loads(field) for field in fields]
+                continue
+            match = _LOG_LINE.search(line)
+            if match:
+                prompts.append(match.group(1).strip())
+            elif line.strip() and not path.endswith(".json"):
+                prompts.append(line.strip())
+    return prompts
+
+
+def sample_prompts() -> list[str]:
+    words = [word for group in VOCAB.values() for word in group["en"]]
+    return [phrasing.format(word=word) for word in words for phrasing in SAMPLE_PHRASINGS]
+
+
+def replay(prompts: list[str]) -> dict:
+    """Image calls made with the old normalized key versus the canonical key."""
+    normalized = Counter(normalize_prompt(prompt) for prompt in prompts)
+    canonical = Counter(canonicalize_prompt(prompt) for prompt in prompts)
+    return {
+        "prompts": len(prompts),
+        "calls_normalized": len(normalized),
+        "calls_canonical": len(canonical),
+        "reduction": round(1 - len(canonical) / len(normalized), 3) if normalized else 0.0,
+        "top_keys": canonical.most_common(10),
+    }
+
+
+def main(paths: list[str]):
+    prompts = [prompt for path in paths for prompt in prompts_from_file(path)] if paths else sample_prompts()
+    if not prompts:
+        print("No visual prompts found.")
+        return
+    report = replay(prompts)
+    print(f"Prompts replayed:                {report['prompts']}")
+    print(f"Image calls (normalized key):    {report['calls_normalized']}")
+    print(f"Image calls (canonical key):     {report['calls_canonical']}")
+    print(f"Reduction in image calls:        {report['reduction']:.1%}")
+    print("Most shared canonical keys:")
+    for key, count in report["top_keys"]:
+        print(f"  {count:4d}  {key}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
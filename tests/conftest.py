@@ -0,0 +1,29 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.telegram_client import TelegramClient
+from app.services.tg_file_registry import TelegramFileRegistry
+from app.services.tg_rate_limiter import TelegramRateLimiter
+
+
+async def _ok(request):
+    return httpx.Response(200, json={"ok": True, "result": True})
+
+
+@pytest.fixture
+def telegram_client(tmp_path):
+    """
+    TelegramClient on a mock Bot API, with its own file registry and an unthrottled rate limiter.
+    A test answers the Bot API calls by setting `telegram_client.api` to an async httpx handler.
+    """
+    async def dispatch(request):
+        return await client.api(request)
+
+    http = httpx.AsyncClient(transport=httpx.MockTransport(dispatch))
+    client = TelegramClient(token="t", registry=TelegramFileRegistry(str(tmp_path / "tg_files.sqlite3")),
+                            http=lambda: http, limiter=TelegramRateLimiter(global_rate=0, chat_rate=0))
+    client.api = _ok
+    yield client
+    asyncio.run(http.aclose())
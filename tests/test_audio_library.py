@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import app.routes.telegram as telegram
+from app.services.audio_library import AudioLibrary
+from app.services.session import set_state
+from app.services.tts_cache import TTSCache, clean_text_for_tts, tts_key
+from scripts.build_audio import collect_entries
+
+
+def test_build_collects_bot_strings_and_vocab_without_templates():
+    entries = collect_entries()
+    texts = {entry["text"] for entry in entries.values()}
+    assert "Тўғри жавоб! Баракалла!" in texts
+    assert "mushuk" in texts and "мушук" in texts
+    assert not any("{" in text for text in texts)
+    assert tts_key("Тўғри жавоб! Баракалла!", "uzbek") in entries
+
+
+def test_prerendered_audio_is_served_without_synthesis(tmp_path):
+    key = tts_key("apple", "en")
+    (tmp_path / "library" / key[:2]).mkdir(parents=True)
+    (tmp_path / "library" / key[:2] / f"{key}.mp3").write_bytes(b"ID3")
+    (tmp_path / "library" / "manifest.json").write_text(json.dumps({"entries": {key: {"file": f"{key[:2]}/{key}.mp3"}}}))
+
+    def synthesize(text, lang, slow):
+        raise AssertionError("pre-rendered audio must not be synthesized")
+
+    cache = TTSCache(directory=tmp_path / "cache", synthesize=synthesize, library=AudioLibrary(tmp_path / "library"))
+    found_key, path = asyncio.run(cache.get("apple 🍎", "english"))
+    assert found_key == key and path.read_bytes() == b"ID3"
+
+
+class ErrorPool:
+    async def get_exercise(self, **kwargs):
+        return {"error": "offline"}
+
+
+def test_prompts_voiced_while_choosing_are_prerendered(monkeypatch):
+    voiced, keyboards = [], []
+    monkeypatch.setattr(telegram, "send_voice", lambda chat_id, text, lang: voiced.append((text, lang)))
+    monkeypatch.setattr(telegram, "send_message", lambda chat_id, text, reply_markup=None: keyboards.append(reply_markup))
+    monkeypatch.setattr(telegram, "exercise_pool", ErrorPool())
+
+    def press(chat_id, text):
+        asyncio.run(telegram.process_update({"message": {"chat": {"id": chat_id}, "text": text}}))
+        keyboard = (keyboards[-1] or {}).get("keyboard", [])
+        return [button["text"] for row in keyboard for button in row if button["text"] != "/start"]
+
+    # Press every button the bot offers, the way a user would
+    chat_id = 9000
+    for native in press(chat_id, "/start"):
+        for learn in press(chat_id, native):
+            for level in press(chat_id, learn):
+                topics = press(chat_id, level)
+                for topic in topics:
+                    press(chat_id, topic)
+                    set_state(chat_id, current_mode="choose_topic")
+                set_state(chat_id, current_mode="choose_level")
+            set_state(chat_id, current_mode="choose_learn_language")
+        set_state(chat_id, current_mode="choose_native_language")
+
+    entries = collect_entries()
+    assert len(voiced) == 4 * (1 + 4 * (1 + 3 * (1 + 8)))
+    missing = {text for text, lang in voiced if tts_key(clean_text_for_tts(text), lang) not in entries}
+    assert not missing
@@ -0,0 +1,30 @@
+import asyncio
+import importlib
+import json
+import time
+
+import httpx
+
+
+def test_ask_deepseek_runs_concurrently_on_the_shared_client(monkeypatch, tmp_path):
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "test-key")
+    deepseek_client = importlib.import_module("app.services.deepseek_client")
+    monkeypatch.setattr(deepseek_client, "DEEPSEEK_API_KEY", "test-key")
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        return httpx.Response(200, json={"choices": [{"message": {"content": prompt.upper()}}]})
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(deepseek_client, "get_http_client", lambda: client)
+        started = time.perf_counter()
+        replies = await asyncio.gather(*(deepseek_client.ask_deepseek(f"salom {i}") for i in range(50)))
+        await client.aclose()
+        return replies, time.perf_counter() - started
+
+    replies, elapsed = asyncio.run(scenario())
+    assert replies[7] == "SALOM 7"
+    # 50 waits overlap instead of queueing behind each other
+    assert elapsed < 1.0
@@ -0,0 +1,117 @@
+import asyncio
+
+from app.services.exercise_pool import ExercisePool, pool_key
+from app.services.progress import _hash_exercise
+
+
+def _exercise(n):
+    return {"question": f"Q{n}", "options": ["a", "b", "c", "d"], "correct_answer_index": 0}
+
+
+def _counting_generator():
+    calls = []
+
+    async def generate(learn, native, level, topic, exclude_hashes=None):
+        calls.append((learn, native, level, topic))
+        return _exercise(len(calls))
+
+    return generate, calls
+
+
+def _batch_generator():
+    calls = []
+
+    async def generate_batch(learn, native, level, topic, count):
+        calls.append(count)
+        return [_exercise(i) for i in range(count)]
+
+    return generate_batch, calls
+
+
+def test_pop_counts_hits_and_misses():
+    generate, _ = _counting_generator()
+    pool = ExercisePool(generate=generate, low_water=2)
+    key = pool_key("english", "uzbek", "beginner", "Animals")
+
+    assert pool.pop(key) is None
+    pool.put(key, _exercise(1))
+    assert pool.pop(key) == _exercise(1)
+
+    stats = pool.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_pop_skips_completed_exercises():
+    generate, _ = _counting_generator()
+    pool = ExercisePool(generate=generate)
+    key = pool_key("english", "uzbek", "beginner", "Animals")
+    pool.put(key, _exercise(1))
+    pool.put(key, _exercise(2))
+
+    exercise = pool.pop(key, exclude_hashes=[_hash_exercise(_exercise(1))])
+    assert exercise == _exercise(2)
+    assert pool.size(key) == 1
+
+
+def test_get_exercise_falls_back_to_live_generation():
+    generate, calls = _counting_generator()
+    pool = ExercisePool(generate=generate)
+
+    exercise = asyncio.run(pool.get_exercise("english", "uzbek", "beginner", "Animals"))
+    assert exercise == _exercise(1)
+    assert calls == [("english", "uzbek", "beginner", "Animals")]
+
+
+def test_worker_refills_to_low_water_in_batches():
+    generate, single_calls = _counting_generator()
+    generate_batch, batch_calls = _batch_generator()
+
+    async def scenario():
+        pool = ExercisePool(generate=generate, generate_batch=generate_batch, low_water=3)
+        pool.start()
+        key = pool_key("english", "uzbek", "beginner", "Animals")
+        assert pool.pop(key) is None
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if pool.size(key) >= 3:
+                break
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert pool.size(pool_key("english", "uzbek", "beginner", "Animals")) == 3
+    assert pool.stats()["refilled"] == 3
+    assert batch_calls == [3]
+    assert single_calls == []
+
+
+def test_keys_are_bounded():
+    generate, _ = _counting_generator()
+    pool = ExercisePool(generate=generate, max_keys=2)
+    for topic in ["a", "b", "c"]:
+        pool.put(pool_key("english", "uzbek", "beginner", topic), _exercise(1))
+    assert pool.stats()["keys"] == 2
+    assert pool.size(pool_key("english", "uzbek", "beginner", "a")) == 0
+
+
+def test_parse_exercise_batch_keeps_valid_subset():
+    from app.ai_content import parse_exercise_batch
+
+    content = """```json
+    [
+      {"question": "Бу нима?", "options": ["Cat", "Dog", "Cow", "Fish"], "correct_answer_index": 0},
+      {"question": "Бу нима?", "options": ["Cat", "Dog"], "correct_answer_index": 0},
+      {"question": "Бу нима?", "options": ["Cat", "Dog", "Cow", "Fish"], "correct_answer_index": 7}
+    ]
+    ```"""
+    exercises = parse_exercise_batch(content)
+    assert len(exercises) == 1
+    assert exercises[0]["options"][0] == "Cat"
+
+
+def test_parse_exercise_batch_accepts_wrapped_array():
+    from app.ai_content import parse_exercise_batch
+
+    content = '{"exercises": [{"question": "Q", "options": ["a", "b", "c", "d"], "correct_answer_index": 2}]}'
+    assert len(parse_exercise_batch(content)) == 1
@@ -0,0 +1,41 @@
+import asyncio
+
+from app import ai_content
+
+EXERCISE_TEXT = (
+    '```json\n{"question": "Бу нима?", "options": ["Cat", "Dog", "Cow", "Fish"], '
+    '"correct_answer_index": 1, "explanation": "Dog", "visual_prompt": "a dog"}\n```'
+)
+
+
+def _collect(monkeypatch, text, chunk_size=7):
+    async def fake_stream(payload, timeout):
+        assert payload["messages"]
+        for i in range(0, len(text), chunk_size):
+            yield text[i:i + chunk_size]
+
+    async def run():
+        return [event async for event in ai_content.stream_multiple_choice_exercise("english", "uzbek", "beginner", "Animals")]
+
+    monkeypatch.setattr(ai_content, "DEEPSEEK_API_KEY", "test-key")
+    monkeypatch.setattr(ai_content, "_stream_deepseek", fake_stream)
+    return asyncio.run(run())
+
+
+def test_fields_are_emitted_before_the_full_exercise(monkeypatch):
+    events = _collect(monkeypatch, EXERCISE_TEXT)
+    assert [name for name, _ in events] == ["question", "options", "exercise"]
+    assert events[0][1] == "Бу нима?"
+    assert events[1][1] == ["Cat", "Dog", "Cow", "Fish"]
+    assert events[2][1]["correct_answer_index"] == 1
+
+
+def test_invalid_stream_reports_error(monkeypatch):
+    events = _collect(monkeypatch, '{"question": "Бу нима?", "options": ["Cat"]}')
+    assert events[-1] == ("error", "Failed to decode JSON from the API response.")
+
+
+def test_partial_field_waits_for_complete_value():
+    assert ai_content._partial_field('{"question": "Бу ни', "question") is None
+    assert ai_content._partial_field('{"question": "Бу нима?", "opt', "question") == "Бу нима?"
+    assert ai_content._partial_field('{"options": ["a", "b"', "options") is None
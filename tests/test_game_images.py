@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import app.ai_content
+from app.game_generator import PLACEHOLDER_IMAGE_URL, generate_game_images
+
+
+def _memory_game(n):
+    return {"game_type": "memory", "pairs": [{"id": i, "word": f"w{i}", "visual_prompt": f"p{i}"} for i in range(n)]}
+
+
+def test_images_are_generated_concurrently(monkeypatch):
+    async def fake_generate_image(prompt):
+        await asyncio.sleep(0.1)
+        return f"/static/generated/{prompt}.jpg"
+
+    monkeypatch.setattr(app.ai_content, "generate_image", fake_generate_image)
+    started = time.perf_counter()
+    game = asyncio.run(generate_game_images(_memory_game(8)))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.5  # one image call, not eight
+    assert [pair["image_url"] for pair in game["pairs"]] == [f"/static/generated/p{i}.jpg" for i in range(8)]
+    assert all(pair["image_latency_ms"] >= 100 for pair in game["pairs"])
+
+
+def test_slow_and_failed_images_get_placeholders(monkeypatch):
+    async def fake_generate_image(prompt):
+        if prompt == "p0":
+            await asyncio.sleep(5)
+        if prompt == "p1":
+            return None
+        return "/static/generated/ok.jpg"
+
+    monkeypatch.setattr(app.ai_content, "generate_image", fake_generate_image)
+    game = asyncio.run(generate_game_images(_memory_game(3), deadline=0.1))
+    slow, failed, ok = game["pairs"]
+
+    assert slow["image_url"] == PLACEHOLDER_IMAGE_URL and slow["image_placeholder"] and slow["image_latency_ms"] is None
+    assert failed["image_url"] == PLACEHOLDER_IMAGE_URL and failed["image_placeholder"]
+    assert ok["image_url"] == "/static/generated/ok.jpg" and "image_placeholder" not in ok
@@ -0,0 +1,69 @@
+import asyncio
+
+import app.services.image_jobs as image_jobs_module
+from app.services.image_jobs import ImageJobQueue, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH
+from app.services.image_store import ImageStore
+
+
+def test_jobs_are_deduplicated_and_interactive_runs_first(monkeypatch, tmp_path):
+    monkeypatch.setattr(image_jobs_module, "image_store", ImageStore(directory=tmp_path, variants=False))
+    order = []
+
+    async def generate(prompt):
+        order.append(prompt)
+        return f"/static/generated/{prompt}.jpg"
+
+    async def scenario():
+        queue = ImageJobQueue(generate=generate, workers=1)
+        prefetch = queue.submit("prefetched cat", PRIORITY_PREFETCH)
+        first = queue.submit("Red apple", PRIORITY_INTERACTIVE)
+        again = queue.submit("red apple.", PRIORITY_INTERACTIVE)
+        queue.start()
+        await queue.wait([first.id], timeout=1)
+        await queue.wait([prefetch.id], timeout=1)
+        await queue.stop()
+        return queue, prefetch, first, again
+
+    queue, prefetch, first, again = asyncio.run(scenario())
+    assert first is again
+    assert order == ["Red apple", "prefetched cat"]
+    assert first.to_dict()["status"] == "done"
+    assert prefetch.image_url == "/static/generated/prefetched cat.jpg"
+    assert queue.stats()["deduplicated"] == 1
+
+
+def test_stored_images_are_done_without_generating(monkeypatch, tmp_path):
+    store = ImageStore(directory=tmp_path, variants=False)
+    monkeypatch.setattr(image_jobs_module, "image_store", store)
+
+    async def generate(prompt):
+        raise AssertionError("should not generate a stored image")
+
+    async def scenario():
+        url = await store.put("green pear", b"\xff\xd8jpeg-bytes")
+        queue = ImageJobQueue(generate=generate)
+        job = queue.submit("Green pear")
+        return url, job, ImageJobQueue(generate=generate).get(job.id)
+
+    url, job, after_restart = asyncio.run(scenario())
+    assert job.status == "done" and job.image_url == url
+    assert after_restart.status == "done" and after_restart.image_url == url
+
+
+def test_game_page_polls_pending_image_jobs():
+    import json
+    import re
+    from app.routes.webapp import templates
+
+    game_data = {"game_type": "memory", "pairs": [
+        {"id": 1, "word": "olma", "image_url": "/images/a.webp"},
+        {"id": 2, "word": "mushuk", "image_job": "job123"},
+    ]}
+    page = templates.env.get_template("game.html").render(
+        request=None, game_data=game_data, game_json=json.dumps(game_data),
+        native_language_name="", native_language_slug="uzbek", learn_language_name="",
+        learn_language_slug="russian", level="beginner", topic="animals",
+    )
+    assert '"image_job": "job123"' in page
+    # The page starts the long-poll right after building the cards
+    assert re.search(r"initGame\(\);\s*pollImageJobs\(\);", page)
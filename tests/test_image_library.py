@@ -0,0 +1,33 @@
+import asyncio
+
+from app.services.image_library import ImageLibrary
+from app.services.image_store import ImageStore
+from app.services.prompt_canon import prompt_key
+
+
+def test_prompts_resolve_to_library_concepts(tmp_path):
+    library = ImageLibrary(directory=tmp_path / "library", version="v1", variants=False)
+    library.save_manifest({
+        "apple": library.write("apple", b"\xff\xd8apple", "jpg", "imported"),
+        "living room": library.write("living room", b"\xff\xd8room", "jpg", "imported"),
+    })
+
+    apple_url = f"/static/library/v1/{prompt_key('apple')}.jpg"
+    assert library.resolve("A friendly red apple smiling.") == apple_url
+    assert library.resolve("apples, cartoon style") == apple_url
+    assert library.resolve("the big living room") is not None
+    # Counting pictures and scenes are not answered with a single concept
+    assert library.resolve("two red apples") is None
+    assert library.resolve("a boy eating an apple") is None
+
+
+def test_store_answers_from_library_before_generating(tmp_path):
+    library = ImageLibrary(directory=tmp_path / "library", version="v1", variants=False)
+    library.save_manifest({"cat": library.write("cat", b"\xff\xd8cat", "jpg", "rendered")})
+    store = ImageStore(directory=tmp_path / "generated", variants=False, library=library)
+
+    assert store.get("kitten, cartoon style") == f"/static/library/v1/{prompt_key('cat')}.jpg"
+    assert store.get("red car") is None
+    url = asyncio.run(store.put("red car", b"\xff\xd8car"))
+    assert store.get("red car") == url
+    assert store.url_for_key(prompt_key("cat")) == store.get("cat")
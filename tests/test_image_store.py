@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.ai_content as ai_content
+from app.services.image_store import ImageStore, ImmutableStaticFiles, prompt_key
+
+
+def test_prompts_are_normalized_before_hashing():
+    assert prompt_key("A friendly  red Apple.") == prompt_key("a friendly red apple")
+    assert prompt_key("red apple") != prompt_key("green apple")
+
+
+def test_generate_image_stores_once_and_serves_url(monkeypatch, tmp_path):
+    store = ImageStore(directory=tmp_path, url_prefix="/static/generated", variants=False)
+    monkeypatch.setattr(ai_content, "image_store", store)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, content=b"\xff\xd8jpeg-bytes", headers={"content-type": "image/jpeg"})
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(ai_content, "get_http_client", lambda: client)
+        first = await asyncio.gather(*(ai_content.generate_image("Red apple") for _ in range(3)))
+        again = await ai_content.generate_image("red apple.")
+        await client.aclose()
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first == [again] * 3
+    assert again == f"/static/generated/{prompt_key('red apple')}.jpg"
+    assert (tmp_path / again.rsplit("/", 1)[1]).read_bytes() == b"\xff\xd8jpeg-bytes"
+
+
+def test_generated_images_are_served_immutable(tmp_path):
+    (tmp_path / "abc.jpg").write_bytes(b"jpeg")
+    app = FastAPI()
+    app.mount("/static/generated", ImmutableStaticFiles(directory=str(tmp_path)))
+    response = TestClient(app).get("/static/generated/abc.jpg")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_card_variants_are_negotiated_by_accept(monkeypatch, tmp_path):
+    from io import BytesIO
+
+    from PIL import Image
+
+    import app.routes.images as images_route
+
+    original = BytesIO()
+    Image.new("RGB", (768, 768), "orange").save(original, format="JPEG", quality=95)
+    store = ImageStore(directory=tmp_path, variants=True)
+    monkeypatch.setattr(images_route, "image_store", store)
+
+    url = asyncio.run(store.put("orange ball", original.getvalue(), "image/jpeg"))
+    key = prompt_key("orange ball")
+    assert url == f"/images/{key}"
+    assert store.blur_data_url(url).startswith("data:image/jpeg;base64,")
+
+    app = FastAPI()
+    app.include_router(images_route.router)
+    client = TestClient(app)
+    webp = client.get(url, headers={"accept": "image/webp,image/*"})
+    jpeg = client.get(url, headers={"accept": "*/*"})
+    assert webp.headers["content-type"] == "image/webp"
+    assert jpeg.headers["content-type"] == "image/jpeg"
+    assert webp.headers["vary"] == "Accept"
+    assert len(webp.content) < len(original.getvalue())
+    with Image.open(BytesIO(jpeg.content)) as card:
+        assert max(card.size) == 320
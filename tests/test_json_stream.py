@@ -0,0 +1,45 @@
+import json
+
+from app.ai_content import extract_json_from_markdown
+from app.services.json_stream import JSONScanner, find_json
+
+
+def test_fenced_json_with_braces_inside_strings():
+    text = 'Here you go:\n```json\n{"question": "x}y", "options": ["{", "]"]}\n```'
+    assert json.loads(find_json(text)) == {"question": "x}y", "options": ["{", "]"]}
+
+
+def test_skips_invalid_candidates_in_prose():
+    text = 'Use {curly} braces, then {"ok": true} and {"later": 1}'
+    assert find_json(text) == '{"ok": true}'
+
+
+def test_stray_opening_brace_before_json():
+    text = 'prose { never closed ```json\n{"a": {"b": 1}}\n```'
+    assert find_json(text) == '{"a": {"b": 1}}'
+
+
+def test_openers_restrict_top_level_value():
+    text = 'see [1] and [{"x": 1}]'
+    assert find_json(text) == "[1]"
+    assert find_json(text, "{") == '{"x": 1}'
+
+
+def test_no_json_or_truncated_json():
+    assert find_json("no json here") is None
+    assert find_json('{"question": "unfinished') is None
+    assert extract_json_from_markdown("  plain text ") == "plain text"
+
+
+def test_incremental_feed_matches_one_shot():
+    text = '```json\n{"question": "Бу \\"нима\\"?", "options": ["a", "b"]}\n```'
+    scanner = JSONScanner("{")
+    results = [scanner.feed(ch) for ch in text]
+    assert results[-1] == find_json(text, "{")
+    # Nothing is reported before the object closes
+    first = next(i for i, r in enumerate(results) if r is not None)
+    assert text[first] == "}"
+
+
+def test_unbalanced_braces_stay_fast():
+    assert find_json("{" * 100_000) is None
@@ -0,0 +1,85 @@
+import time
+
+from app.services.llm_cache import LLMCache, cache_key
+
+
+def _payload(text, temperature=0.8):
+    return {
+        "model": "deepseek-chat",
+        "messages": [{"role": "user", "content": text}],
+        "temperature": temperature,
+        "max_tokens": 500,
+    }
+
+
+def test_key_depends_on_request_content():
+    assert cache_key(_payload("salom")) == cache_key(_payload("salom"))
+    assert cache_key(_payload("salom")) != cache_key(_payload("salom", temperature=0.2))
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "llm.sqlite3"))
+
+    assert cache.get(_payload("salom")) is None
+    cache.set(_payload("salom"), "привет", ttl=60)
+    assert cache.get(_payload("salom")) == "привет"
+
+    cache.set(_payload("xayr"), "пока", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get(_payload("xayr")) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.llm_cache.LLM_CACHE_EVICT_EVERY", 1)
+    cache = LLMCache(path=str(tmp_path / "llm.sqlite3"), max_entries=2)
+
+    cache.set(_payload("a"), "A", ttl=60)
+    cache.set(_payload("b"), "B", ttl=60)
+    assert cache.get(_payload("a")) == "A"  # "b" is now least recently used
+    cache.set(_payload("c"), "C", ttl=60)
+
+    assert cache.get(_payload("b")) is None
+    assert cache.get(_payload("a")) == "A"
+    assert cache.get(_payload("c")) == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    LLMCache(path=path).set(_payload("salom"), "привет", ttl=60)
+    assert LLMCache(path=path).get(_payload("salom")) == "привет"
+
+
+def test_expired_entries_can_be_served_stale(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "llm.sqlite3"))
+    cache.set(_payload("salom"), "привет", ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get(_payload("salom")) is None
+    assert cache.get(_payload("salom"), stale_ok=True) == "привет"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_hits_batch_their_lru_updates(tmp_path, monkeypatch):
+    import sqlite3
+
+    monkeypatch.setattr("app.services.llm_cache.LLM_CACHE_TOUCH_FLUSH_EVERY", 2)
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMCache(path=path)
+    cache.set(_payload("a"), "A", ttl=60)
+    cache.set(_payload("b"), "B", ttl=60)
+
+    def last_access(text):
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT last_access FROM llm_cache WHERE key = ?", (cache_key(_payload(text)),)).fetchone()[0]
+
+    written = last_access("a")
+    time.sleep(0.01)
+    assert cache.get(_payload("a")) == "A"
+    assert last_access("a") == written  # kept in memory, no write per hit
+    assert cache.get(_payload("b")) == "B"
+    assert last_access("a") > written  # the batch is written once it is full
@@ -0,0 +1,53 @@
+import asyncio
+import random
+
+from app.ai_content import is_valid_exercise
+from app.services.exercise_pool import ExercisePool
+from app.services.offline_exercises import generate_offline_exercises, uzbek_latin_to_cyrillic
+from app.services.progress import _hash_exercise
+
+
+def test_exercises_have_the_generator_shape_and_same_topic_distractors():
+    exercises = generate_offline_exercises("english", "uzbek", "beginner", "Hayvonlar", count=5, rng=random.Random(0))
+    assert len(exercises) == 5
+    assert len({_hash_exercise(e) for e in exercises}) == 5
+    animals = {"cat", "dog", "cow", "mouse", "chicken", "lion", "tiger", "bear", "wolf", "elephant",
+               "bird", "eagle", "duck", "parrot", "owl", "fish", "shark", "whale", "dolphin", "octopus",
+               "bee", "butterfly", "ant", "spider", "fly"}
+    for exercise in exercises:
+        assert is_valid_exercise(exercise)
+        assert set(exercise) == {"question", "options", "correct_answer_index", "explanation", "visual_prompt"}
+        assert len(set(exercise["options"])) == 4
+        assert set(exercise["options"]) <= animals
+
+
+def test_excluded_exercises_are_skipped_and_unknown_topics_are_unsupported():
+    first = generate_offline_exercises("russian", "uzbek", "beginner", "Animals", count=100, rng=random.Random(1))
+    rest = generate_offline_exercises("russian", "uzbek", "beginner", "Animals", count=100,
+                                      exclude_hashes=[_hash_exercise(e) for e in first[:10]], rng=random.Random(1))
+    assert not {_hash_exercise(e) for e in first[:10]} & {_hash_exercise(e) for e in rest}
+    assert generate_offline_exercises("english", "uzbek", "beginner", "Space travel") == []
+
+
+def test_uzbek_is_shown_in_cyrillic():
+    assert uzbek_latin_to_cyrillic("yo'lbars") == "йўлбарс"
+    assert uzbek_latin_to_cyrillic("Shahar") == "Шаҳар"
+    assert uzbek_latin_to_cyrillic("qo'g'irchoq") == "қўғирчоқ"
+
+
+def test_pool_serves_offline_levels_and_falls_back_on_errors():
+    calls = []
+
+    async def failing(learn, native, level, topic, exclude_hashes=None):
+        calls.append(level)
+        return {"error": "DeepSeek API Error: 503"}
+
+    pool = ExercisePool(generate=failing, offline_levels={"beginner"})
+    beginner = asyncio.run(pool.get_exercise("english", "uzbek", "beginner", "Animals"))
+    advanced = asyncio.run(pool.get_exercise("english", "uzbek", "advanced", "Animals"))
+
+    assert is_valid_exercise(beginner) and is_valid_exercise(advanced)
+    assert calls == ["advanced"]
+    assert pool.stats()["offline_served"] == 1
+    assert pool.stats()["offline_fallbacks"] == 1
+
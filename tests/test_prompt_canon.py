@@ -0,0 +1,24 @@
+from app.services.image_store import prompt_key
+from app.services.prompt_canon import canonicalize_prompt, lemmatize
+
+
+def test_prompt_variants_share_one_cache_key():
+    variants = ["red apple, cartoon style", "A friendly red apple smiling.", "red apple cartoon", "Red apples"]
+    assert {canonicalize_prompt(prompt) for prompt in variants} == {"red apple"}
+    assert len({prompt_key(prompt) for prompt in variants}) == 1
+    assert prompt_key("red apple") != prompt_key("green apple")
+
+
+def test_lemmatize_and_concepts():
+    assert lemmatize("strawberries") == "strawberry"
+    assert lemmatize("wolves") == "wolf"
+    assert lemmatize("glasses") == "glasses"
+    assert canonicalize_prompt("two kittens on a white background") == "two cat"
+    assert canonicalize_prompt("two kittens", concepts=False) == "two kitten"
+    assert canonicalize_prompt("the living room") == "living room"
+
+
+def test_spatial_prepositions_are_kept():
+    assert canonicalize_prompt("A cat in the box, cartoon style") == "cat in box"
+    assert prompt_key("a cat in the box") != prompt_key("a cat on the box")
+    assert prompt_key("a cat on the box") != prompt_key("a cat at the box")
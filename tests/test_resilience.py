@@ -0,0 +1,136 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, ResilientUpstream
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _server_error():
+    request = httpx.Request("POST", "https://api.deepseek.com/v1/chat/completions")
+    return httpx.HTTPStatusError("503", request=request, response=httpx.Response(503, request=request))
+
+
+def test_breaker_opens_fails_fast_and_recovers_after_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", window_seconds=60, min_calls=4, failure_ratio=0.5, open_seconds=30, clock=clock)
+    upstream = ResilientUpstream("test", breaker=breaker, latency=LatencyTracker(slos={}))
+
+    async def failing():
+        raise _server_error()
+
+    async def scenario():
+        for _ in range(4):
+            with pytest.raises(httpx.HTTPStatusError):
+                await upstream.call("exercise", failing)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await upstream.call("exercise", failing)
+
+        clock.now += 31
+        assert breaker.state == "half_open"
+        assert await upstream.call("exercise", lambda: asyncio.sleep(0, result="ok")) == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
+    assert breaker.stats()["opened"] == 1
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_stragglers_from_before_a_transition_are_ignored():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", window_seconds=60, min_calls=2, failure_ratio=0.5, open_seconds=30, clock=clock)
+    straggler = breaker.allow()
+    for _ in range(2):
+        breaker.record(False, breaker.allow())
+    assert breaker.state == "open"
+
+    # A call admitted while closed succeeds late: the circuit stays open
+    breaker.record(True, straggler)
+    assert breaker.state == "open"
+
+    clock.now += 31
+    probe = breaker.allow()
+    assert probe.probe and breaker.allow() is None
+    # Nor does a late straggler close the circuit or free the probe slot while the probe runs
+    breaker.record(True, straggler)
+    breaker.release(straggler)
+    assert breaker.state == "half_open" and breaker.allow() is None
+    breaker.record(True, probe)
+    assert breaker.state == "closed"
+    assert breaker.stats()["stragglers"] == 2
+
+
+def test_client_errors_do_not_open_the_breaker():
+    breaker = CircuitBreaker("test", min_calls=2, failure_ratio=0.5)
+    upstream = ResilientUpstream("test", breaker=breaker)
+    request = httpx.Request("POST", "https://api.deepseek.com")
+
+    async def bad_request():
+        raise httpx.HTTPStatusError("400", request=request, response=httpx.Response(400, request=request))
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(httpx.HTTPStatusError):
+                await upstream.call("exercise", bad_request)
+
+    asyncio.run(scenario())
+    assert breaker.state == "closed"
+
+
+def test_slow_call_is_hedged_after_p95(monkeypatch):
+    monkeypatch.setattr("app.services.resilience.HEDGE_MIN_DELAY", 0.02)
+    latency = LatencyTracker(slos={"exercise": 0.5})
+    for _ in range(20):
+        latency.observe("exercise", 0.01, True)
+    upstream = ResilientUpstream("test", latency=latency, hedge_enabled=True)
+    upstream.calls = 100  # room in the hedge budget
+    attempts = []
+
+    async def first_attempt_hangs():
+        attempts.append(1)
+        await asyncio.sleep(5 if len(attempts) == 1 else 0)
+        return len(attempts)
+
+    result = asyncio.run(asyncio.wait_for(upstream.call("exercise", first_attempt_hangs), timeout=1))
+    assert result == 2
+    assert upstream.hedges == 1
+    assert upstream.hedge_wins == 1
+    stats = latency.stats()["exercise"]
+    assert stats["calls"] == 21
+    assert stats["p50"] == 0.01
+
+
+def test_cancelled_caller_cancels_the_attempt_before_the_hedge(monkeypatch):
+    monkeypatch.setattr("app.services.resilience.HEDGE_MIN_DELAY", 0.5)
+    latency = LatencyTracker(slos={"exercise": 1.0})
+    for _ in range(20):
+        latency.observe("exercise", 0.01, True)
+    upstream = ResilientUpstream("test", latency=latency, hedge_enabled=True)
+    upstream.calls = 100
+    cancelled = []
+
+    async def hangs():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(upstream.call("exercise", hangs), timeout=0.05)
+        await asyncio.sleep(0)
+        # Cancelled with the caller, not left running until the loop shuts down
+        assert cancelled == [True]
+
+    asyncio.run(scenario())
+    assert upstream.hedges == 0
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"items": [1, 2]}
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", upstream) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r == {"items": [1, 2]} for r in results)
+    # Every caller gets its own copy
+    results[0]["items"].append(3)
+    assert results[1] == {"items": [1, 2]}
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_different_keys_are_not_coalesced():
+    calls = []
+
+    async def upstream(n):
+        calls.append(n)
+        await asyncio.sleep(0)
+        return n
+
+    async def scenario():
+        flight = SingleFlight()
+        return await asyncio.gather(flight.do("a", lambda: upstream(1)), flight.do("b", lambda: upstream(2)))
+
+    assert asyncio.run(scenario()) == [1, 2]
+    assert sorted(calls) == [1, 2]
+
+
+def test_errors_propagate_and_key_is_released():
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        flight = SingleFlight()
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing)
+        return await flight.do("key", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
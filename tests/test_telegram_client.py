@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import httpx
+
+
+def test_sends_keep_per_chat_order_and_run_across_chats(telegram_client):
+    delivered = []
+
+    async def handler(request):
+        payload = json.loads(request.content)
+        # The first message to chat 1 is slow; chat 2 must not wait for it
+        await asyncio.sleep(0.05 if payload["text"] == "1a" else 0)
+        delivered.append(payload["text"])
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": 1}})
+
+    telegram_client.api = handler
+
+    async def scenario():
+        for text in ("1a", "1b", "1c"):
+            telegram_client.send_message(1, text)
+        telegram_client.send_message(2, "2a")
+        await telegram_client.flush(1)
+        await telegram_client.flush_all()
+
+    asyncio.run(scenario())
+    assert delivered[0] == "2a"
+    assert [text for text in delivered if text.startswith("1")] == ["1a", "1b", "1c"]
+
+
+def test_media_prepared_concurrently_but_sent_in_order(telegram_client):
+    sent = []
+
+    async def handler(request):
+        if request.url.path.endswith("/sendVoice"):
+            sent.append("voice")
+            return httpx.Response(200, json={"ok": True, "result": {"voice": {"file_id": "v1"}}})
+        sent.append(json.loads(request.content)["text"])
+        return httpx.Response(200, json={"ok": True, "result": {}})
+
+    telegram_client.api = handler
+
+    async def scenario():
+        telegram_client.send_message(7, "question")
+        telegram_client.send_media(7, "sendVoice", "voice", "k", lambda: ("voice.ogg", b"OggS", "audio/ogg"))
+        telegram_client.send_message(7, "options")
+        await telegram_client.flush(7)
+
+    asyncio.run(scenario())
+    assert telegram_client.registry.get("k") == "v1"
+    assert sent == ["question", "voice", "options"]
+
+
+def test_callback_answer_goes_out_before_the_edit(telegram_client):
+    calls = []
+
+    async def handler(request):
+        payload = json.loads(request.content)
+        calls.append((request.url.path.rsplit("/", 1)[-1], payload))
+        return httpx.Response(200, json={"ok": True, "result": True})
+
+    telegram_client.api = handler
+
+    async def scenario():
+        telegram_client.answer_callback_query(1, "cb1", text="ok")
+        telegram_client.edit_message_text(1, 42, "edited", reply_markup={"inline_keyboard": [[{"text": "1", "callback_data": "answer:1"}]]})
+        await telegram_client.flush(1)
+
+    asyncio.run(scenario())
+    assert [method for method, _ in calls] == ["answerCallbackQuery", "editMessageText"]
+    assert calls[0][1] == {"callback_query_id": "cb1", "text": "ok"}
+    edit = calls[1][1]
+    assert edit["message_id"] == 42 and json.loads(edit["reply_markup"])["inline_keyboard"][0][0]["callback_data"] == "answer:1"
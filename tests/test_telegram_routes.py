@@ -0,0 +1,155 @@
+import asyncio
+import json
+import random
+
+import httpx
+
+import app.routes.telegram as telegram
+from app.services.exercise_pool import ExercisePool
+from app.services.offline_exercises import PICTURE_QUESTIONS
+from app.services.session import get_state, set_expected_answer, set_state
+from app.services.voice_encoding import VoiceEncoder
+
+CHAT_ID = 4242
+EXERCISE = {"question": "Mushuk?", "options": ["dog", "cat", "cow", "owl"], "correct_answer_index": 1,
+            "explanation": "'cat' means 'mushuk'."}
+
+
+class FakePool:
+    async def get_exercise(self, **kwargs):
+        return {**EXERCISE, "question": "Sigir?"}
+
+
+def _callback(data, update_id, message_id=77):
+    return {"update_id": update_id, "callback_query": {
+        "id": f"cb{update_id}", "data": data,
+        "message": {"message_id": message_id, "chat": {"id": CHAT_ID}, "text": "Question: Mushuk?"},
+    }}
+
+
+def _bot_api(monkeypatch, telegram_client):
+    """Routes the bot's sends to `telegram_client` and returns the (method, payload) list of its calls."""
+    calls = []
+
+    async def handler(request):
+        method = request.url.path.rsplit("/", 1)[-1]
+        if method == "sendVoice":
+            # A multipart upload; the payload is not needed here
+            calls.append((method, {}))
+            return httpx.Response(200, json={"ok": True, "result": {"message_id": 99, "voice": {"file_id": "v1"}}})
+        payload = json.loads(request.content)
+        calls.append((method, payload))
+        if method == "answerCallbackQuery":
+            return httpx.Response(200, json={"ok": True, "result": True})
+        # New messages are numbered from 100; an edit returns the message it edited
+        message_id = payload.get("message_id", 100 + sum(1 for m, _ in calls if m == "sendMessage") - 1)
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": message_id}})
+
+    telegram_client.api = handler
+    monkeypatch.setattr(telegram, "telegram_client", telegram_client)
+    monkeypatch.setattr(telegram, "synthesize_mp3", lambda text, lang, slow: b"ID3mp3")
+    monkeypatch.setattr(telegram, "voice_encoder", VoiceEncoder(ffmpeg="", enabled=True))
+    monkeypatch.setattr(telegram.audio_library, "path_for_key", lambda key: None)
+    return calls
+
+
+def _process(updates):
+    async def scenario():
+        for update in updates:
+            await telegram.process_update(update)
+
+    asyncio.run(scenario())
+
+
+def _run(monkeypatch, telegram_client, updates, prepare=None):
+    calls = _bot_api(monkeypatch, telegram_client)
+    monkeypatch.setattr(telegram, "TELEGRAM_INLINE_MODE", True)
+    monkeypatch.setattr(telegram, "exercise_pool", FakePool())
+    set_state(CHAT_ID, current_mode="in_exercise", native_language="english", learn_language="english",
+              level="beginner", topic="Animals")
+    set_expected_answer(CHAT_ID, "2")
+    set_state(CHAT_ID, current_explanation=EXERCISE["explanation"], exercise_message_id=77)
+    if prepare:
+        prepare()
+    _process(updates)
+    return calls
+
+
+def test_right_answer_then_double_tap(monkeypatch, telegram_client):
+    calls = _run(monkeypatch, telegram_client, [_callback("answer:2", 1), _callback("answer:2", 2)])
+    assert [method for method, _ in calls] == ["answerCallbackQuery", "editMessageText", "answerCallbackQuery"]
+    assert calls[0][1] == {"callback_query_id": "cb1", "text": telegram.get_text("english", "correct")}
+    edit = calls[1][1]
+    assert edit["message_id"] == 77 and edit["text"].endswith(telegram.get_text("english", "correct"))
+    assert [b["callback_data"] for b in json.loads(edit["reply_markup"])["inline_keyboard"][0]] == ["next", "restart"]
+    # The second tap is only acknowledged
+    assert calls[2][1] == {"callback_query_id": "cb2"}
+
+
+def test_wrong_answer_shows_the_explanation(monkeypatch, telegram_client):
+    calls = _run(monkeypatch, telegram_client, [_callback("answer:3", 1)])
+    assert [method for method, _ in calls] == ["answerCallbackQuery", "editMessageText"]
+    assert calls[0][1]["text"] == telegram.get_text("english", "incorrect")
+    assert EXERCISE["explanation"] in calls[1][1]["text"]
+
+
+def test_next_edits_the_message_into_the_next_exercise(monkeypatch, telegram_client):
+    calls = _run(monkeypatch, telegram_client, [_callback("answer:2", 1), _callback("next", 2)])
+    assert [method for method, _ in calls] == [
+        "answerCallbackQuery", "editMessageText", "answerCallbackQuery", "editMessageText"]
+    edit = calls[3][1]
+    assert edit["message_id"] == 77 and "Sigir?" in edit["text"]
+    buttons = json.loads(edit["reply_markup"])["inline_keyboard"]
+    assert [row[0]["callback_data"] for row in buttons[:5]] == ["answer:1", "answer:2", "answer:3", "answer:4", "voice"]
+    assert get_state(CHAT_ID)["expected_answer"] == "2"
+
+
+def test_question_is_voiced_only_on_request(monkeypatch, telegram_client):
+    calls = _run(monkeypatch, telegram_client, [_callback("answer:2", 1), _callback("next", 2), _callback("voice", 3)])
+    # Neither the answer nor "next" sends a voice note; the 🔊 button does
+    assert [method for method, _ in calls] == [
+        "answerCallbackQuery", "editMessageText", "answerCallbackQuery", "editMessageText",
+        "answerCallbackQuery", "sendVoice"]
+    assert get_state(CHAT_ID)["current_question"] == "Sigir?"
+
+
+def test_stale_button_after_leaving_the_exercise(monkeypatch, telegram_client):
+    calls = _run(monkeypatch, telegram_client, [_callback("answer:2", 1)],
+                 prepare=lambda: set_state(CHAT_ID, current_mode="choose_topic"))
+    assert calls == [("answerCallbackQuery", {"callback_query_id": "cb1"})]
+    # The pending answer is left alone
+    assert get_state(CHAT_ID)["expected_answer"] == "2"
+
+
+def test_only_the_latest_exercise_message_takes_answers(monkeypatch, telegram_client):
+    def choose_topic():
+        set_state(CHAT_ID, current_mode="choose_topic")
+
+    topic = {"update_id": 1, "message": {"chat": {"id": CHAT_ID}, "text": "Animals"}}
+    calls = _run(monkeypatch, telegram_client, [topic, _callback("answer:2", 2), _callback("answer:2", 3, message_id=101)],
+                 prepare=choose_topic)
+    # The topic reply is message 100 and the exercise message 101; the old exercise's buttons are dead
+    assert [method for method, _ in calls] == [
+        "sendMessage", "sendVoice", "sendMessage", "answerCallbackQuery", "answerCallbackQuery", "editMessageText"]
+    assert calls[3][1] == {"callback_query_id": "cb2"}
+    assert calls[4][1]["text"] == telegram.get_text("english", "correct")
+    assert calls[5][1]["message_id"] == 101
+    assert get_state(CHAT_ID)["exercise_message_id"] == 101
+
+
+def test_telegram_gets_only_translation_questions(monkeypatch, telegram_client):
+    calls = _bot_api(monkeypatch, telegram_client)
+    monkeypatch.setattr(telegram, "exercise_pool", ExercisePool(offline_levels={"beginner"}))
+    updates = []
+    for chat_id in range(900, 920):
+        set_state(chat_id, current_mode="choose_topic", native_language="english",
+                  learn_language="russian", level="beginner")
+        # Picking a topic sends the first exercise of the topic
+        updates.append({"update_id": chat_id, "message": {"chat": {"id": chat_id}, "text": "Животные"}})
+
+    monkeypatch.setattr(random, "random", lambda: 0.0)  # would always build picture questions
+    _process(updates)
+    questions = [payload["text"] for method, payload in calls
+                 if method == "sendMessage" and payload["text"].startswith("Question: ")]
+    assert len(questions) == 20
+    assert not any(PICTURE_QUESTIONS["english"] in question for question in questions)
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import httpx
+
+import app.services.daily_reminder as daily_reminder
+from app.services.tg_file_registry import media_key
+
+
+def test_media_is_uploaded_once_then_sent_by_file_id(telegram_client):
+    registry = telegram_client.registry
+    posts, loads = [], []
+
+    async def handler(request):
+        uploaded = b"filename=" in request.content
+        sent_file_id = None if uploaded else json.loads(request.content)["voice"]
+        posts.append(sent_file_id)
+        if sent_file_id == "stale-id":
+            return httpx.Response(400, json={"ok": False, "description": "wrong file identifier"})
+        return httpx.Response(200, json={"ok": True, "result": {"voice": {"file_id": "voice-id"}}})
+
+    def load():
+        loads.append(1)
+        return "voice.mp3", b"ID3", "audio/mpeg"
+
+    key = media_key("voice", "Тўғри жавоб!")
+
+    async def scenario():
+        for chat_id in (1, 2, 3):
+            await telegram_client.send_media(chat_id, "sendVoice", "voice", key, load)
+        # A file_id Telegram no longer accepts is forgotten and the file uploaded again
+        registry.put(key, "voice", "stale-id")
+        await telegram_client.send_media(4, "sendVoice", "voice", key, load)
+
+    telegram_client.api = handler
+    asyncio.run(scenario())
+    assert posts == [None, "voice-id", "voice-id", "stale-id", None]
+    assert len(loads) == 2
+    assert registry.get(key) == "voice-id"
+    assert registry.stats()["uploads"] == 2 and registry.stats()["stale"] == 1
+
+
+def test_reminder_uploads_png_and_voice_once_with_caption(monkeypatch, telegram_client):
+    requests_seen = []
+
+    async def handler(request):
+        body = request.content
+        field = "photo" if request.url.path.endswith("/sendPhoto") else "voice"
+        requests_seen.append((field, b"filename=" in body, b"image/png" in body, "caption" in body.decode("latin-1")))
+        return httpx.Response(200, json={"ok": True, "result": {field: {"file_id": f"{field}-id"}}})
+
+    async def scenario():
+        for chat_id in (1, 2):
+            await daily_reminder.send_character_message(chat_id, "happy", "Keling, mashq qilamiz!")
+            await telegram_client.flush(chat_id)
+
+    telegram_client.api = handler
+    monkeypatch.setattr(daily_reminder, "telegram_client", telegram_client)
+    asyncio.run(scenario())
+    # (field, uploaded, is PNG, has caption): uploads for the first chat, file_ids afterwards
+    assert requests_seen == [
+        ("photo", True, True, False), ("voice", True, False, True),
+        ("photo", False, False, False), ("voice", False, False, True),
+    ]
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+
+import httpx
+
+import app.routes.admin as admin
+import app.services.daily_reminder as daily_reminder
+from app.services.tg_rate_limiter import TelegramRateLimiter, PRIORITY_BROADCAST, PRIORITY_INTERACTIVE
+
+
+def test_interactive_calls_go_ahead_of_queued_broadcasts():
+    order = []
+
+    async def send(limiter, name, chat_id, priority):
+        await limiter.acquire(chat_id, priority)
+        order.append(name)
+
+    async def scenario():
+        limiter = TelegramRateLimiter(global_rate=100, global_burst=1, chat_rate=100, chat_burst=1)
+        await limiter.acquire(0)  # uses up the global burst; everything below has to queue
+        tasks = [asyncio.create_task(send(limiter, f"broadcast{i}", 10 + i, PRIORITY_BROADCAST)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(send(limiter, "reply", 1, PRIORITY_INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert order == ["reply", "broadcast0", "broadcast1", "broadcast2"]
+    assert stats["throttled"] == 4 and stats["depth"] == 0
+
+
+def test_per_chat_bucket_does_not_hold_back_other_chats():
+    async def scenario():
+        limiter = TelegramRateLimiter(global_rate=1000, global_burst=100, chat_rate=5, chat_burst=1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await limiter.acquire(1)
+        # Chat 1 must wait ~0.2s for its next token; chat 2 goes immediately
+        second = asyncio.create_task(limiter.acquire(1))
+        await limiter.acquire(2)
+        other_chat = loop.time() - started
+        await second
+        return other_chat, loop.time() - started
+
+    other_chat, same_chat = asyncio.run(scenario())
+    assert other_chat < 0.1
+    assert same_chat >= 0.15
+
+
+def test_client_retries_after_telegram_retry_after(telegram_client):
+    attempts = []
+
+    async def handler(request):
+        attempts.append(json.loads(request.content)["text"])
+        if len(attempts) == 1:
+            return httpx.Response(429, json={"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                             "parameters": {"retry_after": 0.05}})
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": 1}})
+
+    async def scenario():
+        return await telegram_client.send_message(7, "hi")
+
+    telegram_client.api = handler
+    result = asyncio.run(scenario())
+    assert result == {"message_id": 1}
+    assert attempts == ["hi", "hi"]
+    assert telegram_client.limiter.stats()["retry_after_backoffs"] == 1
+
+
+def test_reminder_blast_reads_the_database_and_assets_off_the_event_loop(monkeypatch):
+    threads = {}
+
+    class FakeQuery:
+        def all(self):
+            threads["query"] = threading.get_ident()
+            return []
+
+    class FakeDB:
+        def query(self, model):
+            return FakeQuery()
+
+    def character_sends(mood, phrase=None):
+        threads["assets"] = threading.get_ident()
+        return []
+
+    monkeypatch.setattr(daily_reminder, "_character_sends", character_sends)
+
+    async def scenario():
+        threads["loop"] = threading.get_ident()
+        result = await admin.send_reminders(db=FakeDB())
+        await daily_reminder.send_character_message(1, "happy", "Salom!")
+        return result
+
+    assert asyncio.run(scenario()) == {"sent": 0}
+    assert threads["query"] != threads["loop"] and threads["assets"] != threads["loop"]
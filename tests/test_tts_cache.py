@@ -0,0 +1,38 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.routes.webapp as webapp
+from app.services.tts_cache import TTSCache, clean_text_for_tts, tts_key
+
+
+def test_clean_text_keeps_cyrillic_and_hangul():
+    assert clean_text_for_tts("Тўғри жавоб! 🎉") == "Тўғри жавоб!"
+    assert clean_text_for_tts("사과 🍎") == "사과"
+    assert tts_key("apple 🍎", "english") == tts_key("apple", "en")
+    assert tts_key("apple", "en", slow=False) != tts_key("apple", "en")
+
+
+def test_tts_is_synthesized_once_and_served_as_cacheable_file(monkeypatch, tmp_path):
+    calls = []
+
+    def synthesize(text, lang, slow):
+        calls.append((text, lang, slow))
+        return b"ID3" + b"\x00" * 997
+
+    monkeypatch.setattr(webapp, "tts_cache", TTSCache(directory=tmp_path, synthesize=synthesize))
+    app = FastAPI()
+    app.include_router(webapp.router)
+    client = TestClient(app)
+
+    first = client.get("/tts", params={"text": "Привет 👋", "lang": "russian"})
+    again = client.get("/tts", params={"text": "Привет", "lang": "ru"})
+    assert first.status_code == again.status_code == 200
+    assert calls == [("Привет", "ru", True)]
+    assert first.headers["etag"] == again.headers["etag"]
+    assert "immutable" in first.headers["cache-control"]
+
+    not_modified = client.get("/tts", params={"text": "Привет", "lang": "ru"}, headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+    partial = client.get("/tts", params={"text": "Привет", "lang": "ru"}, headers={"Range": "bytes=0-99"})
+    assert partial.status_code == 206 and len(partial.content) == 100
+    assert client.get("/tts", params={"text": "🎉"}).status_code == 204
@@ -0,0 +1,28 @@
+from app.services.update_dedup import UpdateDeduplicator
+
+
+def test_redeliveries_are_dropped_within_the_window():
+    dedup = UpdateDeduplicator(ttl=60, max_entries=3)
+    assert not dedup.seen(1)
+    assert dedup.seen(1)
+    for update_id in (2, 3, 4):
+        assert not dedup.seen(update_id)
+    # Bounded: the oldest id was evicted to make room
+    assert not dedup.seen(1)
+    dedup.forget(4)
+    assert not dedup.seen(4)
+    assert dedup.stats()["duplicates_dropped"] == 1
+
+    expired = UpdateDeduplicator(ttl=0)
+    assert not expired.seen(7)
+    assert not expired.seen(7)
+
+
+def test_shared_store_drops_updates_seen_by_another_process(tmp_path):
+    path = str(tmp_path / "updates.sqlite3")
+    first, second = UpdateDeduplicator(path=path), UpdateDeduplicator(path=path)
+    assert not first.seen(10)
+    assert second.seen(10)
+    assert not second.seen(11)
+    assert first.seen(11)
+    assert second.stats()["duplicates_dropped"] == 1
@@ -0,0 +1,47 @@
+import asyncio
+
+from app.services.update_queue import UpdateQueue
+
+
+def test_updates_of_a_chat_run_in_order_and_chats_in_parallel():
+    handled = []
+
+    async def handler(update):
+        # The first update of chat 1 is slow; chat 2 must not wait for it
+        await asyncio.sleep(0.05 if update["text"] == "1a" else 0)
+        handled.append(update["text"])
+
+    async def scenario():
+        queue = UpdateQueue(handler, workers=4)
+        for chat_id, text in ((1, "1a"), (1, "1b"), (2, "2a"), (1, "1c")):
+            assert queue.submit(chat_id, {"text": text})
+        await queue.stop()
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert handled[0] == "2a"
+    assert [text for text in handled if text.startswith("1")] == ["1a", "1b", "1c"]
+    assert stats["processed"] == 4 and stats["depth"] == 0 and stats["chats_waiting"] == 0
+
+
+def test_full_queue_refuses_and_failures_do_not_block_the_chat():
+    handled = []
+
+    async def handler(update):
+        if update["text"] == "boom":
+            raise RuntimeError("boom")
+        handled.append(update["text"])
+
+    async def scenario():
+        queue = UpdateQueue(handler, workers=1, max_depth=2)
+        assert queue.submit(1, {"text": "boom"})
+        assert queue.submit(1, {"text": "after"})
+        assert not queue.submit(1, {"text": "refused"})
+        await queue.stop()
+        # Nothing is accepted once shutdown has begun
+        assert not queue.submit(1, {"text": "late"})
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert handled == ["after"]
+    assert stats["failed"] == 1 and stats["processed"] == 1 and stats["rejected"] == 2
@@ -0,0 +1,57 @@
+import asyncio
+import subprocess
+
+import httpx
+
+import app.routes.telegram as telegram
+from app.services.tg_file_registry import media_key
+from app.services.tts_cache import tts_key
+from app.services.voice_encoding import VoiceEncoder
+
+
+def test_voice_is_sent_as_mp3_without_ffmpeg():
+    encoder = VoiceEncoder(ffmpeg="", enabled=True)
+    assert encoder.encode(b"ID3mp3") == ("voice.mp3", b"ID3mp3", "audio/mpeg")
+    assert encoder.stats()["fallbacks"] == 1
+
+
+def test_voice_is_piped_through_ffmpeg_to_opus(monkeypatch):
+    calls = []
+
+    def run(args, input=None, **kwargs):
+        calls.append((args, input))
+        return subprocess.CompletedProcess(args, 0, stdout=b"OggS" + b"\x00" * 10)
+
+    monkeypatch.setattr(subprocess, "run", run)
+    encoder = VoiceEncoder(ffmpeg="/usr/bin/ffmpeg", enabled=True)
+    name, data, content_type = encoder.encode(b"ID3" + b"\x00" * 97)
+
+    assert (name, content_type) == ("voice.ogg", "audio/ogg")
+    assert data.startswith(b"OggS")
+    args, piped = calls[0]
+    assert "pipe:0" in args and "pipe:1" in args and "libopus" in args
+    assert piped.startswith(b"ID3")
+    assert encoder.stats()["size_ratio"] == 0.14
+
+
+def test_mp3_fallback_is_not_registered_as_opus(monkeypatch, telegram_client):
+    def failing_run(*args, **kwargs):
+        raise subprocess.TimeoutExpired("ffmpeg", 10)
+
+    async def handler(request):
+        return httpx.Response(200, json={"ok": True, "result": {"voice": {"file_id": "mp3-id"}}})
+
+    monkeypatch.setattr(subprocess, "run", failing_run)
+    monkeypatch.setattr(telegram, "voice_encoder", VoiceEncoder(ffmpeg="/usr/bin/ffmpeg", enabled=True))
+    monkeypatch.setattr(telegram, "synthesize_mp3", lambda text, lang, slow: b"ID3mp3")
+    monkeypatch.setattr(telegram.audio_library, "path_for_key", lambda key: None)
+    monkeypatch.setattr(telegram, "telegram_client", telegram_client)
+    telegram_client.api = handler
+
+    async def scenario():
+        await telegram.send_voice(1, "Салом", lang="uzbek")
+
+    asyncio.run(scenario())
+    phrase_key = tts_key("Салом", "ru", slow=True)
+    assert telegram_client.registry.get(media_key("voice:opus", phrase_key)) is None
+    assert telegram_client.registry.get(media_key("voice", phrase_key)) == "mp3-id"